@@ -0,0 +1,163 @@
+"""
+Archive of the schedules of past runs in a SQLite database.
+
+Each archived run keeps its hipotesi and its routes, shifts and timeline, with the date (as
+'YYYY-MM-DD' text) and the hub of every row. The tables are indexed by date, hub and worker, so
+the rows of a day, a hub or a worker over a year of history are read in milliseconds.
+
+A day and hub can be archived many times, the queries return the rows of the latest run of
+each day, hub and tool ('generador' for the schedule generator, 'resum' for the week summary).
+"""
+import json
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from motorHoraris import ROUTE_DTYPES, SHIFT_DTYPES, TIMELINE_DTYPES, timeline_table, typed_table
+
+ARCHIVE_PATH = "arxiuHoraris.db"
+TOOLS = ["generador", "resum"]
+
+# Columns of the archived tables besides run, the hub is '' for the summary, which has none
+ARCHIVE_TABLES = {
+    "rutes": {"Data": "string", **{column: dtype for column, dtype in ROUTE_DTYPES.items() if column != "Data"}},
+    "torns": {"Data": "string", **SHIFT_DTYPES},
+    "timeline": {"Data": "string", "Hub": "category", **TIMELINE_DTYPES},
+}
+WORKER_COLUMNS = {"rutes": "Assignació", "torns": "Treballador", "timeline": "Treballador"}
+
+
+def sql_type(dtype):
+    """SQLite type of a column of the archive."""
+    if dtype in ("string", "category"):
+        return "TEXT"
+    return "REAL" if dtype == "float64" else "INTEGER"
+
+
+def connect(path=ARCHIVE_PATH):
+    """Open the archive at path, its tables and indexes are created when missing."""
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE IF NOT EXISTS execucions (run INTEGER PRIMARY KEY, Eina TEXT NOT NULL, Creat TEXT NOT NULL, Hipotesi TEXT)")
+    # One row per run, day and hub: the latest run of each day and hub is found here without reading the big tables
+    connection.execute("CREATE TABLE IF NOT EXISTS dies (run INTEGER NOT NULL, Eina TEXT NOT NULL, Data TEXT NOT NULL, Hub TEXT NOT NULL)")
+    connection.execute("CREATE INDEX IF NOT EXISTS dies_data ON dies (Eina, Data, Hub, run)")
+    for name, dtypes in ARCHIVE_TABLES.items():
+        columns = ", ".join(f'"{column}" {sql_type(dtype)}' for column, dtype in dtypes.items())
+        connection.execute(f"CREATE TABLE IF NOT EXISTS {name} (run INTEGER NOT NULL, {columns})")
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {name}_data ON {name} (Data, Hub, run)')
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {name}_treballador ON {name} ("{WORKER_COLUMNS[name]}", Data)')
+    return connection
+
+
+def archive_run(tool, hipotesi, routes=None, shifts=None, timeline=None, path=ARCHIVE_PATH):
+    """
+    Add a run to the archive.
+
+    Args:
+        tool (str): 'generador' or 'resum'.
+        hipotesi (dict): Parameters of the run.
+        routes, shifts, timeline (pd.DataFrame): Tables of the run with the columns of ARCHIVE_TABLES
+            (at least Data and Hub), missing columns are left empty.
+        path (str): File of the archive.
+
+    Returns:
+        int: Number of the run.
+    """
+    if tool not in TOOLS:
+        raise ValueError(f"Unknown tool: {tool}")
+    tables = {"rutes": routes, "torns": shifts, "timeline": timeline}
+    tables = {name: df for name, df in tables.items() if df is not None and not df.empty}
+
+    # The connection commits the run in one transaction (or rolls it back) and is closed afterwards
+    with closing(connect(path)) as connection, connection:
+        run = connection.execute("INSERT INTO execucions (Eina, Creat, Hipotesi) VALUES (?, ?, ?)",
+                                 (tool, datetime.now().isoformat(timespec="seconds"), json.dumps(hipotesi))).lastrowid
+        days = pd.concat([df[["Data", "Hub"]] for df in tables.values()]).drop_duplicates() if tables else pd.DataFrame(columns=["Data", "Hub"])
+        connection.executemany("INSERT INTO dies (run, Eina, Data, Hub) VALUES (?, ?, ?, ?)",
+                               [(run, tool, date, hub) for date, hub in zip(days["Data"], days["Hub"].astype(str))])
+        for name, df in tables.items():
+            df = typed_table(df, ARCHIVE_TABLES[name])
+            df = df.astype({column: object for column in df.columns if str(df[column].dtype) in ("category", "string")})
+            df.insert(0, "run", run)
+            df.to_sql(name, connection, if_exists="append", index=False)
+    return run
+
+
+def strip_day_labels(df, worker):
+    """
+    Hubs and workers of df without the ' dd-mm' label merge_days adds to the ones of each day.
+
+    Only the rows whose hub carries the label of their date change, the date is already in Data.
+    """
+    suffixes = [f" {day}" for day in pd.to_datetime(df["Data"], format="%Y-%m-%d").dt.strftime("%d-%m").fillna("")]
+    labelled = [suffix != " " and hub.endswith(suffix) for hub, suffix in zip(df["Hub"], suffixes)]
+    hubs = [hub[:-len(suffix)] if strip else hub for hub, suffix, strip in zip(df["Hub"], suffixes, labelled)]
+    workers = [name[:-len(suffix)] if strip and name.endswith(suffix) else name for name, suffix, strip in zip(df[worker], suffixes, labelled)]
+    return df.assign(**{"Hub": hubs, worker: workers})
+
+
+def archive_schedule(dfj, dft, timeline, hipotesi, path=ARCHIVE_PATH):
+    """
+    Add a run of the schedule generator to the archive.
+
+    The date of a shift is the one of its routes, the date and hub of a stop are the ones of its worker.
+    The hubs and workers of a merge_days result are archived without their day label.
+
+    Returns:
+        int: Number of the run.
+    """
+    routes = dfj.assign(Data=pd.to_datetime(dfj["Data"], format="%d/%m/%Y").dt.strftime("%Y-%m-%d"))
+    routes = routes.assign(Hub=routes["Hub"].astype(str))
+    days = routes[["Hub", "Assignació", "Data"]].drop_duplicates(["Hub", "Assignació"]).rename(columns={"Assignació": "Treballador"})
+    shifts = dft.assign(Hub=dft["Hub"].astype(str)).merge(days, on=["Hub", "Treballador"], how="left")
+    stops = timeline_table(timeline).merge(shifts[["Treballador", "Data", "Hub"]].drop_duplicates("Treballador"), on="Treballador", how="left")
+    # The labelled names are unique across days, they are only stripped once the tables are matched by them
+    routes = strip_day_labels(routes, "Assignació")
+    shifts = strip_day_labels(shifts, "Treballador")
+    stops = strip_day_labels(stops, "Treballador")
+    return archive_run("generador", hipotesi, routes, shifts, stops, path)
+
+
+def load_table(name, start, end=None, hub=None, worker=None, tool="generador", path=ARCHIVE_PATH):
+    """
+    Rows of an archived table between two dates, from the latest run of each day and hub.
+
+    Args:
+        name (str): 'rutes', 'torns' or 'timeline'.
+        start, end (str): First and last date, 'YYYY-MM-DD' (or a date), end is start by default.
+        hub (str): Only the rows of this hub.
+        worker (str): Only the rows of this worker.
+        tool (str): Only the runs of this tool.
+        path (str): File of the archive.
+
+    Returns:
+        pd.DataFrame: run and the columns of the table with their types, sorted by date.
+    """
+    if name not in ARCHIVE_TABLES:
+        raise ValueError(f"Unknown archive table: {name}")
+    start = str(start)
+    end = start if end is None else str(end)
+
+    latest = "SELECT Data, Hub, MAX(run) AS run FROM dies WHERE Eina = ? AND Data BETWEEN ? AND ?"
+    parameters = [tool, start, end]
+    if hub is not None:
+        latest += " AND Hub = ?"
+        parameters.append(hub)
+    query = f"WITH latest AS ({latest} GROUP BY Data, Hub) SELECT t.* FROM latest l JOIN {name} t ON t.run = l.run AND t.Data = l.Data AND t.Hub = l.Hub"
+    if worker is not None:
+        query += f' WHERE t."{WORKER_COLUMNS[name]}" = ?'
+        parameters.append(worker)
+
+    with closing(connect(path)) as connection:
+        df = pd.read_sql_query(query + " ORDER BY t.Data, t.rowid", connection, params=parameters)
+    return pd.concat([df[["run"]], typed_table(df, ARCHIVE_TABLES[name])], axis=1)
+
+
+def load_runs(path=ARCHIVE_PATH):
+    """Archived runs: run, Eina, Creat and the Hipotesi dict."""
+    with closing(connect(path)) as connection:
+        runs = pd.read_sql_query("SELECT * FROM execucions ORDER BY run", connection)
+    runs["Hipotesi"] = runs["Hipotesi"].map(json.loads)
+    return runs
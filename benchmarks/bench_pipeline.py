@@ -0,0 +1,120 @@
+"""
+Time each stage of the schedule generator on generated route and worker tables.
+
+    python benchmarks/bench_pipeline.py --sizes 100 1000 --output bench.json
+
+The results are written as JSON so two commits can be compared.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generators import generate_routes_table, generate_workers_table
+from motorHoraris import calculate_worker_availability, generate_excel_file, load_data, process_routes, process_workers, summarize_hubs
+
+
+def time_stage(function, repeat):
+    """Run function repeat times and return the best time in seconds and the last result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_size(number_of_routes, hipotesi, seed, columns, repeat, excel):
+    """Time every stage for one table size and return a result per stage."""
+    routes_table = generate_routes_table(number_of_routes, seed=seed, columns=columns, pes_trike=hipotesi["Pes Trike"])
+    workers_table = generate_workers_table(max(10, number_of_routes // 5), seed=seed)
+
+    results = []
+
+    def record(stage, seconds, rows):
+        results.append({"stage": stage, "routes": number_of_routes, "columns": columns, "rows": rows, "seconds": round(seconds, 6)})
+
+    seconds, dfj = time_stage(lambda: process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"]), repeat)
+    record("process_routes", seconds, len(dfj))
+
+    seconds, workers = time_stage(lambda: process_workers(workers_table, 1), repeat)
+    record("process_workers", seconds, len(workers))
+
+    seconds, (dfj, dft, timeline, numberTrikes, number4Wheels, _) = time_stage(lambda: calculate_worker_availability(
+        dfj,
+        {},
+        {},
+        hipotesi["Temps Per paquet"],
+        hipotesi["Temps entre rutes"],
+        hipotesi["Maxim Hores Global"],
+        hipotesi["Temps Inici Torn"],
+        hipotesi["Temps Fi Torn"],
+        hipotesi["Marge abans - W"],
+        hipotesi["Marge despres - W"],
+        hipotesi["Marge abans - No W"],
+        hipotesi["Marge despres - No W"],
+        hipotesi["Temps maxim espera"],
+        hipotesi["Marge primera ruta torn"]
+    ), repeat)
+    record("calculate_worker_availability", seconds, len(dft))
+
+    if excel:
+        additional_info_list = summarize_hubs(dfj, dft)
+        for write_only in (False, True):
+            seconds, _ = time_stage(lambda: generate_excel_file(dfj, dft, workers, workers, additional_info_list, hipotesi, timeline, {},
+                                                                numberTrikes, number4Wheels, write_only=write_only), 1)
+            record("generate_excel_file write_only" if write_only else "generate_excel_file", seconds, len(dfj))
+
+    return results
+
+
+def git_commit():
+    """Current commit of the repository, or None outside a git checkout."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the schedule generator stages.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000], help="Number of routes of each run.")
+    parser.add_argument("--columns", type=int, nargs="+", default=[15, 16], choices=[15, 16], help="Route table layouts to generate.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per stage, the best time is kept (the Excel file is written once).")
+    parser.add_argument("--no-excel", action="store_true", help="Skip generate_excel_file.")
+    parser.add_argument("--variables", default=os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "variables.json"))
+    parser.add_argument("--output", default="bench_output.json", help="JSON file with the results.")
+    args = parser.parse_args()
+
+    hipotesi = load_data(args.variables)
+    output = os.path.abspath(args.output)
+    report = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "hipotesi": hipotesi,
+        "results": [],
+    }
+
+    for size in args.sizes:
+        for columns in args.columns:
+            for result in run_size(size, hipotesi, args.seed, columns, args.repeat, not args.no_excel):
+                print(f"{result['stage']:<32}{result['routes']:>8} routes {result['columns']} cols {result['seconds']:>10.4f} s")
+                report["results"].append(result)
+
+    with open(output, "w") as file:
+        json.dump(report, file, indent=4)
+    print(f"Results saved to {output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import random
+
+
+HUBS = ["Sants", "Napols"]
+BARRIS = {
+    "Sants": ["ESTACIO", "DIAGONAL", "URGELL", "SYNLAB", "TARDE"],
+    "Napols": ["GOTIC", "BORN", "GRACIA", "POBLENOU", "SYNLAB"],
+}
+
+
+def hora(minutes):
+    """Convert minutes into a 'h:mm' string, as the route exports write them."""
+    return f"{minutes // 60}:{minutes % 60:02}"
+
+
+def generate_routes_table(number_of_routes, seed=0, columns=15, date="19/11/2024", pes_trike=125, priority_share=0.3, time_per_package=7):
+    """
+    Generate a pasted route table like the ones read by process_routes.
+
+    Departures come in waves every half hour from 8:00 to 19:30 and weights are spread
+    around pes_trike, so both TRIKE and 4W routes show up.
+
+    Args:
+        number_of_routes (int): Number of lines of the table.
+        seed (int): Seed of the random generator, the same seed gives the same table.
+        columns (int): 15 for the usual export, 16 for the export with the package time added to the route time.
+        date (str): Date of the routes, 'dd/mm/YYYY'.
+        pes_trike (int): Weight around which the route weights are generated.
+        priority_share (float): Share of priority (' W ') routes.
+        time_per_package (int): Package time added to the route time in the 16 column export.
+
+    Returns:
+        str: Tab separated table, one route per line.
+    """
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(number_of_routes):
+        hub = rnd.choice(HUBS)
+        departure = 8 * 60 + 30 * rnd.randint(0, 23) + rnd.choice([0, 0, 0, 5, 10, 15])
+        packages = rnd.randint(2, 15)
+        route_time = rnd.randint(15, 90)
+        weight = max(0, int(rnd.gauss(pes_trike * 0.8, pes_trike * 0.4)))
+        priority = " - W" if rnd.random() < priority_share else ""
+        route_id = f"{1731998000000 + i} - {i % 100:02} - {hub.upper()} - {rnd.choice(BARRIS[hub])}{priority} - {hora(departure)}"
+
+        row = [route_id, "Bicicleta", date, hora(departure), "", "", str(route_time), "", "", str(weight), hub, "", str(packages), "", ""]
+        if columns == 16:
+            row.insert(1, "")
+            row[7] = str(route_time + packages * time_per_package)
+        lines.append("\t".join(row))
+    return "\n".join(lines)
+
+
+def generate_workers_table(number_of_workers, seed=0, days=7):
+    """
+    Generate a pasted worker schedule table like the ones read by process_workers.
+
+    Each worker has a start time, end time and hours ('7,5') for every day, or an empty
+    day off now and then.
+
+    Args:
+        number_of_workers (int): Number of workers of the table.
+        seed (int): Seed of the random generator.
+        days (int): Number of days of the week in the table.
+
+    Returns:
+        str: Tab separated table, one worker per line.
+    """
+    rnd = random.Random(seed)
+    lines = []
+    for i in range(number_of_workers):
+        row = [f"TREBALLADOR {i:04}"]
+        for _ in range(days):
+            if rnd.random() < 0.15:
+                row += ["", "", ""]
+                continue
+            start = 7 * 60 + 30 * rnd.randint(0, 16)
+            hours = rnd.choice([4, 5, 6, 7.5, 8])
+            row += [hora(start), hora(start + int(hours * 60)), str(hours).replace(".", ",")]
+        lines.append("\t".join(row))
+    return "\n".join(lines)
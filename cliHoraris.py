@@ -0,0 +1,181 @@
+"""
+Generate the schedule workbook from the command line, without Streamlit.
+
+    python cliHoraris.py rutes.tsv --sants horaris_sants.tsv --napols horaris_napols.tsv --output output.xlsx
+
+The route and worker files are the same tab separated tables pasted in the app.
+With --multi-day the routes can span many dates: every day and hub is scheduled on its
+own process and gets its own sheet in the workbook.
+With --roster-capacity the routes go to the workers of the schedules first, and extra
+workers are only added for the routes they cannot take. With --roster-names the shifts are
+only named after the workers of the schedules they are matched to.
+With --add, --cancel and --delay the schedule of the routes file is then updated with these
+changes: the routes before the first change keep their workers, and the workers keep their
+names (greedy engine only):
+
+    python cliHoraris.py rutes.tsv --add noves_rutes.tsv --cancel R0012 --delay R0040=10:30
+
+With --sweep the routes are scheduled with every combination of the given parameter values
+instead, and the Pareto front of workers, hours, trikes and 4W of each hub is printed:
+
+    python cliHoraris.py rutes.tsv --sweep "Marge abans - W=5,10,15" --sweep "Pes Trike=100,125,150"
+
+With --profile a JSON line with the time, peak memory and rows of each stage is printed,
+and --profiler cprofile prints a profile of the whole run.
+With --tables the assignments, shifts and timeline are also written as Parquet (or CSV)
+tables for other tools, and --no-excel skips the workbook. With --archive they are also added
+to the SQLite archive of past runs.
+"""
+import argparse
+import sys
+import time
+
+
+def read_table(file_path):
+    """Read a pasted table from a file, '' when no file is given."""
+    if file_path is None:
+        return ""
+    with open(file_path, encoding="utf-8") as file:
+        return file.read()
+
+
+def parse_range(text):
+    """Read a 'key=value,value,...' sweep range."""
+    key, separator, values = text.partition("=")
+    if not separator or not values:
+        raise argparse.ArgumentTypeError(f"expected KEY=VALUE,VALUE,... and got {text!r}")
+    try:
+        values = [float(value) for value in values.split(",")]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"the values of {key} must be numbers")
+    return key.strip(), [int(value) if value.is_integer() else value for value in values]
+
+
+def parse_delay(text):
+    """Read an 'id=hh:mm' new start time of a route, in minutes."""
+    routeId, separator, startTime = text.partition("=")
+    hours, _, minutes = startTime.partition(":")
+    if not separator or not hours.isdigit() or not minutes.isdigit():
+        raise argparse.ArgumentTypeError(f"expected ID=HH:MM and got {text!r}")
+    return routeId.strip(), int(hours) * 60 + int(minutes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the worker schedules for a day of routes.")
+    parser.add_argument("routes", help="File with the routes table (tab separated).")
+    parser.add_argument("--sants", help="File with the worker schedules of Sants.")
+    parser.add_argument("--napols", help="File with the worker schedules of Napols.")
+    parser.add_argument("--variables", default="variables.json", help="JSON file with the hipotesi parameters.")
+    parser.add_argument("--output", default="output.xlsx", help="Excel file to write.")
+    parser.add_argument("--multi-day", action="store_true", help="Schedule every date of the routes table in parallel (worker schedules are not used).")
+    parser.add_argument("--processes", type=int, help="Processes used by --multi-day and --sweep, all the cores by default.")
+    parser.add_argument("--engine", default="greedy", choices=["greedy", "optimal"], help="Assignment engine, optimal searches for fewer workers.")
+    parser.add_argument("--time-budget", type=float, default=2.0, help="Seconds of the optimal engine (for each day and hub with --multi-day).")
+    parser.add_argument("--local-search", type=float, default=0, metavar="SECONDS", help="Improve the assignment with a local search for SECONDS (for each day and hub with --multi-day).")
+    parser.add_argument("--roster-capacity", action="store_true", help="Dispatch the routes to the workers of --sants and --napols before adding extra workers.")
+    parser.add_argument("--roster-names", action="store_true", help="Name the shifts after the matching workers of --sants and --napols.")
+    parser.add_argument("--add", metavar="FILE", help="File with routes added after the schedule was made, the schedule is updated with them.")
+    parser.add_argument("--cancel", action="append", metavar="ID", help="Id of a cancelled route (repeat for each route).")
+    parser.add_argument("--delay", type=parse_delay, action="append", metavar="ID=HH:MM", help="New planned start time of a route (repeat for each route).")
+    parser.add_argument("--tables", metavar="DIR", help="Also write the routes, shifts and timeline tables to DIR, as Parquet (CSV without pyarrow).")
+    parser.add_argument("--no-excel", action="store_true", help="Do not write the Excel file, only the --tables.")
+    parser.add_argument("--archive", nargs="?", const="arxiuHoraris.db", metavar="FILE", help="Add the run to the archive of past runs (arxiuHoraris.db by default).")
+    parser.add_argument("--write-only", action="store_true", help="Write the Excel file row by row, for very large route tables.")
+    parser.add_argument("--sweep", type=parse_range, action="append", metavar="KEY=VALUES",
+                        help="Try every combination of these hipotesi values (repeat for each key) and print the Pareto front.")
+    parser.add_argument("--sweep-output", default="sweep.csv", help="CSV file with all the runs of --sweep.")
+    parser.add_argument("--timing", action="store_true", help="Print the time spent in each step.")
+    parser.add_argument("--profile", action="store_true", help="Print a JSON line with the time, peak memory and rows of each stage.")
+    parser.add_argument("--profiler", choices=["cprofile", "pyinstrument"], help="Profile the run and print the report of the profiler.")
+    args = parser.parse_args(argv)
+    if args.no_excel and args.tables is None and args.archive is None:
+        parser.error("--no-excel needs --tables or --archive")
+    if args.multi_day and (args.sants or args.napols or args.roster_capacity or args.roster_names):
+        parser.error("--multi-day does not use the worker schedules, --sants, --napols, --roster-capacity and --roster-names cannot be used with it")
+    if (args.add or args.cancel or args.delay) and (args.multi_day or args.sweep or args.engine != "greedy" or args.local_search or args.roster_capacity):
+        parser.error("--add, --cancel and --delay only update schedules of a single day made by the greedy engine, without --local-search or --roster-capacity")
+    if args.roster_names and args.roster_capacity:
+        parser.error("--roster-names and --roster-capacity cannot be used together, --roster-capacity already names the shifts")
+
+    # The engine (pandas) is imported after parsing the arguments, so --help and argument errors answer at once
+    start = time.perf_counter()
+    from motorHoraris import (PipelineProfile, describe_assignment, describe_roster, export_tables, generate_excel_file, generate_schedule, load_data,
+                              merge_days, process_routes, reschedule, schedule_days, summarize_hubs, sweep)
+    steps = [("import", time.perf_counter() - start)]
+
+    hipotesi = load_data(args.variables)
+    routes_table = read_table(args.routes)
+    if not routes_table.strip():
+        print(f"No routes in {args.routes}.", file=sys.stderr)
+        return 1
+
+    if args.sweep:
+        try:
+            table, front = sweep(routes_table, hipotesi, dict(args.sweep), args.processes)
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 1
+        table.to_csv(args.sweep_output, index=False)
+        print(front.to_string(index=False))
+        print(f"{len(table)} rows saved to {args.sweep_output}.")
+        return 0
+
+    with PipelineProfile(memory=args.profile, profiler=args.profiler) as profile:
+        start = time.perf_counter()
+        if args.multi_day:
+            dfj = process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+            dfj, dft, timeline, numberTrikes, number4Wheels, _ = merge_days(schedule_days(dfj, hipotesi, args.processes, args.engine, args.time_budget, args.local_search))
+            workers_sants = workers_napols = None
+        else:
+            dfj, dft, timeline, numberTrikes, number4Wheels, _, workers_sants, workers_napols = generate_schedule(
+                routes_table, read_table(args.sants), read_table(args.napols), hipotesi, args.engine, args.time_budget, args.local_search,
+                args.roster_capacity, args.roster_names)
+        steps.append(("schedule", time.perf_counter() - start))
+
+        if args.add or args.cancel or args.delay:
+            delayed = dict(args.delay or [])
+            unknown = (set(args.cancel or []) | set(delayed)) - set(dfj["Id"])
+            if unknown:
+                print(f"Unknown routes: {', '.join(sorted(unknown))}.", file=sys.stderr)
+                return 1
+            start = time.perf_counter()
+            dfj, dft, timeline, numberTrikes, number4Wheels, _ = reschedule(dfj, dft, timeline, hipotesi, read_table(args.add), args.cancel or (), delayed)
+            steps.append(("reschedule", time.perf_counter() - start))
+
+        saved = []
+        if args.tables is not None:
+            start = time.perf_counter()
+            saved += export_tables(dfj, dft, timeline, args.tables)
+            steps.append(("tables", time.perf_counter() - start))
+
+        if args.archive is not None:
+            from arxiuHoraris import archive_schedule
+            start = time.perf_counter()
+            run = archive_schedule(dfj, dft, timeline, hipotesi, args.archive)
+            steps.append(("archive", time.perf_counter() - start))
+            saved.append(f"{args.archive} (run {run})")
+
+        if not args.no_excel:
+            start = time.perf_counter()
+            additional_info_list = summarize_hubs(dfj, dft)
+            generate_excel_file(dfj, dft, workers_sants, workers_napols, additional_info_list, hipotesi, timeline, {}, numberTrikes, number4Wheels, args.output, args.write_only)
+            steps.append(("excel", time.perf_counter() - start))
+            saved.append(args.output)
+
+    print(f"{len(dfj)} routes, {len(dft)} workers. Saved to {', '.join(saved)}.")
+    for hub, report in dft.attrs.get("assignment", {}).items():
+        print(f"{hub}: {describe_assignment(report)}")
+    for hub, report in dft.attrs.get("roster", {}).items():
+        print(f"{hub}: {describe_roster(report)}")
+    if args.timing:
+        for step, seconds in steps:
+            print(f"{step}: {seconds:.3f} s")
+    if args.profile:
+        print(profile.log_line())
+    if args.profiler:
+        print(profile.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,12 +1,17 @@
+import logging
 import streamlit as st
 import pandas as pd
+import numpy as np
 import openpyxl as opxl
 from openpyxl.styles import NamedStyle
-from datetime import datetime, timedelta
-import locale
+from datetime import datetime
 import json
 import os
-import re
+from motorHoraris import PipelineProfile, pipeline_stage
+from generadorHoraris import display_profile
+from arxiuHoraris import ARCHIVE_PATH, archive_run, load_table
+
+logger = logging.getLogger(__name__)  # the JSON line of every run, see PipelineProfile.log_line
 
 def intToHora(minutes):
     """Convert minutes into a 'hh:mm' formatted string."""
@@ -67,262 +72,385 @@ def process_User_Input():
     save_data(hipotesi, file_path)
     return hipotesi
 
+# Month names of the route exports, in Spanish and Catalan, and names of the days of the week used
+# as keys of the summary. Dates are read with these tables instead of the locale, which is global to the
+# process (shared by all the Streamlit sessions) and missing on many hosts.
+MESOS = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6, "julio": 7, "agosto": 8,
+    "septiembre": 9, "setiembre": 9, "octubre": 10, "noviembre": 11, "diciembre": 12,
+    "gener": 1, "febrer": 2, "març": 3, "marc": 3, "maig": 5, "juny": 6, "juliol": 7, "agost": 8,
+    "setembre": 9, "novembre": 11, "desembre": 12,
+}
+DIES = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+
+def parse_dates(months, days, year):
+    """
+    Dates of columns of month names (Spanish or Catalan, any case) and day numbers, all at once.
+
+    Returns:
+        pd.Series: Dates, NaT where the month or the day is not valid.
+    """
+    months = months.str.strip().str.lower().map(MESOS)
+    days = pd.to_numeric(days.str.strip(), errors="coerce")
+    return pd.to_datetime(pd.DataFrame({"year": year, "month": months, "day": days}), errors="coerce")
+
+
+def parse_times(column):
+    """Times 'H:M:S' or 'H:M' of a column, NaT when neither format fits."""
+    times = pd.to_datetime(column, format="%H:%M:%S", errors="coerce")
+    return times.fillna(pd.to_datetime(column, format="%H:%M", errors="coerce"))
+
+
+@pipeline_stage
 def process_Week_Schedule(weekSchedule, hipotesi):
-    
-    processed_routes = []
-    distinctdays = set()
-    # Set the locale to Spanish
-    locale.setlocale(locale.LC_TIME, 'es_ES.UTF-8')
-
-    for line in weekSchedule.splitlines():
-        if not line.strip():
-            continue
-        
-        route_elements = re.split(r"\t", line)
-
-        try:
-            date_str = route_elements[0] + " " + route_elements[1] 
-            # Specify the year manually (current year)
-            current_year = datetime.now().year
-
-            # Parse the date string and add the year
-            date_obj = datetime.strptime(f"{date_str} {current_year}", '%B %d %Y')
-
-            if date_obj.strftime("%A") not in distinctdays:
-                distinctdays.add(date_obj.strftime("%A"))
-                if len(distinctdays) > 5:
-                    break
-            
-            repartidor = route_elements[6]
-            if repartidor == "":
-                repartidor = "XXX"
-            horaSortida = route_elements[7]
-            horaArribada = route_elements[8]
-            
-            processed_route = [
-                date_obj,
-                repartidor,
-                horaSortida,
-                horaArribada                
-            ]
-            
-            processed_routes.append(processed_route)
-            
-        except ValueError as e:
-            print(f"Error processing line: {line} - {e}")
-            continue
-        
-    processed_routes = pd.DataFrame(processed_routes, columns=["Data", "Repartidor", "Hora Sortida", "Hora Arribada"])
-    return processed_routes
-
-
-
- 
+    """
+    Read the routes of the week from the pasted export.
+
+    The lines are read until the sixth different day of the week shows up, lines without a valid
+    date are reported and skipped.
+
+    Returns:
+        DataFrame: Data (of the current year), Repartidor (in upper case like the old week, 'XXX' when empty),
+        Hora Sortida and Hora Arribada.
+    """
+    lines = [line for line in weekSchedule.splitlines() if line.strip()]
+    # Short lines are padded to the 9 columns read, their missing fields are empty
+    route_elements = pd.DataFrame([(line.split("\t") + [""] * 9)[:9] for line in lines], columns=range(9))
+
+    data = parse_dates(route_elements[0], route_elements[1], datetime.now().year)
+    for line in pd.Series(lines, dtype=object)[data.isna().to_numpy()]:
+        print(f"Error processing line: {line} - invalid date")
+
+    processed_routes = pd.DataFrame({
+        "Data": data,
+        "Repartidor": route_elements[6].str.upper().replace("", "XXX"),
+        "Hora Sortida": route_elements[7],
+        "Hora Arribada": route_elements[8],
+    })[data.notna().to_numpy()]
+
+    # Keep the lines before the sixth different day of the week
+    firstLines = processed_routes["Data"].dt.dayofweek.drop_duplicates()
+    if len(firstLines) > 5:
+        processed_routes = processed_routes[processed_routes.index < firstLines.index[5]]
+    return processed_routes.reset_index(drop=True)
+
+
+@pipeline_stage
 def generate_weekly_schedule(weekSchedule, hipotesi):
-    workerSchedule = {}
+    """
+    Shift of each worker on each day of the week.
 
-    for index, row in weekSchedule.iterrows():
-        dia = row["Data"].strftime("%A")
-        repartidor = row["Repartidor"]
-        
-        def parse_time(time_str, formats):
-            for fmt in formats:
-                try:
-                    return datetime.strptime(time_str, fmt)
-                except ValueError:
-                    continue
-            raise ValueError(f"Time format for '{time_str}' not recognized")
-        
-
-        formats = ["%H:%M:%S", "%H:%M"]
-
-        try:
-            entrada = parse_time(row["Hora Sortida"], formats) - timedelta(minutes=hipotesi["Temps Entrada"])
-            sortida = parse_time(row["Hora Arribada"], formats) + timedelta(minutes=hipotesi["Temps Sortida"])
-        except ValueError as e:
-            print(f"Error parsing time: {e}")
-        
-        
-        if (dia, repartidor) not in workerSchedule:
-            workerSchedule[(dia, repartidor)] = [entrada, sortida, round((sortida - entrada).total_seconds() / 3600, 1)]
-        else:
-            entrada = workerSchedule[(dia, repartidor)][0]
-            workerSchedule[(dia, repartidor)][1] = sortida
-            workerSchedule[(dia, repartidor)][2] = round((sortida - entrada).total_seconds() / 3600,1)
-    
+    The times of the whole table are parsed at once, then each day and worker keeps its first
+    departure minus 'Temps Entrada' and its last arrival plus 'Temps Sortida'.
+
+    Args:
+        weekSchedule (DataFrame): Routes of the week from process_Week_Schedule.
+        hipotesi (dict): Parameters of the summary.
+
+    Returns:
+        dict: (day, repartidor) -> [entrada, sortida, hours], in the order of the table.
+    """
+    if weekSchedule.empty:
+        return {}
+
+    entrada = parse_times(weekSchedule["Hora Sortida"]) - pd.Timedelta(minutes=hipotesi["Temps Entrada"])
+    sortida = parse_times(weekSchedule["Hora Arribada"]) + pd.Timedelta(minutes=hipotesi["Temps Sortida"])
+    valid = entrada.notna() & sortida.notna()
+    for horaSortida, horaArribada in zip(weekSchedule["Hora Sortida"][~valid], weekSchedule["Hora Arribada"][~valid]):
+        print(f"Error parsing time: Time format for '{horaSortida}' or '{horaArribada}' not recognized")
+
+    shifts = pd.DataFrame({"dia": weekSchedule["Data"].dt.dayofweek.map(dict(enumerate(DIES))), "repartidor": weekSchedule["Repartidor"],
+                           "entrada": entrada, "sortida": sortida})[valid]
+    shifts = shifts.groupby(["dia", "repartidor"], sort=False).agg(entrada=("entrada", "min"), sortida=("sortida", "max"))
+
+    workerSchedule = {}
+    for key, entrada, sortida in zip(shifts.index, shifts["entrada"], shifts["sortida"]):
+        entrada, sortida = entrada.to_pydatetime(), sortida.to_pydatetime()
+        workerSchedule[key] = [entrada, sortida, round((sortida - entrada).total_seconds() / 3600, 1)]
     return workerSchedule
 
 
 
-def process_OldWeek_Schedule(OldWeekSchedule):
+@pipeline_stage
+def process_OldWeek_Schedule(OldWeekSchedule, days=None):
     """
-    Processes worker data to extract and format relevant information based on the day of the week.
+    Read the old week from the pasted grid: each line has the worker and then the entrada, sortida
+    and hours of each day.
 
     Args:
-        workers_table (str): String containing the worker data.
-        week_day (int): Day of the week (0-6, where 0 is Monday).
+        OldWeekSchedule (str): Pasted grid, one worker per line.
+        days (list): Days of the blocks of the lines, in order. By default the days of DIES from lunes,
+            at least to viernes and as far as the longest line goes, like the grids of generate_Excel_File.
 
     Returns:
-        list: List of processed worker data.
+        dict: (day, worker in upper case) -> [entrada, sortida, hours] as text, with '.' as decimal separator.
     """
+    rows = [line.split("\t") for line in OldWeekSchedule.splitlines() if line.strip()]
+    if days is None:
+        blocks = max((len(row) - 1) // 3 for row in rows) if rows else 0
+        days = DIES[:max(blocks, 5)]
 
-    # Initialize an empty list to store processed worker data
     processed_workers = {}
+    for worker in rows:
+        # Short lines are padded, their missing days are empty
+        worker = worker + [""] * (1 + 3 * len(days) - len(worker))
+        treballador = worker[0].upper()
+        for block, day in enumerate(days):
+            entrada, sortida, hours = worker[1 + 3 * block:4 + 3 * block]
+            processed_workers[(day, treballador)] = [entrada, sortida, hours.replace(",", ".")]
+    return processed_workers
 
 
+WEEK_COLUMNS = ["Dia", "Repartidor", "Entrada", "Sortida", "Hores"]
+CHANGES = ["Repartidor nou", "Repartidor eliminat", "Dia nou", "Dia eliminat", "Horari canviat"]
 
-    # Process each line in the workers table
-    for line in OldWeekSchedule.splitlines():
-        if not line.strip():
-            continue  # Skip empty lines
 
-        worker = re.split(r"\t", line)
+def week_frame(schedule, **keys):
+    """
+    Table of a week schedule, to compare weeks with diff_weeks.
 
-        try:
-            treballador = worker[0].upper()
-            # Convert hours worked from comma to period for float conversion
-            for i in range(0, 5):
-                worker[i+2] = worker[i+2].replace(",", ".")
-            processed_workers[("lunes", treballador)] = [worker[1], worker[2], worker[3]]
-            processed_workers[("martes", treballador)] = [worker[4], worker[5], worker[6]]
-            processed_workers[("miÃ©rcoles", treballador)] = [worker[7], worker[8], worker[9]]
-            processed_workers[("jueves", treballador)] = [worker[10], worker[11], worker[12]]
-            processed_workers[("viernes", treballador)] = [worker[13], worker[14], worker[15]]
-            
+    Days without an entrada and a sortida (the empty days of the old week) are left out.
 
-            # Append the processed worker data to the list
+    Args:
+        schedule (dict or str): (day, worker) -> [entrada, sortida, hours], times as datetime or 'H:M' text,
+            a str when there is no schedule.
+        **keys: Columns with the same value in every row, like Hub or Setmana.
 
-        except ValueError as e:
-            print(f"Error processing line: {line} - {e}")
-            continue
+    Returns:
+        DataFrame: The keys, Dia, Repartidor, Entrada and Sortida in minutes and Hores.
+    """
+    if isinstance(schedule, str) or not schedule:
+        return pd.DataFrame(columns=list(keys) + WEEK_COLUMNS)
+
+    frame = pd.DataFrame(list(schedule.values()), columns=WEEK_COLUMNS[2:])
+    frame.insert(0, "Dia", [day for day, _ in schedule])
+    frame.insert(1, "Repartidor", [worker for _, worker in schedule])
+    for column in ("Entrada", "Sortida"):
+        times = frame[column] if pd.api.types.is_datetime64_any_dtype(frame[column]) else parse_times(frame[column].astype(str))
+        frame[column] = times.dt.hour * 60 + times.dt.minute
+    frame["Hores"] = pd.to_numeric(frame["Hores"], errors="coerce")
+    for key, value in reversed(keys.items()):
+        frame.insert(0, key, value)
+    return frame[frame["Entrada"].notna() | frame["Sortida"].notna()].reset_index(drop=True)
+
+
+@pipeline_stage
+def diff_weeks(oldWeek, newWeek, keys=(), compact=True):
+    """
+    Changes from oldWeek to newWeek, joined on the keys, the day and the worker.
 
-    # processed_workers = processed_workers.sort_values(by="Aux")
-    # processed_workers = processed_workers.drop("Aux", axis=1)
-    return processed_workers
+    The deltas are the new value minus the old one, in minutes for Entrada and Sortida. Canvi is
+    'Repartidor nou' or 'Repartidor eliminat' when the worker is missing from the whole old or new
+    week (of the same keys), 'Dia nou' or 'Dia eliminat' when only that day is missing and
+    'Horari canviat' when a time or the hours differ.
 
+    Args:
+        oldWeek (DataFrame): Tables of week_frame, any number of weeks or hubs told apart by the keys.
+        newWeek (DataFrame): Tables of week_frame with the same keys.
+        keys (list): Columns besides Dia and Repartidor that identify a row, like Hub or Setmana.
+        compact (bool): Keep only the changed rows.
 
+    Returns:
+        DataFrame: The keys, Dia, Repartidor, the old (Abans) and new values, the deltas and Canvi.
+    """
+    keys = list(keys)
+    both = oldWeek.merge(newWeek, on=keys + ["Dia", "Repartidor"], how="outer", suffixes=(" Abans", ""), indicator=True)
+    inOld = (both["_merge"] != "right_only").to_numpy()
+    inNew = (both["_merge"] != "left_only").to_numpy()
+    riders = both[keys + ["Repartidor"]].assign(inOld=inOld, inNew=inNew).groupby(keys + ["Repartidor"])
+    riderInOld = riders["inOld"].transform("any").to_numpy()
+    riderInNew = riders["inNew"].transform("any").to_numpy()
+
+    changed = np.zeros(len(both), dtype=bool)
+    for column in ("Entrada", "Sortida", "Hores"):
+        before, after = both[column + " Abans"].astype(float), both[column].astype(float)
+        both["Delta " + column] = (after - before).round(1) if column == "Hores" else after - before
+        changed |= ((before != after) & ~(before.isna() & after.isna())).to_numpy()
+
+    both["Canvi"] = np.select([~riderInOld, ~riderInNew, ~inOld, ~inNew, changed], CHANGES, default="")
+    if compact:
+        both = both[both["Canvi"] != ""]
+
+    # Rows in the order of the keys, the days of the week and the workers
+    both = both.assign(_dia=both["Dia"].map({day: i for i, day in enumerate(DIES)}))
+    both = both.sort_values(keys + ["_dia", "Repartidor"], kind="stable")
+    columns = keys + ["Dia", "Repartidor"] + [column + suffix for column in ("Entrada", "Sortida", "Hores") for suffix in (" Abans", "")]
+    return both[columns + ["Delta Entrada", "Delta Sortida", "Delta Hores", "Canvi"]].reset_index(drop=True)
+
+
+def diff_history(history, keys=("Hub",), week="Setmana", compact=True):
+    """
+    Changes of every week of history from the week before it, with a single diff_weeks.
 
+    Args:
+        history (DataFrame): Tables of week_frame of many weeks, with the keys and the week columns.
+        keys (list): Columns of the separate histories, like Hub.
+        week (str): Column of the week, the weeks of each history are compared in sorted order.
+        compact (bool): Keep only the changed rows.
 
+    Returns:
+        DataFrame: diff_weeks of each week against the previous one of its history, the first week is left out.
+    """
+    keys = list(keys)
+    weeks = history[keys + [week]].drop_duplicates().sort_values(keys + [week])
+    following = weeks.groupby(keys)[week] if keys else weeks[week]
+    weeks["_next"] = following.shift(-1)
+    weeks["_first"] = following.transform("min") if keys else weeks[week].min()
+
+    # Each week is moved to the one after it, so it is the old week of that one
+    previous = history.merge(weeks[keys + [week, "_next"]], on=keys + [week]).dropna(subset=["_next"])
+    previous = previous.drop(columns=week).rename(columns={"_next": week})
+    previous[week] = previous[week].astype(history[week].dtype)
+
+    changes = diff_weeks(previous, history, keys + [week], compact)
+    changes = changes.merge(weeks[keys + [week, "_first"]], on=keys + [week], how="left")
+    return changes[changes[week] != changes["_first"]].drop(columns="_first").reset_index(drop=True)
+
+
+def format_changes(changes):
+    """Changes of diff_weeks with the times as 'hh:mm' text and the minute deltas as integers."""
+    changes = changes.copy()
+    for column in ("Entrada Abans", "Entrada", "Sortida Abans", "Sortida"):
+        minutes = changes[column].astype(float)
+        valid = minutes.notna()
+        hours = (minutes[valid] // 60).astype(int).astype(str).str.zfill(2)
+        changes[column] = (hours + ":" + (minutes[valid] % 60).astype(int).astype(str).str.zfill(2)).reindex(changes.index)
+    for column in ("Delta Entrada", "Delta Sortida"):
+        changes[column] = changes[column].astype("Int64")
+    return changes
+
+
+def archive_week(weekSchedule, newWeekSchedule, hipotesi, path=ARCHIVE_PATH):
+    """
+    Add the week to the archive, so the summary of the next week can read it as its old week.
 
-def generate_Excel_File(oldWeekSchedule, newWeekSchedule):
-    for index, row in newWeekSchedule.items():
-        newWeekSchedule[index][0] = newWeekSchedule[index][0].strftime("%H:%M")
-        newWeekSchedule[index][1] = newWeekSchedule[index][1].strftime("%H:%M")
+    Args:
+        weekSchedule (DataFrame): Routes of the week from process_Week_Schedule.
+        newWeekSchedule (dict): Shifts of the week from generate_weekly_schedule.
+        hipotesi (dict): Parameters of the summary.
 
+    Returns:
+        int: Number of the run in the archive.
+    """
+    dates = weekSchedule["Data"].dt.strftime("%Y-%m-%d")
+    days = dict(zip(weekSchedule["Data"].dt.dayofweek.map(dict(enumerate(DIES))), dates))
 
-    
-    workers = set()
-    for index, row in newWeekSchedule.items():
-        if index[1] not in workers:
-            workers.add(index[1])
-   
-    try:        
-        wb = opxl.Workbook()
-    except Exception as e:
-        print(f"Error loading the Excel file: {e}")
-        
-    sheet = wb.active
-    sheet.title = "Horari asdfsadf"
-    
-    row_number = 5
-    sheet.cell(row=3, column=3).value = "Lunes"
-    sheet.cell(row=3, column=6).value = "Martes"
-    sheet.cell(row=3, column=9).value = "miÃ©rcoles"
-    sheet.cell(row=3, column=12).value = "Jueves"
-    sheet.cell(row=3, column=15).value = "Viernes"
-    for i in range(0, 5):
-        sheet.cell(row=4, column=3 + i * 3).value = "Entrada"
-        sheet.cell(row=4, column=4 + i * 3).value = "Sortida"
-        sheet.cell(row=4, column=5 + i * 3).value = "Hores"
+    shifts = week_frame(newWeekSchedule)
+    shifts = pd.DataFrame({"Data": shifts["Dia"].map(days), "Hub": "", "Treballador": shifts["Repartidor"], "Hora Inici Torn": shifts["Entrada"],
+                           "Hora Final Torn": shifts["Sortida"], "Hores Totals": shifts["Hores"]}).dropna()
+
+    sortida, arribada = parse_times(weekSchedule["Hora Sortida"]), parse_times(weekSchedule["Hora Arribada"])
+    routes = pd.DataFrame({"Data": dates, "Hub": "", "Assignació": weekSchedule["Repartidor"],
+                           "Hora Inici Ruta Real": sortida.dt.hour * 60 + sortida.dt.minute,
+                           "Hora Fi Ruta": arribada.dt.hour * 60 + arribada.dt.minute}).dropna()
+    return archive_run("resum", hipotesi, routes, shifts, path=path)
+
+
+def load_week(monday, path=ARCHIVE_PATH):
+    """
+    Shifts of the archived week starting on monday, in the format of process_OldWeek_Schedule.
+
+    Returns:
+        dict: (day, WORKER) -> [entrada, sortida, hours] as text, empty when the week is not archived.
+    """
+    if not os.path.exists(path):
+        return {}
+    monday = pd.Timestamp(monday)
+    shifts = load_table("torns", monday.strftime("%Y-%m-%d"), (monday + pd.Timedelta(days=6)).strftime("%Y-%m-%d"), tool="resum", path=path)
+    days = pd.to_datetime(shifts["Data"]).dt.dayofweek.map(dict(enumerate(DIES)))
+    return {(day, worker): [intToHora(int(entrada)), intToHora(int(sortida)), f"{hours:g}"]
+            for day, worker, entrada, sortida, hours in zip(days, shifts["Treballador"], shifts["Hora Inici Torn"], shifts["Hora Final Torn"],
+                                                             shifts["Hores Totals"])}
+
+
+def week_days(*schedules):
+    """
+    Days of the week grids: lunes to viernes and any other day found in the schedules.
+
+    Returns:
+        list: Day names, in the order of DIES and then in order of appearance.
+    """
+    found = {day: None for schedule in schedules if not isinstance(schedule, str) for day, _ in schedule}
+    days = [day for day in DIES if day in DIES[:5] or day in found]
+    return days + [day for day in found if day not in DIES]
+
+
+def week_header(days):
+    """Two header rows of a week grid: the day names and Entrada, Sortida, Hores under each day."""
+    names = [None, None]
+    columns = [None, None]
+    for day in days:
+        names += [day.capitalize(), None, None]
+        columns += ["Entrada", "Sortida", "Hores"]
+    return [names, columns]
+
+
+def week_grid(schedule, workers, days):
+    """
+    Rows of a week grid, one per worker with its name and the entrada, sortida and hours of each day.
+
+    Args:
+        schedule (dict): (day, worker) -> [entrada, sortida, hours], times as datetime or text.
+        workers (iterable): Workers of the rows, in order.
+        days (list): Days of the columns.
+
+    Returns:
+        list: Rows of values, None for the empty cells.
+    """
+    empty = [None, None, None]
+    rows = []
     for worker in workers:
-        sheet.cell(row=row_number, column=2).value = worker
-        if ("lunes", worker) in newWeekSchedule:
-            sheet.cell(row=row_number, column=3).value = newWeekSchedule[("lunes", worker)][0]
-            sheet.cell(row=row_number, column=4).value = newWeekSchedule[("lunes", worker)][1]
-            sheet.cell(row=row_number, column=5).value = newWeekSchedule[("lunes", worker)][2]
-        if ("martes", worker) in newWeekSchedule:
-            sheet.cell(row=row_number, column=6).value = newWeekSchedule[("martes", worker)][0]
-            sheet.cell(row=row_number, column=7).value = newWeekSchedule[("martes", worker)][1]
-            sheet.cell(row=row_number, column=8).value = newWeekSchedule[("martes", worker)][2]
-        if ("miÃ©rcoles", worker) in newWeekSchedule:
-            sheet.cell(row=row_number, column=9).value = newWeekSchedule[("miÃ©rcoles", worker)][0]
-            sheet.cell(row=row_number, column=10).value = newWeekSchedule[("miÃ©rcoles", worker)][1]
-            sheet.cell(row=row_number, column=11).value = newWeekSchedule[("miÃ©rcoles", worker)][2]
-        if ("jueves", worker) in newWeekSchedule:
-            sheet.cell(row=row_number, column=12).value = newWeekSchedule[("jueves", worker)][0]
-            sheet.cell(row=row_number, column=13).value = newWeekSchedule[("jueves", worker)][1]
-            sheet.cell(row=row_number, column=14).value = newWeekSchedule[("jueves", worker)][2]
-        if ("viernes", worker) in newWeekSchedule:
-            sheet.cell(row=row_number, column=15).value = newWeekSchedule[("viernes", worker)][0]
-            sheet.cell(row=row_number, column=16).value = newWeekSchedule[("viernes", worker)][1]
-            sheet.cell(row=row_number, column=17).value = newWeekSchedule[("viernes", worker)][2]
-        row_number += 1
-
-    row_number += 5
+        row = [None, worker]
+        for day in days:
+            entrada, sortida, hours = schedule.get((day, worker), empty)
+            row += [entrada.strftime("%H:%M") if isinstance(entrada, datetime) else entrada,
+                    sortida.strftime("%H:%M") if isinstance(sortida, datetime) else sortida, hours]
+        rows.append(row)
+    return rows
+
+
+@pipeline_stage
+def generate_Excel_File(oldWeekSchedule, newWeekSchedule, write_only=False, days=None, changes=None):
+    """
+    Write the new and old week schedules to ResumHorari.xlsx.
+
+    Each week is built as a block of rows (two header rows and a row per worker) and appended to the
+    sheet row by row. The old week lists the workers of the new week first and then the ones that
+    only worked the old week. With write_only the sheet is written with openpyxl write-only mode.
+
+    Args:
+        oldWeekSchedule (dict or str): Schedule of process_OldWeek_Schedule, a str when there is no old week.
+        newWeekSchedule (dict): Schedule of generate_weekly_schedule, it is not modified.
+        write_only (bool): Write the sheet with openpyxl write-only mode.
+        days (list): Days of the grids, week_days of both schedules by default.
+        changes (DataFrame): Changes of format_changes, written to a 'Canvis' sheet when given.
+    """
+    if days is None:
+        days = week_days(oldWeekSchedule, newWeekSchedule)
+    workers = list(dict.fromkeys(worker for _, worker in newWeekSchedule))
+
+    rows = [[], []] + week_header(days) + week_grid(newWeekSchedule, workers, days)
     if not isinstance(oldWeekSchedule, str):
-        workersWritten = set()
-
-        sheet.cell(row=row_number-2, column=3).value = "Lunes"
-        sheet.cell(row=row_number-2, column=6).value = "Martes"
-        sheet.cell(row=row_number-2, column=9).value = "miÃ©rcoles"
-        sheet.cell(row=row_number-2, column=12).value = "Jueves"
-        sheet.cell(row=row_number-2, column=15).value = "Viernes"
-        for i in range(0, 5):
-            sheet.cell(row=row_number-1, column=3 + i * 3).value = "Entrada"
-            sheet.cell(row=row_number-1, column=4 + i * 3).value = "Sortida"
-            sheet.cell(row=row_number-1, column=5 + i * 3).value = "Hores"
-        for worker in workers:
-            workersWritten.add(worker)
-            sheet.cell(row=row_number, column=2).value = worker
-            
-            if ("lunes", worker) in oldWeekSchedule:
-                sheet.cell(row=row_number, column=3).value = oldWeekSchedule[("lunes", worker)][0]
-                sheet.cell(row=row_number, column=4).value = oldWeekSchedule[("lunes", worker)][1]
-                sheet.cell(row=row_number, column=5).value = oldWeekSchedule[("lunes", worker)][2]
-            if ("martes", worker) in oldWeekSchedule:
-                sheet.cell(row=row_number, column=6).value = oldWeekSchedule[("martes", worker)][0]
-                sheet.cell(row=row_number, column=7).value = oldWeekSchedule[("martes", worker)][1]
-                sheet.cell(row=row_number, column=8).value = oldWeekSchedule[("martes", worker)][2]
-            if ("miÃ©rcoles", worker) in oldWeekSchedule:
-                sheet.cell(row=row_number, column=9).value = oldWeekSchedule[("miÃ©rcoles", worker)][0]
-                sheet.cell(row=row_number, column=10).value = oldWeekSchedule[("miÃ©rcoles", worker)][1]
-                sheet.cell(row=row_number, column=11).value = oldWeekSchedule[("miÃ©rcoles", worker)][2]
-            if ("jueves", worker) in oldWeekSchedule:
-                sheet.cell(row=row_number, column=12).value = oldWeekSchedule[("jueves", worker)][0]
-                sheet.cell(row=row_number, column=13).value = oldWeekSchedule[("jueves", worker)][1]
-                sheet.cell(row=row_number, column=14).value = oldWeekSchedule[("jueves", worker)][2]
-            if ("viernes", worker) in oldWeekSchedule:
-                sheet.cell(row=row_number, column=15).value = oldWeekSchedule[("viernes", worker)][0]
-                sheet.cell(row=row_number, column=16).value = oldWeekSchedule[("viernes", worker)][1]
-                sheet.cell(row=row_number, column=17).value = oldWeekSchedule[("viernes", worker)][2]
-            row_number += 1
-        
-        for (day, worker), info in oldWeekSchedule.items():
-            if worker not in workersWritten:
-                workersWritten.add(worker)
-                sheet.cell(row=row_number, column=2).value = worker
-                if ("lunes", worker) in oldWeekSchedule:
-                    sheet.cell(row=row_number, column=3).value = oldWeekSchedule[("lunes", worker)][0]
-                    sheet.cell(row=row_number, column=4).value = oldWeekSchedule[("lunes", worker)][1]
-                    sheet.cell(row=row_number, column=5).value = oldWeekSchedule[("lunes", worker)][2]
-                if ("martes", worker) in oldWeekSchedule:
-                    sheet.cell(row=row_number, column=6).value = oldWeekSchedule[("martes", worker)][0]
-                    sheet.cell(row=row_number, column=7).value = oldWeekSchedule[("martes", worker)][1]
-                    sheet.cell(row=row_number, column=8).value = oldWeekSchedule[("martes", worker)][2]
-                if ("miÃ©rcoles", worker) in oldWeekSchedule:
-                    sheet.cell(row=row_number, column=9).value = oldWeekSchedule[("miÃ©rcoles", worker)][0]
-                    sheet.cell(row=row_number, column=10).value = oldWeekSchedule[("miÃ©rcoles", worker)][1]
-                    sheet.cell(row=row_number, column=11).value = oldWeekSchedule[("miÃ©rcoles", worker)][2]
-                if ("jueves", worker) in oldWeekSchedule:
-                    sheet.cell(row=row_number, column=12).value = oldWeekSchedule[("jueves", worker)][0]
-                    sheet.cell(row=row_number, column=13).value = oldWeekSchedule[("jueves", worker)][1]
-                    sheet.cell(row=row_number, column=14).value = oldWeekSchedule[("jueves", worker)][2]
-                if ("viernes", worker) in oldWeekSchedule:
-                    sheet.cell(row=row_number, column=15).value = oldWeekSchedule[("viernes", worker)][0]
-                    sheet.cell(row=row_number, column=16).value = oldWeekSchedule[("viernes", worker)][1]
-                    sheet.cell(row=row_number, column=17).value = oldWeekSchedule[("viernes", worker)][2]
-                row_number += 1
-                
+        newWorkers = set(workers)
+        oldWorkers = workers + [worker for worker in dict.fromkeys(worker for _, worker in oldWeekSchedule) if worker not in newWorkers]
+        rows += [[], [], []] + week_header(days) + week_grid(oldWeekSchedule, oldWorkers, days)
+
+    wb = opxl.Workbook(write_only=write_only)
+    if write_only:
+        sheet = wb.create_sheet("Horari asdfsadf")
+    else:
+        sheet = wb.active
+        sheet.title = "Horari asdfsadf"
+    for row in rows:
+        # A regular sheet creates a cell for every value of a list, the empty ones are left out
+        sheet.append(row if write_only else {column: value for column, value in enumerate(row, 1) if value is not None})
+
+    if changes is not None:
+        sheet = wb.create_sheet("Canvis")
+        sheet.append(list(changes.columns))
+        for row in changes.astype(object).where(changes.notna(), None).itertuples(index=False):
+            sheet.append(list(row))
     wb.save("ResumHorari.xlsx")
 
 
@@ -332,12 +460,34 @@ def executarResumHoraris():
     hipotesi = process_User_Input()
     weekSchedule = st.text_area("Horari de la setmana")
     oldWeekSchedule = st.text_area("Horari de la setmana anterior")
+    debug = st.checkbox("Mostrar temps per etapa")
     if weekSchedule != "":
-        if oldWeekSchedule != "":
-            oldWeekSchedule = process_OldWeek_Schedule(oldWeekSchedule)
-        weekSchedule = process_Week_Schedule(weekSchedule, hipotesi)     
-        newWeekSchedule = generate_weekly_schedule(weekSchedule, hipotesi)
-        generate_Excel_File(oldWeekSchedule, newWeekSchedule)
+        archived = False
+        with PipelineProfile(memory=debug) as profile:
+            if oldWeekSchedule != "":
+                oldWeekSchedule = process_OldWeek_Schedule(oldWeekSchedule)
+            weekSchedule = process_Week_Schedule(weekSchedule, hipotesi)     
+            if oldWeekSchedule == "" and not weekSchedule.empty:
+                # Without a pasted old week, the week before is read from the archive
+                firstDay = weekSchedule["Data"].min()
+                oldWeekSchedule = load_week(firstDay.normalize() - pd.Timedelta(days=firstDay.dayofweek + 7)) or ""
+                archived = oldWeekSchedule != ""
+            newWeekSchedule = generate_weekly_schedule(weekSchedule, hipotesi)
+            changes = None
+            if oldWeekSchedule != "":
+                changes = format_changes(diff_weeks(week_frame(oldWeekSchedule), week_frame(newWeekSchedule)))
+            generate_Excel_File(oldWeekSchedule, newWeekSchedule, changes=changes)
+        logger.info(profile.log_line())
+        if debug:
+            display_profile(profile)
+        if archived:
+            st.write("Setmana anterior llegida de l'arxiu")
+        if changes is not None:
+            st.write(f"Canvis respecte la setmana anterior: {len(changes)}")
+            st.dataframe(changes, hide_index=True)
+        if st.button("Desar la setmana a l'arxiu"):
+            run = archive_week(weekSchedule, newWeekSchedule, hipotesi)
+            st.write(f"Setmana desada a l'arxiu (execució {run})")
         with open("ResumHorari.xlsx", "rb") as file:
                     st.download_button(
                         label='Descarregar Fitxer Excel',
@@ -1,8 +1,12 @@
+import logging
+
 import streamlit as st
 from horariSumary import *
 from generadorHoraris import * 
 
 def main():
+    # The pipeline lines of every run go to the console, as JSON
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     st.set_page_config(layout="wide")
     st.sidebar.title('Menu')
     app_mode = st.sidebar.selectbox('Choose the app mode', ['Generador Horaris', 'Horari Sumary'])
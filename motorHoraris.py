@@ -0,0 +1,2177 @@
+import pandas as pd
+import numpy as np
+import json
+import os
+import io
+import importlib.util
+import csv
+import random
+import re
+import time
+import tracemalloc
+import cProfile
+import pstats
+from functools import wraps
+from operator import itemgetter
+from typing import NamedTuple
+from copy import copy
+from datetime import datetime
+from bisect import bisect_left, bisect_right, insort
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+from contextvars import ContextVar
+
+
+def intToHora(minutes):
+    """Convert minutes into a 'hh:mm' formatted string."""
+    hours = minutes // 60
+    mins = minutes % 60
+    return f"{hours:02}:{mins:02}"
+
+
+def horaToInt(time_str):
+    """Convert a 'hh:mm' formatted string into total minutes."""
+    try:
+        hours, minutes = map(int, time_str.split(':'))
+        return hours * 60 + minutes
+    except ValueError:
+        raise ValueError("Input must be in 'hh:mm' format and contain valid integers.")
+    except IndexError:
+        raise ValueError("Input must be in 'hh:mm' format.")
+
+
+PROFILERS = ("cprofile", "pyinstrument")
+# PipelineProfile that records the stages, while it is open. Each Streamlit session runs on its own
+# thread (and context), so a profile only records the stages of the run that opened it
+activeProfile = ContextVar("activeProfile", default=None)
+
+
+class PipelineProfile:
+    """
+    Wall time, peak memory and rows of the stages run while the profile is open.
+
+        with PipelineProfile(memory=True) as profile:
+            generate_schedule(...)
+        print(profile.log_line())
+
+    The stages are the functions decorated with pipeline_stage. The peak memory is measured
+    with tracemalloc, which slows the run down, so it is only kept with memory. With profiler
+    ('cprofile' or 'pyinstrument', if installed) the whole run is also profiled, see report.
+    """
+
+    def __init__(self, memory=False, profiler=None):
+        if profiler not in (None,) + PROFILERS:
+            raise ValueError(f"Unknown profiler: {profiler}")
+        self.memory = memory
+        self.profiler = profiler
+        self.stages = []  # stage, seconds, peak_kb and rows of every stage, in the order they end
+        self.peaks = []  # [traced memory at the start, peak so far] of the open stages
+        self.seconds = None
+
+    def __enter__(self):
+        self.token = activeProfile.set(self)
+        self.startedTracing = self.memory and not tracemalloc.is_tracing()
+        if self.startedTracing:
+            tracemalloc.start()
+        if self.profiler == "cprofile":
+            self.profilerRun = cProfile.Profile()
+            self.profilerRun.enable()
+        elif self.profiler == "pyinstrument":
+            from pyinstrument import Profiler
+            self.profilerRun = Profiler()
+            self.profilerRun.start()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.seconds = round(time.perf_counter() - self.start, 6)
+        if self.profiler == "cprofile":
+            self.profilerRun.disable()
+        elif self.profiler == "pyinstrument":
+            self.profilerRun.stop()
+        if self.startedTracing:
+            tracemalloc.stop()
+        activeProfile.reset(self.token)
+        return False
+
+    def run_stage(self, stage, function, args, kwargs):
+        """Call function as a stage and record it."""
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.peaks: #the peak of the stage that calls this one is kept before it is reset
+                self.peaks[-1][1] = max(self.peaks[-1][1], peak)
+            tracemalloc.reset_peak()
+            self.peaks.append([current, current])
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peakKb = None
+            if self.memory:
+                startMemory, peak = self.peaks.pop()
+                peak = max(peak, tracemalloc.get_traced_memory()[1])
+                peakKb = round((peak - startMemory) / 1024, 1)
+                if self.peaks:
+                    self.peaks[-1][1] = max(self.peaks[-1][1], peak)
+        self.stages.append({"stage": stage, "seconds": round(seconds, 6), "peak_kb": peakKb, "rows": stage_rows(result, args)})
+        return result
+
+    def table(self):
+        """The recorded stages as a table."""
+        return pd.DataFrame(self.stages, columns=["stage", "seconds", "peak_kb", "rows"])
+
+    def log_line(self):
+        """The recorded stages as a JSON line, for the logs."""
+        return json.dumps({"event": "pipeline", "date": datetime.now().isoformat(timespec="seconds"), "seconds": self.seconds,
+                           "stages": self.stages}, ensure_ascii=False)
+
+    def report(self, limit=30):
+        """Text report of the profiler, the limit functions with the most cumulative time for cProfile."""
+        if self.profiler == "cprofile":
+            output = io.StringIO()
+            pstats.Stats(self.profilerRun, stream=output).sort_stats("cumulative").print_stats(limit)
+            return output.getvalue()
+        if self.profiler == "pyinstrument":
+            return self.profilerRun.output_text()
+        return ""
+
+
+def stage_rows(result, args):
+    """Rows of a stage: of the table it returns, or of the largest table it is given when it returns none."""
+    if isinstance(result, tuple) and result:
+        result = result[0]
+    if isinstance(result, (pd.DataFrame, dict)):
+        return len(result)
+    sizes = [len(arg) for arg in args if isinstance(arg, (pd.DataFrame, dict))]
+    return max(sizes) if sizes else None
+
+
+def pipeline_stage(function):
+    """Record the calls to function as a stage of the open PipelineProfile, if there is one."""
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        profile = activeProfile.get()
+        if profile is None:
+            return function(*args, **kwargs)
+        return profile.run_stage(function.__name__, function, args, kwargs)
+    return wrapper
+
+
+ROUTE_COLUMNS = ["Id", "Prioritari", "Tipus Bici", "Pes", "Data", "Hub", "Hora Inici Ruta Plnif",
+                 "Hora Inici Ruta Real", "Hora Fi Ruta", "Inici Seguent Ruta",
+                 "Temps Recorregut Ruta", "Temps Total Ruta", "Num Entregues", "Assignació", "Assignacio Prov", "order", "Plnif vs Real Min"]
+
+
+def convert_column(values, convert, dtype=float):
+    """
+    Apply convert to a column, calling it once per distinct value.
+
+    Values for which convert raises a ValueError are returned as NaN.
+    """
+    codes, uniques = pd.factorize(values)
+    converted = []
+    for value in uniques:
+        try:
+            converted.append(convert(value))
+        except ValueError:
+            converted.append(np.nan)
+    return pd.Series(np.asarray(converted, dtype=dtype)[codes], index=values.index)
+
+
+@pipeline_stage
+def process_routes(routes_table, time_for_delivery, pes_trike):
+    """
+    Processes route data, calculates arrival times, and creates a table of processed routes.
+
+    The pasted block is read into columns in one pass, with the layout (14, 15 or 16 columns)
+    detected once for all the lines that share it.
+
+    Args:
+        routes_table (str): String containing the routes data.
+        time_for_delivery (int): paquets for delivery time.
+        pes_trike (int): Maximum weight of a route done with a TRIKE.
+
+    Returns:
+        DataFrame: Processed routes with the ROUTE_COLUMNS columns, in the pasted order.
+        Times are kept in minutes until they are displayed (see format_times).
+    """
+
+    lines = pd.Series([line for line in routes_table.splitlines() if line.strip()], dtype=object)
+    numberOfColumns = pd.Series([line.count("\t") + 1 for line in lines], index=lines.index, dtype=int)
+
+    for line in lines[~numberOfColumns.isin([14, 15, 16])]:
+        print(f"Warning: Unexpected line format: {line}")
+
+    processed_routes = []
+    for columns, layoutLines in lines.groupby(numberOfColumns):
+        if columns not in (14, 15, 16):
+            continue
+        # Read the columns with the layout of the lines
+        parche = columns - 15
+        usedColumns = [0, 2 + parche, 3 + parche, 6 + parche, 9 + parche, 10 + parche, 12 + parche]
+        route_elements = pd.read_csv(io.StringIO("\n".join(layoutLines)), sep="\t", header=None, usecols=sorted(set(usedColumns)),
+                                     dtype=str, na_filter=False, quoting=csv.QUOTE_NONE, skip_blank_lines=False)
+        route_elements.index = layoutLines.index
+
+        # Convert times and distances
+        departure_time = convert_column(route_elements[3 + parche], horaToInt)
+        delivery_time = convert_column(route_elements[6 + parche], int)
+        paquets = convert_column(route_elements[12 + parche], int)
+        weight = convert_column(route_elements[9 + parche], int)
+
+        valid = departure_time.notna() & delivery_time.notna() & paquets.notna() & weight.notna()
+        for line in layoutLines[~valid]:
+            print(f"Error processing line: {line} - Invalid time or number")
+        route_elements = route_elements[valid]
+        departure_time = departure_time[valid].astype(int)
+        delivery_time = delivery_time[valid].astype(int)
+        paquets = paquets[valid].astype(int)
+        weight = weight[valid].astype(int)
+
+        if parche == 1:
+            delivery_time -= (paquets * 7)
+        arrival_time = departure_time + delivery_time + paquets * time_for_delivery
+
+        processed_routes.append(pd.DataFrame({
+            "Id": route_elements[0],  # Route identifier
+            "Prioritari": route_elements[0].str.lower().str.contains(" w ", regex=False),  # Priority flag
+            "Tipus Bici": np.where(weight <= pes_trike, "TRIKE", "4W"),  # Bike type
+            "Pes": weight,  # Weight
+            "Data": route_elements[2 + parche],  # Route detail
+            "Hub": route_elements[10 + parche],  # Additional detail
+            "Hora Inici Ruta Plnif": departure_time.astype(np.int32),  # Departure time in minutes
+            "Hora Inici Ruta Real": np.int32(0),  # Placeholder
+            "Hora Fi Ruta": arrival_time.astype(np.int32),  # Arrival time in minutes
+            "Inici Seguent Ruta": np.int32(0),  # Placeholder
+            "Temps Recorregut Ruta": delivery_time,  # Delivery time
+            "Temps Total Ruta": 0,  # Placeholder
+            "Num Entregues": paquets,  # paquets
+            "Assignació": '',  # Placeholder
+            "Assignacio Prov": "",  # Placeholder
+            "order": departure_time,  # Departure time in minutes
+            "Plnif vs Real Min": 0  # Placeholder
+        }, columns=ROUTE_COLUMNS))
+
+    if not processed_routes:
+        return pd.DataFrame(columns=ROUTE_COLUMNS)
+    return pd.concat(processed_routes).sort_index().reset_index(drop=True)
+
+
+@pipeline_stage
+def process_workers(workers_table, week_day):
+    """
+    Processes worker data to extract and format relevant information based on the day of the week.
+
+    Args:
+        workers_table (str): String containing the worker data.
+        week_day (int): Day of the week (0-6, where 0 is Monday).
+
+    Returns:
+        list: List of processed worker data.
+    """
+
+    # Initialize an empty list to store processed worker data
+    processed_workers = []
+
+    # Calculate the column index for the day's data
+    index = week_day * 3 + 1
+
+    # Process each line in the workers table
+    for line in workers_table.splitlines():
+        if not line.strip():
+            continue  # Skip empty lines
+
+        worker = re.split(r"\t", line)
+
+        if not re.match(r'^\d+:\d+$',worker[index]):
+            continue
+
+        try:
+            # Convert start time to minutes
+            start_time_in_minutes = horaToInt(worker[index])
+
+            # Convert hours worked from comma to period for float conversion
+            hours_worked = float(worker[index + 2].replace(",", "."))
+
+            # Append the processed worker data to the list
+            processed_workers.append([
+                worker[0],  # Worker ID or Name
+                worker[index],  # Start time
+                worker[index + 1],  # End time
+                hours_worked,  # Hours worked
+                start_time_in_minutes  # Start time in minutes
+            ])
+        except ValueError as e:
+            print(f"Error processing line: {line} - {e}")
+            continue
+    processed_workers = pd.DataFrame(processed_workers, columns=["Treballador", "Entrada", "Sortida", "Hores", "Aux"])
+    processed_workers = processed_workers.sort_values(by="Aux")
+    processed_workers = processed_workers.drop("Aux", axis=1)
+    return processed_workers
+
+
+TIME_COLUMNS = ["Hora Inici Ruta Plnif", "Hora Inici Ruta Real", "Hora Fi Ruta", "Inici Seguent Ruta",
+                "Hora Inici Torn", "Hora Final Torn", "Inici Ruta", "Fi Ruta"]
+
+
+def format_times(df):
+    """Copy of a table with its time columns, kept in minutes by the scheduler, formatted as 'hh:mm'."""
+    df = df.copy()
+    for column in TIME_COLUMNS:
+        if column in df:
+            df[column] = convert_column(df[column], intToHora, object)
+    return df
+
+
+class TimelineStop(NamedTuple):
+    """Route in the timeline of a worker, times in minutes."""
+    route: str  # first part of the route Id
+    start: int
+    end: int  # end of the route, plus the 10 minutes to leave the bike once the worker has a next route
+    wait: object  # minutes waited since the previous route, '' for the first route of the shift
+
+
+class Shift:
+    """Shift of a worker of a hub, extended as it gets routes."""
+    __slots__ = ("hub", "worker", "start", "end", "hours")
+    COLUMNS = ["Hub", "worker", "Hora Inici Torn", "Hora Final Torn", "Hores Totals"]
+
+    def __init__(self, hub, worker, start, end):
+        self.hub = hub
+        self.worker = worker
+        self.start = start
+        self.extend(end)
+
+    def extend(self, end):
+        """Move the end of the shift and update its hours."""
+        self.end = end
+        self.hours = round((end - self.start)/60,1)
+
+    def row(self):
+        """The shift as a row of COLUMNS."""
+        return (self.hub, self.worker, self.start, self.end, self.hours)
+
+
+class RouteTable:
+    """
+    The routes of a hub as parallel lists, in the order they are assigned.
+
+    The assignment loop reads the routes one by one, plain lists are much cheaper to index
+    than the rows of the DataFrame.
+    """
+    __slots__ = ("ids", "bikeTypes", "expectedTimes", "earlyTimes", "lateTimes", "durations")
+
+    def __init__(self, ids, bikeTypes, expectedTimes, earlyTimes, lateTimes, durations):
+        self.ids = ids  # first part of the route Id
+        self.bikeTypes = bikeTypes
+        self.expectedTimes = expectedTimes  # planned start
+        self.earlyTimes = earlyTimes  # earliest start
+        self.lateTimes = lateTimes  # latest start
+        self.durations = durations  # time to complete the route, deliveries included
+
+    @classmethod
+    def from_frame(cls, dfj, timeForDelivery, earlyMarginPriority, delayedMarginPriority, earlyMarginNoPriority, delayedMarginNoPriority):
+        """Read the routes of a table sorted in assignment order, priority routes have their own margins."""
+        priorities = dfj["Prioritari"].tolist()
+        expectedTimes = dfj["Hora Inici Ruta Plnif"].tolist()
+        return cls([routeId.split()[0] for routeId in dfj["Id"]],
+                   dfj["Tipus Bici"].tolist(),
+                   expectedTimes,
+                   [expectedTime - (earlyMarginPriority if priority else earlyMarginNoPriority) for expectedTime, priority in zip(expectedTimes, priorities)],
+                   [expectedTime + (delayedMarginPriority if priority else delayedMarginNoPriority) for expectedTime, priority in zip(expectedTimes, priorities)],
+                   (dfj["Temps Recorregut Ruta"] + dfj["Num Entregues"] * timeForDelivery).tolist())
+
+    def __len__(self):
+        return len(self.ids)
+
+    def subset(self, positions):
+        """Table with the routes at positions."""
+        return RouteTable(*[[values[i] for i in positions] for values in
+                            (self.ids, self.bikeTypes, self.expectedTimes, self.earlyTimes, self.lateTimes, self.durations)])
+
+
+def format_stop(stop):
+    """Format the stop data into a readable string."""
+    return (f"id: {stop.route[8:]} de {intToHora(stop.start)} a {intToHora(stop.end)} "
+            f"Temps d'espera (min): {stop.wait}")
+
+
+def load_data(file_path, default_data=None):
+    """Load data from a JSON file."""
+    if default_data is None:
+        default_data = {
+            "Temps Inici Torn": 12,
+            "Temps Fi Torn": 5,
+            "Temps Per paquet": 7,
+            "Temps entre rutes": 10,
+            "Marge abans - W": 10,
+            "Marge despres - W": 5,
+            "Marge abans - No W": 25,
+            "Marge despres - No W": 15,
+            "Temps maxim espera": 20,
+            "Marge primera ruta torn": 10,
+            "Maxim Hores Global": 9,
+            "Flexibilitat +6": 0.10,
+            "Flexibilitat +4": 0.20,
+            "Flexibilitat -4": 0.20,
+            "Pes Trike": 120
+        }
+
+    if not os.path.exists(file_path):
+        print(f"File not found: {file_path}. Using default data.")
+        return default_data
+
+    try:
+        with open(file_path, 'r') as file:
+            return json.load(file)
+    except (json.JSONDecodeError, IOError) as e:
+        print(f"Error reading file {file_path}: {e}. Using default data.")
+        return default_data
+
+
+def save_data(data, file_path):
+    """Save data to a JSON file."""
+    try:
+        with open(file_path, 'w') as file:
+            json.dump(data, file, indent=4)
+        print(f"Data successfully saved to {file_path}.")
+        return True
+    except (IOError, TypeError) as e:
+        print(f"Error saving data to {file_path}: {e}.")
+        return False
+
+class WorkerAvailabilityIndex:
+    """
+    Per-hub index of the active workers, sorted by the time they are free for a new route.
+
+    Keeps the first-fit order of the workers dict: among the workers whose free time falls
+    inside the window of a route, the one that was added first gets it. The window is found
+    with a binary search, O(log n), and only its k workers are then sorted by insertion rank,
+    O(k log k). A structure ordered by rank as well was tried and was slower: most workers of
+    a window are turned down for lack of hours, and each of them costs a tree update.
+    """
+
+    def __init__(self, workers=None):
+        self.freeTimes = {}  # hub -> sorted list of (free time, insertion rank, worker)
+        self.entries = {}  # worker -> (hub, free time, insertion rank)
+        for worker, value in (workers or {}).items():
+            self.add(worker, value[0], value[2])
+
+    def add(self, worker, freeTime, hub):
+        """Add a new worker to the index of its hub."""
+        entry = (freeTime, len(self.entries), worker)
+        self.entries[worker] = (hub, freeTime, entry[1])
+        insort(self.freeTimes.setdefault(hub, []), entry)
+
+    def update(self, worker, freeTime):
+        """Move a worker to its new free time."""
+        hub, oldFreeTime, rank = self.entries[worker]
+        hubFreeTimes = self.freeTimes[hub]
+        del hubFreeTimes[bisect_left(hubFreeTimes, (oldFreeTime, rank, worker))]
+        insort(hubFreeTimes, (freeTime, rank, worker))
+        self.entries[worker] = (hub, freeTime, rank)
+
+    def first_fit(self, hub, minFreeTime, maxFreeTime, hasHoursLeft):
+        """
+        Find the first added worker of the hub with minFreeTime < free time < maxFreeTime
+        that still has hours left for the route.
+
+        The workers of the window are sorted by insertion rank, then tried in that order.
+
+        Returns:
+            The worker, or None if no worker fits.
+        """
+        for _, _, worker in sorted(self.candidates(hub, minFreeTime, maxFreeTime), key=itemgetter(1)):
+            if hasHoursLeft(worker):
+                return worker
+        return None
+
+    def candidates(self, hub, minFreeTime, maxFreeTime):
+        """(free time, insertion rank, worker) of the workers of the hub with minFreeTime < free time < maxFreeTime."""
+        hubFreeTimes = self.freeTimes.get(hub, [])
+        start = bisect_right(hubFreeTimes, (minFreeTime, float("inf")))
+        end = bisect_left(hubFreeTimes, (maxFreeTime, -1))
+        return hubFreeTimes[start:end]
+
+
+class FleetAllocator:
+    """
+    Bikes (TRIKE and 4W) used by the routes of one hub.
+
+    Each bike type keeps its bikes sorted by release time, so the bike free for a route is
+    found with a binary search. The route takes the bike released last before it starts,
+    leaving the earlier ones for routes that start earlier. A new bike is added only when
+    none is free, so the number of bikes created is the minimum fleet for the hub.
+    """
+
+    def __init__(self):
+        self.releaseTimes = {"TRIKE": [], "4W": []}  # bike type -> sorted list of (release time, bike)
+        self.usages = {"TRIKE": [], "4W": []}  # bike type -> (start, release) of every route
+        self.bikes = {"TRIKE": 0, "4W": 0}  # bike type -> number of bikes in the fleet
+
+    def allocate(self, bikeType, routeStartTime, releaseTime):
+        """
+        Assign a bike of the given type from routeStartTime to releaseTime.
+
+        Returns:
+            int: Index of the bike assigned to the route.
+        """
+        releaseTimes = self.releaseTimes[bikeType]
+        self.usages[bikeType].append((routeStartTime, releaseTime))
+        position = bisect_right(releaseTimes, (routeStartTime, float("inf")))
+        if position > 0:
+            _, bike = releaseTimes.pop(position - 1)
+        else:
+            bike = self.bikes[bikeType]
+            self.bikes[bikeType] += 1
+        insort(releaseTimes, (releaseTime, bike))
+        return bike
+
+    def fleet_size(self, bikeType):
+        """Number of bikes of the given type needed by the hub."""
+        return self.bikes[bikeType]
+
+    def peak_usage(self, bikeType):
+        """Maximum number of bikes of the given type in use at the same time."""
+        events = sorted([(start, 1) for start, _ in self.usages[bikeType]] + [(release, -1) for _, release in self.usages[bikeType]])
+        peak = inUse = 0
+        for _, change in events:
+            inUse += change
+            peak = max(peak, inUse)
+        return peak
+
+
+class RosterIndex:
+    """
+    Workers of the roster of one hub, sorted by the time they are free for a new route.
+
+    A roster worker is free from the start of its shift plus the time to start a shift, and can
+    take any route that ends, with the time to end a shift, before the end of its shift. Unlike
+    the extra workers its shift is fixed, so it has no maximum wait between routes. Routes are
+    dispatched in departure order, each lookup is a binary search on the free times followed by
+    a scan of the workers next to that position, see dispatch.
+    """
+
+    def __init__(self, roster, timeToStartShift, timeToEndShift):
+        self.timeToEndShift = timeToEndShift
+        self.names = roster["Treballador"].tolist()
+        self.startShifts = [horaToInt(hora) for hora in roster["Entrada"]]
+        self.endShifts = [horaToInt(hora) for hora in roster["Sortida"]]
+        self.hours = roster["Hores"].tolist()
+        self.freeTimes = sorted((start + timeToStartShift, worker, worker) for worker, start in enumerate(self.startShifts))  # sorted list of (free time, rank, worker)
+        self.used = set()
+
+    def dispatch(self, earlyTime, lateTime, timeToCompleteRoute, timeBetweenRoutes, horizon):
+        """
+        Assign a route that can start between earlyTime and lateTime to a roster worker.
+
+        The worker free last before earlyTime takes it, so the route leaves on time and the workers
+        free earlier keep their place, otherwise the first worker free before lateTime. Workers whose
+        shift ends before horizon, the earliest start of this and the next routes, are dropped.
+
+        A lookup is O(log n + k), k being the workers free before lateTime that are scanned because
+        their shift ends too early for this route. Dropped workers are only scanned once, so k is
+        small unless many workers are free by lateTime and their shifts are too short for the route.
+
+        Returns:
+            tuple: (worker, route start time), or None if no roster worker can take the route.
+        """
+        position = bisect_right(self.freeTimes, (earlyTime, float("inf")))
+        k = position - 1
+        while k >= 0:
+            freeTime, rank, worker = self.freeTimes[k]
+            if self.endShifts[worker] - self.timeToEndShift <= horizon:
+                del self.freeTimes[k]
+                position -= 1
+            elif earlyTime + timeToCompleteRoute + self.timeToEndShift <= self.endShifts[worker]:
+                return self.take(k, earlyTime, timeToCompleteRoute, timeBetweenRoutes)
+            k -= 1
+
+        end = bisect_left(self.freeTimes, (lateTime, -1))
+        for k in range(position, end):
+            freeTime, rank, worker = self.freeTimes[k]
+            if freeTime + timeToCompleteRoute + self.timeToEndShift <= self.endShifts[worker]:
+                return self.take(k, freeTime, timeToCompleteRoute, timeBetweenRoutes)
+        return None
+
+    def take(self, position, routeStartTime, timeToCompleteRoute, timeBetweenRoutes):
+        """Move the worker at position of freeTimes to the end of the route that starts at routeStartTime."""
+        _, rank, worker = self.freeTimes.pop(position)
+        insort(self.freeTimes, (routeStartTime + timeToCompleteRoute + timeBetweenRoutes, rank, worker))
+        self.used.add(worker)
+        return worker, routeStartTime
+
+
+ASSIGNMENT_ENGINES = ("greedy", "optimal")
+ASSIGNMENT_TIME_BUDGET = 2.0  # seconds given to the optimal engine for all the hubs
+# weights of the cost minimized by ShiftPlanner.improve, in minutes: per worker, per minute of shift,
+# per minute waited between routes and per bike of the peak number of bikes in use
+LOCAL_SEARCH_WEIGHTS = {"workers": 60, "hours": 1, "wait": 0.5, "bikes": 30}
+
+
+def maximum_matching(adjacency, numberOfRight, deadline):
+    """
+    Maximum matching of a bipartite graph (Hopcroft-Karp).
+
+    Args:
+        adjacency (list): Right vertices joined to each left vertex.
+        numberOfRight (int): Number of right vertices.
+        deadline (float): time.perf_counter() value after which the search is abandoned.
+
+    Returns:
+        list: Right vertex matched to each left vertex, -1 if unmatched, or None if the deadline is reached.
+    """
+    matchLeft = [-1] * len(adjacency)
+    matchRight = [-1] * numberOfRight
+    while True:
+        #layers of the shortest augmenting paths, from the unmatched left vertices
+        distances = [-1] * len(adjacency)
+        queue = [u for u in range(len(adjacency)) if matchLeft[u] == -1]
+        for u in queue:
+            distances[u] = 0
+        found = False
+        for u in queue:
+            for v in adjacency[u]:
+                w = matchRight[v]
+                if w == -1:
+                    found = True
+                elif distances[w] == -1:
+                    distances[w] = distances[u] + 1
+                    queue.append(w)
+        if not found:
+            return matchLeft
+
+        #augment along vertex disjoint shortest paths, the last right vertex tried from each left vertex is the next step of the path
+        positions = [0] * len(adjacency)
+        for root in range(len(adjacency)):
+            if matchLeft[root] != -1:
+                continue
+            stack = [root]
+            while stack:
+                u = stack[-1]
+                if positions[u] == len(adjacency[u]):
+                    distances[u] = -1
+                    stack.pop()
+                    continue
+                v = adjacency[u][positions[u]]
+                positions[u] += 1
+                w = matchRight[v]
+                if w == -1:
+                    for u in stack:
+                        v = adjacency[u][positions[u] - 1]
+                        matchLeft[u] = v
+                        matchRight[v] = u
+                    break
+                if distances[w] == distances[u] + 1:
+                    stack.append(w)
+        if time.perf_counter() > deadline:
+            return None
+
+
+class ShiftPlanner:
+    """
+    Assignment of the routes of one hub to as few workers as possible, then to the fewest hours.
+
+    The routes are taken in departure order with the rules of calculate_worker_availability: a
+    worker can take a route when it is free inside the route window, has not been waiting longer
+    than the maximum wait and has hours left, and starts it at max(free time, earliest start).
+    Only the choice among the workers that can take each route changes. Several choice rules, one
+    guided by a minimum path cover of the routes, and random variations of them are run until the
+    time budget ends, and the best plan is kept. The path cover, which ignores the hours limit and
+    lets every route start anywhere in its window, gives a lower bound on the number of workers.
+    """
+
+    def __init__(self, earlyTimes, lateTimes, expectedInitialTimes, timesToCompleteRoute, timeBetweenRoutes,
+                 timeToStartShift, timeToEndShift, maxWaitTimeBetweenRoutes, firstRouteMaxEarlyDepartureTime, maxHours):
+        self.earlyTimes = earlyTimes
+        self.lateTimes = lateTimes
+        self.expectedInitialTimes = expectedInitialTimes
+        self.timesToCompleteRoute = timesToCompleteRoute
+        self.timeBetweenRoutes = timeBetweenRoutes
+        self.timeToStartShift = timeToStartShift
+        self.timeToEndShift = timeToEndShift
+        self.maxWait = maxWaitTimeBetweenRoutes
+        self.firstRouteMaxEarly = firstRouteMaxEarlyDepartureTime
+        self.maxHours = maxHours  # worker number -> maximum hours of its shift
+
+    def simulate(self, choose):
+        """
+        Assign the routes in order, choose(i, candidates, hours, lastRoutes) picks the worker of route i.
+
+        candidates are the (free time, worker, worker) entries of the workers that can take the route,
+        hours and lastRoutes the current hours and last route of every worker. choose returns one of the
+        candidate workers, or None to add a new worker. Workers are numbered in the order they are added.
+
+        Returns:
+            tuple: plan (worker of each route) and hours of each worker.
+        """
+        availability = WorkerAvailabilityIndex()
+        freeTimes, shiftStarts, hours, lastRoutes, plan = [], [], [], [], []
+        for i, timeToCompleteRoute in enumerate(self.timesToCompleteRoute):
+            candidates = [entry for entry in availability.candidates(None, self.earlyTimes[i] - self.maxWait, self.lateTimes[i])
+                          if hours[entry[2]] + timeToCompleteRoute/60 <= self.maxHours(entry[2])]
+            worker = choose(i, candidates, hours, lastRoutes) if candidates else None
+            if worker is None:
+                worker = len(freeTimes)
+                routeStartTime = self.expectedInitialTimes[i] - self.firstRouteMaxEarly
+                shiftStarts.append(routeStartTime - self.timeToStartShift)
+                freeTimes.append(routeStartTime + timeToCompleteRoute + self.timeBetweenRoutes)
+                hours.append(0)
+                lastRoutes.append(i)
+                availability.add(worker, freeTimes[worker], None)
+            else:
+                routeStartTime = max(freeTimes[worker], self.earlyTimes[i])
+                freeTimes[worker] = routeStartTime + timeToCompleteRoute + self.timeBetweenRoutes
+                lastRoutes[worker] = i
+                availability.update(worker, freeTimes[worker])
+            hours[worker] = round((routeStartTime + timeToCompleteRoute + self.timeToEndShift - shiftStarts[worker])/60, 1)
+            plan.append(worker)
+        return plan, hours
+
+    def greedy(self):
+        """Plan of the greedy engine: each route goes to the first added worker that can take it."""
+        return self.simulate(lambda i, candidates, hours, lastRoutes: min(candidates, key=lambda entry: entry[1])[2])
+
+    def lower_bound(self, deadline):
+        """
+        Minimum number of workers if every route could start anywhere in its window and shifts had no hour limit.
+
+        It is the number of routes minus a maximum matching between the routes and the routes that can
+        follow them (minimum path cover).
+
+        Returns:
+            tuple: lower bound and the route that follows each route in the path cover (-1 for the last
+            route of a worker), or (None, None) if the deadline is reached.
+        """
+        numberOfRoutes = len(self.timesToCompleteRoute)
+        earlyTimes = np.asarray(self.earlyTimes)
+        lateTimes = np.asarray(self.lateTimes)
+        firstStartTimes = np.asarray(self.expectedInitialTimes) - self.firstRouteMaxEarly
+        busyTimes = np.asarray(self.timesToCompleteRoute) + self.timeBetweenRoutes
+        #earliest and latest time at which each route can leave its worker free
+        minFreeTimes = np.minimum(firstStartTimes, earlyTimes) + busyTimes
+        maxFreeTimes = np.maximum(firstStartTimes, lateTimes - 1) + busyTimes
+
+        following = [[] for _ in range(numberOfRoutes)]
+        for i in range(numberOfRoutes):
+            for j in np.flatnonzero((minFreeTimes[:i] < lateTimes[i]) & (maxFreeTimes[:i] > earlyTimes[i] - self.maxWait)).tolist():
+                following[j].append(i)
+            if i % 256 == 0 and time.perf_counter() > deadline:
+                return None, None
+
+        nextRoutes = maximum_matching(following, numberOfRoutes, deadline)
+        if nextRoutes is None:
+            return None, None
+        return numberOfRoutes - sum(route != -1 for route in nextRoutes), nextRoutes
+
+    def solve(self, time_budget, seed=0):
+        """
+        Best plan found in time_budget seconds, the greedy first-fit plan is always evaluated.
+
+        Returns:
+            tuple: plan, as returned by simulate, and a report with the workers and hours of the greedy plan
+            and of the best plan, the lower bound and whether the plan is proven to use the fewest workers.
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget
+        rnd = random.Random(seed)
+
+        def earliest(i, candidates, hours, lastRoutes):
+            return min(candidates)[2]
+
+        def latest(i, candidates, hours, lastRoutes):
+            return max(candidates, key=lambda entry: (entry[0], -entry[1]))[2]
+
+        def fewest_hours(i, candidates, hours, lastRoutes):
+            return min(candidates, key=lambda entry: (hours[entry[2]], entry[0]))[2]
+
+        def score(result):
+            return len(result[1]), round(sum(result[1]), 1)
+
+        greedy = best = self.greedy()
+        lowerBound, nextRoutes = self.lower_bound(deadline)
+        rules = [earliest, latest, fewest_hours]
+        if nextRoutes is not None:
+            def guided(i, candidates, hours, lastRoutes):
+                #the worker whose last route is followed by route i in the path cover, the earliest free otherwise
+                for entry in candidates:
+                    if nextRoutes[lastRoutes[entry[2]]] == i:
+                        return entry[2]
+                return min(candidates)[2]
+            rules.insert(0, guided)
+
+        def randomized(rule):
+            def choose(i, candidates, hours, lastRoutes):
+                if rnd.random() < 0.1:
+                    return rnd.choice(candidates)[2]
+                return rule(i, candidates, hours, lastRoutes)
+            return choose
+
+        runs = 1
+        sinceImprovement = 0
+        while time.perf_counter() < deadline:
+            if len(best[1]) == lowerBound and sinceImprovement >= 2 * len(rules):
+                break
+            rule = rules[runs - 1] if runs <= len(rules) else randomized(rules[runs % len(rules)])
+            result = self.simulate(rule)
+            runs += 1
+            if score(result) < score(best):
+                best = result
+                sinceImprovement = 0
+            else:
+                sinceImprovement += 1
+
+        report = {
+            "greedy workers": len(greedy[1]),
+            "greedy hours": round(sum(greedy[1]), 1),
+            "workers": len(best[1]),
+            "hours": round(sum(best[1]), 1),
+            "lower bound": lowerBound,
+            "optimal": len(best[1]) == lowerBound,
+            "runs": runs,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        return best[0], report
+
+
+    def simulate_chain(self, routes, worker):
+        """
+        Start times of the routes of one worker, in departure order.
+
+        Returns:
+            tuple: start times, hours of the shift and minutes waited between routes, or None if the
+            worker cannot do all the routes.
+        """
+        first = routes[0]
+        routeStartTime = self.expectedInitialTimes[first] - self.firstRouteMaxEarly
+        shiftStart = routeStartTime - self.timeToStartShift
+        freeTime = routeStartTime + self.timesToCompleteRoute[first] + self.timeBetweenRoutes
+        hours = round((routeStartTime + self.timesToCompleteRoute[first] + self.timeToEndShift - shiftStart)/60, 1)
+        startTimes = [routeStartTime]
+        wait = 0
+        maxHours = self.maxHours(worker)
+        for i in routes[1:]:
+            timeToCompleteRoute = self.timesToCompleteRoute[i]
+            if not self.earlyTimes[i] - self.maxWait < freeTime < self.lateTimes[i] or hours + timeToCompleteRoute/60 > maxHours:
+                return None
+            routeStartTime = max(freeTime, self.earlyTimes[i])
+            wait += routeStartTime - freeTime
+            freeTime = routeStartTime + timeToCompleteRoute + self.timeBetweenRoutes
+            hours = round((routeStartTime + timeToCompleteRoute + self.timeToEndShift - shiftStart)/60, 1)
+            startTimes.append(routeStartTime)
+        return startTimes, hours, wait
+
+    def improve(self, plan, bikeTypes, time_budget, seed=0):
+        """
+        Local search over a plan: relocate a route to another worker or swap two routes, keeping the
+        moves that do not increase the cost nor the hours, until time_budget seconds have passed.
+        Moves never add workers, so the workers and the hours of the plan never grow.
+
+        The cost, in minutes, adds the weights of LOCAL_SEARCH_WEIGHTS times the workers, the hours,
+        the minutes waited between routes and the peak number of TRIKE plus 4W bikes in use. A move
+        only simulates again the two workers it changes, and the bikes in use per minute are updated
+        for their routes only.
+
+        Args:
+            plan (list): Worker of each route, as returned by simulate.
+            bikeTypes (list): 'TRIKE' or '4W' for each route.
+            time_budget (float): Seconds of the search.
+            seed (int): Seed of the random moves.
+
+        Returns:
+            tuple: improved plan, each route keeps the number of the worker of plan whose chain it joined
+            (the hour limit of maxHours was checked for that number, so they are not numbered again), and
+            a report with the moves tried and accepted and the cost terms before and after.
+        """
+        start = time.perf_counter()
+        deadline = start + time_budget
+        rnd = random.Random(seed)
+        plan = list(plan)
+        numberOfRoutes = len(plan)
+
+        chains = {}
+        for i, worker in enumerate(plan):
+            chains.setdefault(worker, []).append(i)
+        shifts = {worker: self.simulate_chain(routes, worker) for worker, routes in chains.items()}
+
+        #bikes in use at each minute, a route uses its bike from its start until it ends
+        durations = self.timesToCompleteRoute
+        bikeRows = [0 if bikeType == "TRIKE" else 1 for bikeType in bikeTypes]
+        firstMinute = min(min(self.expectedInitialTimes) - self.firstRouteMaxEarly, min(self.earlyTimes))
+        lastMinute = max(max(self.expectedInitialTimes) - self.firstRouteMaxEarly, max(self.lateTimes)) + max(durations)
+        bikesInUse = np.zeros((2, lastMinute - firstMinute + 1), dtype=np.int32)
+
+        def use_bikes(routes, startTimes, change):
+            for i, routeStartTime in zip(routes, startTimes):
+                bikesInUse[bikeRows[i], routeStartTime - firstMinute:routeStartTime - firstMinute + durations[i]] += change
+
+        for worker, routes in chains.items():
+            use_bikes(routes, shifts[worker][0], 1)
+
+        def terms():
+            return {
+                "workers": len(chains),
+                "hours": round(sum(shift[1] for shift in shifts.values()), 1),
+                "wait": sum(shift[2] for shift in shifts.values()),
+                "bikes": int(bikesInUse.max(axis=1).sum()),
+            }
+
+        def shift_cost(shift):
+            return (LOCAL_SEARCH_WEIGHTS["workers"] + LOCAL_SEARCH_WEIGHTS["hours"] * 60 * shift[1]
+                    + LOCAL_SEARCH_WEIGHTS["wait"] * shift[2]) if shift is not None else 0
+
+        before = terms()
+        peakBikes = before["bikes"]
+        moves = accepted = 0
+        while time.perf_counter() < deadline:
+            for _ in range(100):
+                moves += 1
+                i = rnd.randrange(numberOfRoutes)
+                j = min(max(i + rnd.randint(-20, 20), 0), numberOfRoutes - 1)
+                a, b = plan[i], plan[j]
+                if a == b:
+                    continue
+
+                #relocate route i to worker b, or swap routes i and j
+                routesA = [route for route in chains[a] if route != i]
+                routesB = chains[b] + [i]
+                if rnd.random() < 0.5:
+                    routesA = sorted(routesA + [j])
+                    routesB.remove(j)
+                routesB.sort()
+                shiftA = self.simulate_chain(routesA, a) if routesA else None
+                shiftB = self.simulate_chain(routesB, b) if routesB else None
+                if (routesA and shiftA is None) or (routesB and shiftB is None):
+                    continue
+
+                use_bikes(chains[a], shifts[a][0], -1)
+                use_bikes(chains[b], shifts[b][0], -1)
+                if routesA:
+                    use_bikes(routesA, shiftA[0], 1)
+                if routesB:
+                    use_bikes(routesB, shiftB[0], 1)
+                newPeakBikes = int(bikesInUse.max(axis=1).sum())
+                delta = (shift_cost(shiftA) + shift_cost(shiftB) - shift_cost(shifts[a]) - shift_cost(shifts[b])
+                         + LOCAL_SEARCH_WEIGHTS["bikes"] * (newPeakBikes - peakBikes))
+
+                #a move is kept when it lowers the cost without adding hours, the bikes it frees do not pay for longer shifts
+                moreHours = round((shiftA[1] if shiftA else 0) + (shiftB[1] if shiftB else 0) - shifts[a][1] - shifts[b][1], 1) > 0
+                if delta <= 0 and not moreHours:
+                    accepted += 1
+                    peakBikes = newPeakBikes
+                    for worker, routes, shift in ((a, routesA, shiftA), (b, routesB, shiftB)):
+                        if routes:
+                            chains[worker], shifts[worker] = routes, shift
+                            for route in routes:
+                                plan[route] = worker
+                        else:
+                            del chains[worker], shifts[worker]
+                else:
+                    if routesA:
+                        use_bikes(routesA, shiftA[0], -1)
+                    if routesB:
+                        use_bikes(routesB, shiftB[0], -1)
+                    use_bikes(chains[a], shifts[a][0], 1)
+                    use_bikes(chains[b], shifts[b][0], 1)
+
+        report = {"moves": moves, "accepted": accepted, "before": before, "after": terms(),
+                  "seconds": round(time.perf_counter() - start, 3)}
+        return plan, report
+
+
+@pipeline_stage
+def calculate_worker_availability(dfj, workers, database_workers, timeForDelivery, timeBetweenRoutes, globalMaxhours, timeToStartShift, timeToEndShift, earlyDepartureTimeMarginPriority, delayedDepartureTimeMarginPriority, earlyDepartureTimeMarginNoPriority, delayedDepartureTimeMarginNoPriority, maxWaitTimeBetweenRoutes, firstRouteMaxEarlyDepartureTime, engine="greedy", time_budget=ASSIGNMENT_TIME_BUDGET, local_search_time=0, rosters=None, previous=None):
+    """
+    Calculate worker availability and route assignments.
+
+    previous is a tuple (shifts, timeline) with the Shift and the TimelineStop list of the workers
+    already in workers, whose pre_dft index refers to shifts. They keep their
+    worker as name, and new workers are named with the letters they do not use.
+
+    With rosters (hub -> roster of the hub from process_workers, or None) the roster workers of each
+    hub are loaded as existing capacity in a RosterIndex, and every route is first dispatched to them.
+    Only the routes none of them can take go to the extra workers, named with letters. Roster shifts
+    keep the roster name, start and end, with the contracted hours in 'Hores Contracte', and the
+    number of roster workers used per hub is kept in dft.attrs["roster"].
+
+    With engine 'greedy' each route goes to the first added worker that can take it. With 'optimal'
+    the workers of each hub are chosen by a ShiftPlanner in time_budget seconds (shared by the hubs
+    by number of routes). With local_search_time the plan is then improved by ShiftPlanner.improve
+    for that many seconds, also shared by the hubs. The report of the planner, greedy against final
+    workers and hours, is kept per hub in dft.attrs["assignment"].
+    """
+    if engine not in ASSIGNMENT_ENGINES:
+        raise ValueError(f"Unknown assignment engine: {engine}")
+    pre_dft = []
+    totalworkers = 0
+    timeline = {}
+    if previous is not None:
+        pre_dft = [Shift(shift.hub, shift.worker, shift.start, shift.end) for shift in previous[0]]
+        timeline = {worker: list(stops) for worker, stops in previous[1].items()}
+    previousWorkers = {shift.worker for shift in pre_dft}
+    dfj_general = []
+
+    
+    trikesInHub = {}
+    fourWheelsInHub = {}
+    fleetInHub = {}
+
+    availability = WorkerAvailabilityIndex(workers)
+    reports = {}
+    rosterReports = {}
+    rosterNames = {} #worker id -> (name, contracted hours) of the roster workers
+
+    def maxHoursOf(t):
+        """Maximum hours of the shift of worker t."""
+        return min(database_workers[t][1], globalMaxhours) if t in database_workers else globalMaxhours
+
+    def hasHoursLeft(t, timeToCompleteRoute):
+        """Check if worker t can do a route without exceeding its maximum hours."""
+        return (pre_dft[workers[t][1]].hours + timeToCompleteRoute/60) <= maxHoursOf(t)
+
+    def continueTimeline(t, routeId, routeStartTime, routeEndTime):
+        """Add a route to the timeline of worker t, after the route it did last."""
+        lastStop = timeline[t][-1]
+        timeline[t][-1] = lastStop._replace(end=lastStop.end+10)
+        timeline[t].append(TimelineStop(routeId, routeStartTime, routeEndTime, routeStartTime-(lastStop.end+10)))
+
+    totalRoutes = len(dfj)
+    dfj_hub = dfj.groupby("Hub")
+    for hub, dfj in dfj_hub:
+        #sort by delivery exit time
+        dfj = dfj.sort_values(by="order")
+        fleet = FleetAllocator()
+
+        #the routes are read once as lists, and the results are kept in preallocated arrays and written to the table at the end
+        routes = RouteTable.from_frame(dfj, timeForDelivery, earlyDepartureTimeMarginPriority, delayedDepartureTimeMarginPriority,
+                                       earlyDepartureTimeMarginNoPriority, delayedDepartureTimeMarginNoPriority)
+        numberOfRoutes = len(routes)
+        routeIds, bikeTypes, expectedInitialTimes = routes.ids, routes.bikeTypes, routes.expectedTimes
+        maxEarlyInitialTimes, maxDelayedInitialTimes, timesToCompleteRoute = routes.earlyTimes, routes.lateTimes, routes.durations
+        routeStartTimes = np.zeros(numberOfRoutes, dtype=np.int32)
+        asignedWorkers = [-1] * numberOfRoutes
+
+        #the roster workers take the routes they can before any extra worker is added, the extra workers never change their choices
+        rosterWorkers = [None] * numberOfRoutes #(roster worker, route start time) of each route
+        extraRoutes = list(range(numberOfRoutes))
+        if rosters is not None and rosters.get(hub) is not None:
+            roster = RosterIndex(rosters[hub], timeToStartShift, timeToEndShift)
+            horizons = np.minimum.accumulate(np.asarray(maxEarlyInitialTimes[::-1]))[::-1].tolist() #earliest start of each route and the ones after it
+            for i in range(numberOfRoutes):
+                rosterWorkers[i] = roster.dispatch(maxEarlyInitialTimes[i], maxDelayedInitialTimes[i], timesToCompleteRoute[i], timeBetweenRoutes, horizons[i])
+            extraRoutes = [i for i in range(numberOfRoutes) if rosterWorkers[i] is None]
+            rosterReports[hub] = {"workers": len(roster.names), "used": len(roster.used), "routes": numberOfRoutes - len(extraRoutes)}
+            rosterIds = {} #roster worker -> worker id
+
+        plan = None
+        if (engine == "optimal" or local_search_time) and extraRoutes:
+            firstWorker = totalworkers
+            extra = routes.subset(extraRoutes)
+            planner = ShiftPlanner(extra.earlyTimes, extra.lateTimes, extra.expectedTimes, extra.durations, timeBetweenRoutes, timeToStartShift, timeToEndShift, maxWaitTimeBetweenRoutes, firstRouteMaxEarlyDepartureTime,
+                                   lambda worker: maxHoursOf(firstWorker + worker))
+            share = len(extraRoutes) / totalRoutes
+            if engine == "optimal":
+                extraPlan, reports[hub] = planner.solve(time_budget * share)
+            else:
+                extraPlan, hours = planner.greedy()
+                reports[hub] = {"greedy workers": len(hours), "greedy hours": round(sum(hours), 1), "lower bound": None, "optimal": False}
+            if local_search_time:
+                extraPlan, reports[hub]["local search"] = planner.improve(extraPlan, extra.bikeTypes, local_search_time * share)
+                reports[hub]["workers"] = reports[hub]["local search"]["after"]["workers"]
+                reports[hub]["hours"] = reports[hub]["local search"]["after"]["hours"]
+            plan = [None] * numberOfRoutes
+            for i, worker in zip(extraRoutes, extraPlan):
+                plan[i] = worker
+            plannedWorkers = {} #worker of the plan -> worker id
+            #worker w of the plan gets the id firstWorker + w its hours were checked for, the roster workers take the ids after them
+            totalworkers = firstWorker + max(extraPlan) + 1
+
+        for i in range(numberOfRoutes):
+
+            #worker asigned to the route
+            asignedTo = -1
+            bikeType = bikeTypes[i]
+            expectedInitialTime = expectedInitialTimes[i]
+            maxEarlyInitialTime = maxEarlyInitialTimes[i]
+            maxDelayedInitialTime = maxDelayedInitialTimes[i]
+
+            timeToCompleteRoute = timesToCompleteRoute[i]
+
+            t = None
+            if rosterWorkers[i] is not None:
+                pass
+            elif plan is None:
+                #first worker of the hub that has ended its last route before the max delayed time, has not been waiting too long and has hours left
+                t = availability.first_fit(hub, maxEarlyInitialTime - maxWaitTimeBetweenRoutes, maxDelayedInitialTime, lambda t: hasHoursLeft(t, timeToCompleteRoute))
+            else:
+                #worker chosen by the planner, None for the first route of a worker
+                t = plannedWorkers.get(plan[i])
+
+            if rosterWorkers[i] is not None:
+                rosterWorker, routeStartTime = rosterWorkers[i]
+
+                endTime = routeStartTime + timeToCompleteRoute + timeBetweenRoutes
+
+                if rosterWorker in rosterIds:
+                    asignedTo = rosterIds[rosterWorker]
+                    continueTimeline(asignedTo, routeIds[i], routeStartTime, routeStartTime + timeToCompleteRoute)
+                else: #first route of the roster worker, its shift is the one of the roster
+                    asignedTo = rosterIds[rosterWorker] = totalworkers
+                    rosterNames[asignedTo] = (roster.names[rosterWorker], roster.hours[rosterWorker])
+                    startShift, endShift = roster.startShifts[rosterWorker], roster.endShifts[rosterWorker]
+                    pre_dft.append(Shift(hub, asignedTo, startShift, endShift))
+                    timeline[asignedTo] = [TimelineStop(routeIds[i], routeStartTime, routeStartTime + timeToCompleteRoute, "")]
+                    totalworkers += 1
+
+            elif t is not None:
+                value = workers[t]
+
+                #assign the job to worker t, and update the corresponding data structures
+                asignedTo = t
+
+                routeStartTime = max(value[0], maxEarlyInitialTime) #Start time of the route
+
+                endTime = routeStartTime + timeToCompleteRoute + timeBetweenRoutes #time when the worker can start the next route
+
+                workers[t] = (endTime, value[1], value[2])
+                availability.update(t, endTime)
+
+                pre_dft[value[1]].extend(routeStartTime + timeToCompleteRoute + timeToEndShift) #update the provisional end of the shift and the total hours worked
+
+                continueTimeline(asignedTo, routeIds[i], routeStartTime, routeStartTime + timeToCompleteRoute)
+
+            else: #No worker is available, then, add another worker
+
+                routeStartTime = expectedInitialTime - firstRouteMaxEarlyDepartureTime #Start time of the route
+
+                endTime = routeStartTime + timeToCompleteRoute + timeBetweenRoutes #time when the worker can start the next route
+
+                if plan is None:
+                    id = totalworkers #New worker assigned to this route
+                    totalworkers += 1
+                else:
+                    id = plannedWorkers[plan[i]] = firstWorker + plan[i]
+                workers[id] = (endTime, len(pre_dft), hub) #add it to the dict with the active workers and their last route end time
+                availability.add(id, endTime, hub)
+
+                startShift= routeStartTime - timeToStartShift
+                #time it would end the shift if no more routes would be done
+                provisionalEndShift = routeStartTime + timeToCompleteRoute + timeToEndShift
+
+                pre_dft.append(Shift(hub, id, startShift, provisionalEndShift)) #add worker to the database
+
+                timeline[id] = [TimelineStop(routeIds[i], routeStartTime, routeStartTime + timeToCompleteRoute, "")]
+
+                asignedTo = id
+
+            fleet.allocate(bikeType, routeStartTime, endTime - timeBetweenRoutes)
+
+            routeStartTimes[i] = routeStartTime
+            asignedWorkers[i] = asignedTo
+
+        #write the results of the hub to the table in one go
+        timesToCompleteRoute = np.asarray(timesToCompleteRoute, dtype=np.int32)
+        dfj["Temps Total Ruta"] = timesToCompleteRoute
+        dfj["Hora Inici Ruta Real"] = routeStartTimes #actual start time of the route
+        dfj["Hora Fi Ruta"] = routeStartTimes + timesToCompleteRoute #actual end time of the route
+        dfj["Inici Seguent Ruta"] = routeStartTimes + timesToCompleteRoute + np.int32(timeBetweenRoutes) #time at which the worker that did this route is available for the next one
+        dfj["Plnif vs Real Min"] = routeStartTimes - np.asarray(expectedInitialTimes, dtype=np.int32) #difference of starting time between plan and actual
+        dfj["Assignacio Prov"] = asignedWorkers
+
+        #add the modified dataframe with the assignments to the list of dataframes
+        dfj_general.append(dfj)
+        trikesInHub[hub] = fleet.fleet_size("TRIKE")
+        fourWheelsInHub[hub] = fleet.fleet_size("4W")
+        fleetInHub[hub] = fleet
+
+    dft = pd.DataFrame([shift.row() for shift in pre_dft], columns=Shift.COLUMNS)
+
+    dft = dft.sort_values(by='Hores Totals', ascending=False)
+    
+    idToWorker = {}
+    extraWorkers = 65
+
+    #Assign workers to the shift the best fits their hours
+    for i, worker in enumerate(dft["worker"]):
+        if worker in rosterNames:
+            idToWorker[worker] = rosterNames[worker][0]
+        elif worker in previousWorkers:
+            idToWorker[worker] = worker
+        elif i in database_workers:
+            idToWorker[worker] = database_workers[i][0]
+        else:
+            while chr(extraWorkers) in previousWorkers:
+                extraWorkers += 1
+            idToWorker[worker] = chr(extraWorkers)
+            extraWorkers += 1
+
+    dft.insert(1, "Treballador", dft["worker"].map(idToWorker))
+    if rosterReports:
+        dft["Hores Contracte"] = dft["worker"].map({worker: hours for worker, (_, hours) in rosterNames.items()})
+    dft = dft.drop("worker", axis=1)
+
+    #Add the names of the workers to the assignments
+    dfj = pd.concat(dfj_general)
+    dfj = dfj.drop("order", axis=1)
+    dfj["Assignació"] = dfj["Assignacio Prov"].map(idToWorker)
+
+    for worker in dict.fromkeys(dfj["Assignacio Prov"]):
+        timeline[idToWorker[worker]] = timeline.pop(worker)
+
+    dfj = dfj.drop("Assignacio Prov", axis=1)
+    if reports:
+        dft.attrs["assignment"] = reports
+    if rosterReports:
+        dft.attrs["roster"] = rosterReports
+
+    return dfj, dft, timeline, trikesInHub, fourWheelsInHub, fleetInHub
+
+
+def hungarian(cost):
+    """
+    Minimum cost assignment of the rows of cost to its columns (Hungarian algorithm with potentials).
+
+    Returns:
+        tuple: Arrays of the assigned rows and their columns, like scipy's linear_sum_assignment.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    numberOfRows, numberOfColumns = cost.shape
+
+    #column 0 is a dummy column holding the row being assigned
+    rowPotentials = np.zeros(numberOfRows + 1)
+    columnPotentials = np.zeros(numberOfColumns + 1)
+    rowOfColumn = np.zeros(numberOfColumns + 1, dtype=int)
+    previousColumn = np.zeros(numberOfColumns + 1, dtype=int)
+    for row in range(1, numberOfRows + 1):
+        rowOfColumn[0] = row
+        column = 0
+        minReducedCosts = np.full(numberOfColumns + 1, np.inf)
+        used = np.zeros(numberOfColumns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            currentRow = rowOfColumn[column]
+            reducedCosts = cost[currentRow - 1] - rowPotentials[currentRow] - columnPotentials[1:]
+            improved = ~used[1:] & (reducedCosts < minReducedCosts[1:])
+            minReducedCosts[1:][improved] = reducedCosts[improved]
+            previousColumn[1:][improved] = column
+            nextColumn = int(np.argmin(np.where(used[1:], np.inf, minReducedCosts[1:]))) + 1
+            delta = minReducedCosts[nextColumn]
+            rowPotentials[rowOfColumn[used]] += delta
+            columnPotentials[used] -= delta
+            minReducedCosts[~used] -= delta
+            column = nextColumn
+            if rowOfColumn[column] == 0:
+                break
+        #augment along the alternating path that ends at the free column
+        while column:
+            rowOfColumn[column] = rowOfColumn[previousColumn[column]]
+            column = previousColumn[column]
+
+    columns = np.flatnonzero(rowOfColumn[1:])
+    rows = rowOfColumn[1:][columns] - 1
+    if transposed:
+        rows, columns = columns, rows
+    order = np.argsort(rows)
+    return rows[order], columns[order]
+
+
+def linear_assignment(cost):
+    """Minimum cost assignment of a cost matrix, with scipy when it is installed and hungarian otherwise."""
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        return hungarian(cost)
+    return linear_sum_assignment(cost)
+
+
+def flexibility(contractHours, hipotesi):
+    """Share of its contracted hours a shift may differ by: Flexibilitat +6, +4 or -4 depending on the contract."""
+    if contractHours >= 6:
+        return hipotesi["Flexibilitat +6"]
+    if contractHours >= 4:
+        return hipotesi["Flexibilitat +4"]
+    return hipotesi["Flexibilitat -4"]
+
+
+def match_roster(dft_hub, roster, hipotesi):
+    """
+    Give the shifts of a hub to the workers of its roster.
+
+    A worker can take a shift whose hours are within the flexibility of its contracted hours. The
+    assignment gives a worker to as many shifts as possible, then minimizes the difference between
+    shift and contracted hours, then between the start of the shift and the roster start time.
+
+    Args:
+        dft_hub (pd.DataFrame): Shifts of the hub, with Treballador, Hora Inici Torn (minutes) and Hores Totals.
+        roster (pd.DataFrame): Workers of the hub from process_workers.
+        hipotesi (dict): Parameters with the Flexibilitat tolerances.
+
+    Returns:
+        dict: Shift name -> (worker name, contracted hours) of the matched shifts.
+    """
+    if dft_hub.empty or roster is None or roster.empty:
+        return {}
+
+    shiftHours = dft_hub["Hores Totals"].to_numpy(dtype=float)
+    shiftStarts = dft_hub["Hora Inici Torn"].to_numpy(dtype=float)
+    contractHours = roster["Hores"].to_numpy(dtype=float)
+    rosterStarts = np.array([horaToInt(entrada) for entrada in roster["Entrada"]], dtype=float)
+    tolerances = np.array([flexibility(hours, hipotesi) for hours in contractHours]) * contractHours
+
+    hourDifferences = np.abs(shiftHours[:, None] - contractHours[None, :])
+    cost = hourDifferences * 60 + 0.01 * np.abs(shiftStarts[:, None] - rosterStarts[None, :])
+    allowed = hourDifferences <= tolerances[None, :] + 1e-9
+    #a forbidden pair costs more than any assignment of allowed pairs, so the number of matches comes first
+    forbidden = cost[allowed].sum() + 1 if allowed.any() else 1
+    cost = np.where(allowed, cost, forbidden)
+
+    matches = {}
+    for row, column in zip(*linear_assignment(cost)):
+        if allowed[row, column]:
+            matches[dft_hub["Treballador"].iloc[row]] = (roster["Treballador"].iloc[column], contractHours[column])
+    return matches
+
+
+def assign_roster(dfj, dft, timeline, rosters, hipotesi):
+    """
+    Name the shifts after the roster workers they are matched to by match_roster.
+
+    Shifts without a matching worker keep their letter. dft gets the contracted hours of the worker
+    of each shift in 'Hores Contracte' (empty for the unmatched shifts).
+
+    Args:
+        rosters (dict): Hub -> roster of the hub from process_workers, or None.
+
+    Returns:
+        tuple: dfj, dft and timeline with the new names.
+    """
+    names, contracts = {}, {}
+    for hub, dft_hub in dft.groupby("Hub"):
+        for shift, (worker, contractHours) in match_roster(dft_hub, rosters.get(hub), hipotesi).items():
+            names[shift] = worker
+            contracts[shift] = contractHours
+
+    dft = dft.copy()
+    dft["Hores Contracte"] = dft["Treballador"].map(contracts)
+    dft["Treballador"] = [names.get(worker, worker) for worker in dft["Treballador"]]
+    dfj = dfj.copy()
+    dfj["Assignació"] = [names.get(worker, worker) for worker in dfj["Assignació"]]
+    timeline = {names.get(worker, worker): stops for worker, stops in timeline.items()}
+    return dfj, dft, timeline
+
+
+def adjust_column_widths(ws):
+    for col in ws.columns:
+        max_length = 0
+        column = col[0].column_letter  # Get the column name
+        
+        # Find the maximum length of the content in each cell
+        for cell in col:
+            try:
+                if len(str(cell.value)) > max_length:
+                    max_length = len(cell.value)
+            except:
+                pass
+        
+        # Set the column width
+        adjusted_width = (max_length + 2)
+        ws.column_dimensions[column].width = adjusted_width
+
+
+class StreamingCell:
+    """Value and styling of a single cell of a StreamingSheet."""
+    __slots__ = ("value", "font", "style")
+
+    def __init__(self):
+        self.value = None
+        self.font = None
+        self.style = None
+
+
+class StreamingSheet:
+    """
+    Worksheet saved with openpyxl write-only mode.
+
+    Tables and cells are placed like with DataFrame.to_excel and ws.cell, but only references to
+    them are kept: the rows are built and written one at a time when the workbook is saved, so no
+    openpyxl cell is kept in memory. Column widths are measured on each table when it is added,
+    with the same rule as adjust_column_widths.
+    """
+
+    def __init__(self, title, adjust_widths=True):
+        self.title = title
+        self.adjust_widths = adjust_widths
+        self.tables = []
+        self.cells = {}
+        self.widths = {}
+        self.maxRow = 0
+        self.maxColumn = 0
+
+    def _measure(self, column, length):
+        if length > self.widths.get(column, 0):
+            self.widths[column] = length
+
+    def add_table(self, df, startrow=0, startcol=0, index=True):
+        """Place df where df.to_excel(writer, startrow=startrow, startcol=startcol, index=index) would write it."""
+        firstColumn = startcol + 1
+        columns = [df.index] if index else []
+        columns += [df[name] for name in df.columns]
+        header = [df.index.name] if index else []
+        header += list(df.columns)
+
+        for offset, (name, values) in enumerate(zip(header, columns)):
+            if isinstance(name, str):
+                self._measure(firstColumn + offset, len(name))
+            if values.dtype == object and len(values):
+                # Only text counts for the width
+                self._measure(firstColumn + offset, int(values.map(lambda value: len(value) if isinstance(value, str) else 0).max()))
+
+        self.tables.append((startrow + 1, firstColumn, header, columns, index))
+        self.maxRow = max(self.maxRow, startrow + 1 + len(df))
+        self.maxColumn = max(self.maxColumn, startcol + len(columns))
+
+    def cell(self, row, column):
+        """Cell at row and column, its value, font and style are set like on an openpyxl cell."""
+        key = (row, column)
+        if key not in self.cells:
+            self.cells[key] = StreamingCell()
+            self.maxRow = max(self.maxRow, row)
+            self.maxColumn = max(self.maxColumn, column)
+        return self.cells[key]
+
+    def _table_rows(self, header, columns, index):
+        """Rows of a table as (values, number of leading cells with the header style)."""
+        yield header, len(header)
+        values = []
+        for column in columns:
+            # Empty values are written as '' like pandas does
+            missing = column.isna()
+            if missing.any():
+                column = column.astype(object).where(~missing, "")
+            values.append(column.tolist())
+        for row in zip(*values):
+            yield list(row), int(index)
+
+    def write(self, wb, headerStyle):
+        """Create the sheet in the write-only workbook wb and write its rows in order."""
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.utils import get_column_letter
+
+        ws = wb.create_sheet(self.title)
+
+        cellsByRow = {}
+        for (row, column), cell in self.cells.items():
+            cellsByRow.setdefault(row, {})[column] = cell
+            if isinstance(cell.value, str):
+                self._measure(column, len(cell.value))
+
+        if self.adjust_widths:
+            for column in range(1, self.maxColumn + 1):
+                ws.column_dimensions[get_column_letter(column)].width = self.widths.get(column, 0) + 2
+
+        styleArrays = {}
+        pending = sorted(self.tables, key=lambda table: table[0], reverse=True)
+        active = []
+        for rowNumber in range(1, self.maxRow + 1):
+            while pending and pending[-1][0] == rowNumber:
+                firstRow, firstColumn, header, columns, index = pending.pop()
+                active.append((firstColumn, self._table_rows(header, columns, index)))
+
+            row = [None] * self.maxColumn
+            styled = {}
+            for table in list(active):
+                firstColumn, rows = table
+                try:
+                    values, numberStyled = next(rows)
+                except StopIteration:
+                    active.remove(table)
+                    continue
+                row[firstColumn - 1:firstColumn - 1 + len(values)] = values
+                for column in range(firstColumn, firstColumn + numberStyled):
+                    if row[column - 1] is not None:
+                        styled[column] = headerStyle
+
+            for column, cell in cellsByRow.get(rowNumber, {}).items():
+                if cell.value is not None:
+                    row[column - 1] = cell.value
+                styled[column] = (cell.font, cell.style)
+
+            for column, style in styled.items():
+                writeOnlyCell = WriteOnlyCell(ws, value=row[column - 1])
+                key = style if style is headerStyle else tuple(map(id, style))
+                if key in styleArrays:
+                    # Registering a style in the workbook is slow, each one is only set once
+                    writeOnlyCell._style = copy(styleArrays[key])
+                else:
+                    if style is headerStyle:
+                        writeOnlyCell.font, writeOnlyCell.border, writeOnlyCell.alignment = headerStyle
+                    else:
+                        font, namedStyle = style
+                        if namedStyle is not None:
+                            writeOnlyCell.style = namedStyle
+                        if font is not None:
+                            writeOnlyCell.font = font
+                    styleArrays[key] = copy(writeOnlyCell._style)
+                row[column - 1] = writeOnlyCell
+            ws.append(row)
+
+
+class StreamingWorkbook:
+    """
+    Workbook of StreamingSheets, saved with openpyxl write-only mode.
+
+    Offers the few workbook methods used by generate_excel_file, so the same code fills a
+    regular openpyxl workbook or a streaming one.
+    """
+
+    def __init__(self, adjust_widths=True):
+        self.adjust_widths = adjust_widths
+        self.sheets = {}
+
+    @property
+    def sheetnames(self):
+        return list(self.sheets)
+
+    def __getitem__(self, title):
+        return self.sheets[title]
+
+    def create_sheet(self, title):
+        self.sheets[title] = StreamingSheet(title, self.adjust_widths)
+        return self.sheets[title]
+
+    def write_table(self, df, sheet_name, startrow=0, startcol=0, index=True):
+        """Add df to the sheet sheet_name, created if needed, like df.to_excel would write it."""
+        if sheet_name not in self.sheets:
+            self.create_sheet(sheet_name)
+        self.sheets[sheet_name].add_table(df, startrow, startcol, index)
+
+    def save(self, file):
+        """Write the workbook to file, a path or a binary file object."""
+        import openpyxl as opxl
+        from openpyxl.styles import Alignment, Border, Font, Side
+
+        # Style pandas gives to the header and index cells
+        thin = Side(style="thin")
+        headerStyle = (Font(bold=True), Border(left=thin, right=thin, top=thin, bottom=thin),
+                       Alignment(horizontal="center", vertical="top"))
+
+        wb = opxl.Workbook(write_only=True)
+        for sheet in self.sheets.values():
+            sheet.write(wb, headerStyle)
+        wb.save(file)
+
+
+def highlight_late_routes(sheet, dfj, startrow, startcol, font):
+    """
+    Give font to the 'Plnif vs Real Min' cells of the routes that leave later than planned.
+
+    Args:
+        sheet: Worksheet, or StreamingSheet, where dfj was written with index at startrow and startcol.
+        dfj (pd.DataFrame): Route table as written to the sheet.
+        startrow (int): startrow passed to to_excel.
+        startcol (int): startcol passed to to_excel.
+        font (Font): Font of the late routes.
+    """
+    column = startcol + 2 + dfj.columns.get_loc("Plnif vs Real Min")
+    delays = pd.to_numeric(dfj["Plnif vs Real Min"], errors="coerce").to_numpy()
+    for position in np.flatnonzero(delays > 0):
+        sheet.cell(row=startrow + 2 + int(position), column=column).font = font
+
+
+@pipeline_stage
+def generate_excel_file(dfj, dft, workers_sants, workers_napols, additionalInfoList, hipotesi, timeline, workerList, numberTrikes, number4Wheels, file_path=None, write_only=False):
+    """
+    Generate and format the Excel file.
+
+    The workbook is built and styled in memory and saved once. With write_only the sheets are
+    kept as StreamingSheets and written row by row with openpyxl write-only mode, which uses
+    much less memory and time when 'Taula General' has many routes.
+
+    Returns:
+        bytes: Contents of the Excel file, also written to file_path when one is given.
+    """
+    # openpyxl is only needed here, importing it lazily keeps the start of the command line fast
+    import openpyxl as opxl
+    from openpyxl.styles import NamedStyle
+
+    output = io.BytesIO()
+    dfj = format_times(dfj.drop("Prioritari", axis=1))
+    redFont = opxl.styles.Font(color='FF0000')
+
+    if write_only:
+        wb = StreamingWorkbook()
+        write_table = wb.write_table
+    else:
+        writer = pd.ExcelWriter(output, engine='openpyxl')
+        wb = writer.book
+
+        def write_table(df, sheet_name, startrow=0, startcol=0, index=True):
+            df.to_excel(writer, sheet_name=sheet_name, startrow=startrow, startcol=startcol, index=index)
+
+    write_table(dfj, 'Taula General', startcol=1, startrow=1)
+
+    workerList = {}
+    lateRoutes = {}
+
+    dfj_group = dfj.groupby('Hub')
+    dft_group = dft.groupby('Hub')
+
+    for hub, dft_hub in dft_group:
+        dft_hub = format_times(dft_hub).sort_values(by='Hora Inici Torn')
+        dft_hub.index = list(range(1, len(dft_hub) + 1))
+        write_table(dft_hub, hub, startcol=1, startrow=1)
+
+        if hub == "Sants" and workers_sants is not None:
+            write_table(workers_sants, hub, startcol=8, startrow=1, index=False)
+        elif workers_napols is not None:
+            write_table(workers_napols, hub, startcol=8, startrow=1, index=False)
+
+        workerListAux = []
+        rowToWrite = len(dft_hub) + 9 + 7
+        dfj_hub = dfj_group.get_group(hub)
+        dfj_hub.index = list(range(1, len(dfj_hub) + 1))
+        write_table(dfj_hub, hub, startcol=1, startrow=rowToWrite)
+        lateRoutes[hub] = (dfj_hub, rowToWrite)
+        rowToWrite += len(dfj_hub) + 5
+        colToWrite = 1
+
+        for index, row in dft_hub.iterrows():
+            workerTimeline = timeline[row["Treballador"]]
+            df_workerTimeline = format_times(pd.DataFrame(workerTimeline, columns=['ID', 'Inici Ruta', 'Fi Ruta', 'Temps Espera Min']))
+            write_table(df_workerTimeline, hub, startcol=colToWrite, startrow=rowToWrite)
+            workerListAux.append((row["Treballador"], rowToWrite))
+            colToWrite += 7
+
+            if colToWrite == 22:
+                colToWrite = 1
+                rowToWrite += len(df_workerTimeline) + 8
+
+        workerList[hub] = workerListAux
+
+    # Create a NamedStyle for the percentage format
+    percentage_style = NamedStyle(name="percentage_style", number_format='0.00%')
+
+    for data in additionalInfoList:
+        hub = data[0]
+        if hub in wb.sheetnames:
+            sheet = wb[hub]
+        else:
+            print(f"Skipping {hub}: Worksheet does not exist.")
+            continue
+
+        row_number = data[3] + 7
+        column_letter = 'G'
+        formula = f"=SUM({column_letter}3:{column_letter}{row_number})"
+        row_number += 3
+        sheet.cell(row=row_number, column=5).value = "Total Hores"
+        sheet.cell(row=row_number, column=6).value = formula
+        sheet.cell(row=row_number, column=11).value = "Total Hores"
+        sheet.cell(row=row_number, column=12).value = f"=SUM(L3:L{row_number-1})"
+        row_number += 1
+        sheet.cell(row=row_number, column=5).value = "Num treballadors"
+        sheet.cell(row=row_number, column=6).value = data[3]
+        row_number += 1
+        sheet.cell(row=row_number, column=5).value = "Num Rutes"
+        sheet.cell(row=row_number, column=6).value = data[1]
+        row_number += 1
+        sheet.cell(row=row_number, column=5).value = "Total Paquets"
+        sheet.cell(row=row_number, column=6).value = data[4]
+        row_number += -1
+        sheet.cell(row=row_number, column=9).value = "TRIKES"
+        sheet.cell(row=row_number, column=10).value = data[5]
+        sheet.cell(row=row_number, column=11).value = f"=J{row_number}/F{row_number}"
+        sheet.cell(row=row_number, column=11).style = percentage_style   
+        row_number += 1
+        sheet.cell(row=row_number, column=9).value = "4W"
+        sheet.cell(row=row_number, column=10).value = data[1] - data[5]
+        sheet.cell(row=row_number, column=11).value = f"=J{row_number}/F{row_number-1}"
+        sheet.cell(row=row_number, column=11).style = percentage_style
+        row_number += 1
+        sheet.cell(row=row_number, column=9).value = "TRIKES Min"
+        sheet.cell(row=row_number, column=10).value = numberTrikes[hub]
+        row_number += 1
+        sheet.cell(row=row_number, column=9).value = "4w  Min"
+        sheet.cell(row=row_number, column=10).value = number4Wheels[hub]
+        row_number += 1
+
+        if hub in lateRoutes:
+            highlight_late_routes(sheet, lateRoutes[hub][0], lateRoutes[hub][1], 1, redFont)
+
+        colToWrite = 1
+        for worker_tuple in workerList.get(data[0], []):
+            row_number = worker_tuple[1]
+            sheet.cell(row=row_number + 1, column=colToWrite + 1).value = worker_tuple[0]
+            colToWrite += 7
+            if colToWrite == 22:
+                colToWrite = 1
+
+    highlight_late_routes(wb['Taula General'], dfj, 1, 1, redFont)
+
+    sheet = wb.create_sheet("Hipotesi")
+    row_number = 2
+    for key in hipotesi:
+        sheet.cell(row=row_number, column=2).value = key
+        sheet.cell(row=row_number, column=3).value = hipotesi[key]
+        row_number += 1
+
+    if write_only:
+        # The column widths were measured while the sheets were filled
+        wb.save(output)
+    else:
+        # Loop through each sheet in the workbook and adjust sizes
+        for sheet in wb.worksheets:
+            adjust_column_widths(sheet)
+        writer.close()
+
+    contents = output.getvalue()
+    if file_path is not None:
+        with open(file_path, 'wb') as file:
+            file.write(contents)
+    return contents
+
+
+# Types of the exported tables, times are kept in minutes since midnight
+ROUTE_DTYPES = {"Id": "string", "Prioritari": "bool", "Tipus Bici": "category", "Pes": "Int32", "Data": "string",
+                "Hub": "category", "Hora Inici Ruta Plnif": "int32", "Hora Inici Ruta Real": "int32", "Hora Fi Ruta": "int32",
+                "Inici Seguent Ruta": "int32", "Temps Recorregut Ruta": "Int32", "Temps Total Ruta": "int32",
+                "Num Entregues": "Int32", "Assignació": "string", "Plnif vs Real Min": "int32"}
+SHIFT_DTYPES = {"Hub": "category", "Treballador": "string", "Hora Inici Torn": "int32", "Hora Final Torn": "int32",
+                "Hores Totals": "float64", "Hores Contracte": "float64"}
+TIMELINE_DTYPES = {"Treballador": "string", "Ordre": "int32", "ID": "string", "Inici Ruta": "int32", "Fi Ruta": "int32",
+                   "Temps Espera Min": "Int32"}
+TABLES = {"rutes": ROUTE_DTYPES, "torns": SHIFT_DTYPES, "timeline": TIMELINE_DTYPES}
+
+
+def timeline_table(timeline):
+    """
+    Timeline of every worker as one table, a row per stop.
+
+    Args:
+        timeline (dict): Stops (id, start, end, wait) of each worker, as returned by calculate_worker_availability.
+
+    Returns:
+        pd.DataFrame: Treballador, Ordre (position of the stop in the shift), ID, Inici Ruta, Fi Ruta and
+        Temps Espera Min, empty for the first stop.
+    """
+    rows = [(worker, order) + tuple(stop) for worker, stops in timeline.items() for order, stop in enumerate(stops)]
+    df = pd.DataFrame(rows, columns=list(TIMELINE_DTYPES))
+    df["Temps Espera Min"] = pd.to_numeric(df["Temps Espera Min"].replace("", None), errors="coerce")
+    return df
+
+
+def typed_table(df, dtypes):
+    """Copy of df with the columns of dtypes, in that order and with those types."""
+    return df[[column for column in dtypes if column in df]].astype({column: dtype for column, dtype in dtypes.items() if column in df})
+
+
+def export_tables(dfj, dft, timeline, directory, file_format=None):
+    """
+    Write the assignments, the shifts and the timeline as rutes, torns and timeline tables.
+
+    The tables are written as Parquet, which keeps the types and loads in milliseconds, or as CSV
+    when pyarrow is not installed. Use load_tables to read them back with the same types.
+
+    Args:
+        dfj (pd.DataFrame): Routes with their assignment, as returned by calculate_worker_availability.
+        dft (pd.DataFrame): Shifts of the workers.
+        timeline (dict): Stops of each worker.
+        directory (str): Folder of the files, created if needed.
+        file_format (str): 'parquet' or 'csv', Parquet when pyarrow is available by default.
+
+    Returns:
+        list: Paths of the written files.
+    """
+    if file_format is None:
+        file_format = "parquet" if importlib.util.find_spec("pyarrow") is not None else "csv"
+    if file_format not in ("parquet", "csv"):
+        raise ValueError(f"Unknown table format: {file_format}")
+
+    os.makedirs(directory, exist_ok=True)
+    tables = {"rutes": dfj, "torns": dft, "timeline": timeline_table(timeline)}
+    paths = []
+    for name, df in tables.items():
+        df = typed_table(df, TABLES[name])
+        path = os.path.join(directory, f"{name}.{file_format}")
+        if file_format == "parquet":
+            df.to_parquet(path, index=False)
+        else:
+            df.to_csv(path, index=False)
+        paths.append(path)
+    return paths
+
+
+def load_tables(directory):
+    """
+    Read the tables written by export_tables, Parquet or CSV, with their types.
+
+    Returns:
+        tuple: rutes, torns and timeline DataFrames.
+    """
+    tables = []
+    for name, dtypes in TABLES.items():
+        path = os.path.join(directory, f"{name}.parquet")
+        if os.path.exists(path):
+            df = pd.read_parquet(path)
+        else:
+            # Only the empty cells of the number columns are missing, an empty text stays ''
+            missing = {column: [""] for column, dtype in dtypes.items() if dtype in ("Int32", "float64")}
+            df = pd.read_csv(os.path.join(directory, f"{name}.csv"), dtype=dtypes, keep_default_na=False, na_values=missing)
+        tables.append(typed_table(df, dtypes))
+    return tuple(tables)
+
+
+def summarize_hubs(dfj, dft):
+    """
+    Per hub totals shown in the UI and written to the Excel file.
+
+    Returns:
+        list: (hub, number of routes, total hours, workers, packages, TRIKE routes) for each hub.
+    """
+    additional_info_list = []
+    for hub, dft_hub in dft.groupby("Hub"):
+        dfj_hub = dfj[dfj["Hub"] == hub]
+        total_hours = dft_hub["Hores Totals"].sum()
+        workers_in_hub = len(dft_hub)
+        number_deliveries = len(dfj_hub)
+        number_packages = dfj_hub["Num Entregues"].sum()
+        trike_bikes = len(dfj_hub[dfj_hub["Tipus Bici"] == "TRIKE"])
+
+        additional_info_list.append((hub, number_deliveries, total_hours, workers_in_hub, number_packages, trike_bikes))
+    return additional_info_list
+
+
+def describe_assignment(report):
+    """One line summary of the report of the optimal engine for a hub, as shown in the app and the command line."""
+    lowerBound = "-" if report["lower bound"] is None else report["lower bound"]
+    description = (f"Treballadors: {report['workers']} (greedy {report['greedy workers']}, cota inferior {lowerBound}) - "
+                   f"Hores: {report['hours']:.1f} (greedy {report['greedy hours']:.1f})")
+    if "local search" in report:
+        before, after = report["local search"]["before"], report["local search"]["after"]
+        description += (f" - Millora local: espera {before['wait']} → {after['wait']} min, "
+                        f"bicis al pic {before['bikes']} → {after['bikes']}")
+    return description
+
+
+def describe_roster(report):
+    """One line summary of the use of the roster of a hub as capacity, as shown in the app and the command line."""
+    return f"Plantilla: {report['used']} de {report['workers']} treballadors, {report['routes']} rutes"
+
+
+def schedule_routes(dfj, hipotesi, workers=None, database_workers=None, engine="greedy", time_budget=ASSIGNMENT_TIME_BUDGET, local_search_time=0, rosters=None, previous=None):
+    """Run calculate_worker_availability with the parameters of the hipotesi dict."""
+    return calculate_worker_availability(
+        dfj,
+        {} if workers is None else workers,
+        {} if database_workers is None else database_workers,
+        hipotesi["Temps Per paquet"],
+        hipotesi["Temps entre rutes"],
+        hipotesi["Maxim Hores Global"],
+        hipotesi["Temps Inici Torn"],
+        hipotesi["Temps Fi Torn"],
+        hipotesi["Marge abans - W"],
+        hipotesi["Marge despres - W"],
+        hipotesi["Marge abans - No W"],
+        hipotesi["Marge despres - No W"],
+        hipotesi["Temps maxim espera"],
+        hipotesi["Marge primera ruta torn"],
+        engine,
+        time_budget,
+        local_search_time,
+        rosters,
+        previous
+    )
+
+
+def generate_schedule(routes_table, workers_sants_table, workers_napols_table, hipotesi, engine="greedy", time_budget=ASSIGNMENT_TIME_BUDGET, local_search_time=0, roster_capacity=False, roster_names=False):
+    """
+    Parse the pasted tables and assign the routes to workers.
+
+    The day of the week used for the worker schedules is the one of the first route. engine,
+    time_budget and local_search_time choose the assignment engine, see calculate_worker_availability.
+    The worker schedules only change the shifts with one of these options: with roster_names the
+    shifts are named after the workers they are matched to by assign_roster, with roster_capacity
+    the schedules are used as capacity: the routes are dispatched to the roster workers first, and
+    only the rest get extra workers. roster_capacity already names the shifts, roster_names is
+    ignored with it.
+
+    Returns:
+        tuple: dfj, dft, timeline, trikes and 4W per hub, fleet per hub and the parsed
+        worker schedules of Sants and Napols (None when their table is empty).
+    """
+    dfj_hub = process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+
+    weekday = datetime.strptime(dfj_hub["Data"].iloc[0], "%d/%m/%Y").weekday()
+
+    workers_sants = process_workers(workers_sants_table, weekday) if workers_sants_table else None
+    workers_napols = process_workers(workers_napols_table, weekday) if workers_napols_table else None
+
+    rosters = None
+    if workers_sants is not None or workers_napols is not None:
+        rosters = {hub: workers_sants if hub == "Sants" else workers_napols for hub in dfj_hub["Hub"].unique()}
+
+    dfj, dft, timeline, numberTrikes, number4Wheels, fleetInHub = schedule_routes(dfj_hub, hipotesi, engine=engine, time_budget=time_budget,
+                                                                                  local_search_time=local_search_time,
+                                                                                  rosters=rosters if roster_capacity else None)
+    if rosters is not None and roster_names and not roster_capacity:
+        dfj, dft, timeline = assign_roster(dfj, dft, timeline, rosters, hipotesi)
+    return dfj, dft, timeline, numberTrikes, number4Wheels, fleetInHub, workers_sants, workers_napols
+
+
+def reschedule(dfj, dft, timeline, hipotesi, added=None, cancelled=(), delayed=None):
+    """
+    Update a greedy schedule after some routes are added, cancelled or delayed.
+
+    The routes of each hub are assigned in departure order, so the routes before the first change
+    get the same workers they would get in a full run. They are kept with their workers, and only
+    the rest of the routes are assigned again, continuing the shifts and timelines of the workers
+    of the kept routes. Those workers keep their names, the new ones get the letters not in use.
+    Only greedy results can be updated: the routes of the optimal engine, the local search and the
+    roster capacity mode are not assigned in departure order, and a ValueError is raised for them.
+
+    Args:
+        dfj, dft, timeline: Previous result of calculate_worker_availability or generate_schedule.
+        hipotesi (dict): Parameters of the schedule.
+        added (str): Pasted table with the new routes, as read by process_routes.
+        cancelled (iterable): Id of the cancelled routes.
+        delayed (dict): Id -> new planned start time of the route, in minutes.
+
+    Returns:
+        tuple: dfj, dft, timeline, trikes and 4W per hub, fleet per hub, as calculate_worker_availability.
+    """
+    if "roster" in dft.attrs:
+        raise ValueError("reschedule does not support the results of the roster capacity mode")
+    if "assignment" in dft.attrs:
+        raise ValueError("reschedule only supports the results of the greedy engine without local search")
+    cancelled = set(cancelled)
+    delayed = {} if delayed is None else delayed
+    timeToEndShift = hipotesi["Temps Fi Torn"]
+
+    newRoutes = process_routes(added, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"]) if added else pd.DataFrame(columns=ROUTE_COLUMNS)
+    newRoutes.index = newRoutes.index + (dfj.index.max() + 1 if len(dfj) else 0)
+    startShifts = dict(zip(dft["Treballador"], dft["Hora Inici Torn"]))
+    contracts = dict(zip(dft["Treballador"], dft["Hores Contracte"])) if "Hores Contracte" in dft else None
+
+    hubs = sorted(set(dfj["Hub"]) | set(newRoutes["Hub"]))
+    frozen, pending = {}, []
+    workers, shifts, previousTimeline = {}, [], {}
+    for hub in hubs:
+        routes = dfj[dfj["Hub"] == hub] #in the order they were assigned
+        hubNewRoutes = newRoutes[newRoutes["Hub"] == hub]
+
+        #the first route whose assignment can change: a cancelled or delayed one, or the first one at or after a new start time
+        changed = (routes["Id"].isin(cancelled) | routes["Id"].isin(delayed)).to_numpy()
+        boundary = int(changed.argmax()) if changed.any() else len(routes)
+        newStartTimes = [delayed[routeId] for routeId in routes["Id"] if routeId in delayed] + hubNewRoutes["Hora Inici Ruta Plnif"].tolist()
+        if newStartTimes:
+            boundary = min(boundary, bisect_left(routes["Hora Inici Ruta Plnif"].tolist(), min(newStartTimes)))
+        frozen[hub] = routes.iloc[:boundary]
+
+        #the workers of the kept routes, as they were after their last kept route
+        lastRoutes = {} #worker -> (number of kept routes, end of the last one, time it is free after it)
+        for worker, routeEndTime, freeTime in zip(frozen[hub]["Assignació"], frozen[hub]["Hora Fi Ruta"].tolist(), frozen[hub]["Inici Seguent Ruta"].tolist()):
+            lastRoutes[worker] = (lastRoutes[worker][0] + 1 if worker in lastRoutes else 1, routeEndTime, freeTime)
+        for worker, (numberOfRoutes, routeEndTime, freeTime) in lastRoutes.items():
+            workers[worker] = (freeTime, len(shifts), hub)
+            shifts.append(Shift(hub, worker, startShifts[worker], routeEndTime + timeToEndShift))
+            stops = timeline[worker][:numberOfRoutes]
+            if len(stops) < len(timeline[worker]): #the time added to the last kept stop when the next route was assigned
+                stops[-1] = stops[-1]._replace(end=stops[-1].end-10)
+            previousTimeline[worker] = stops
+
+        routes = routes.iloc[boundary:]
+        routes = routes[~routes["Id"].isin(cancelled)].reindex(columns=ROUTE_COLUMNS)
+        routes["Hora Inici Ruta Plnif"] = [delayed.get(routeId, startTime) for routeId, startTime in zip(routes["Id"], routes["Hora Inici Ruta Plnif"])]
+        pending += [part for part in (routes, hubNewRoutes) if len(part)]
+
+    if pending:
+        pending = pd.concat(pending)
+        pending["order"] = pending["Hora Inici Ruta Plnif"]
+        pending["Assignacio Prov"] = ""
+        rescheduled, dft, timeline, _, _, _ = schedule_routes(pending, hipotesi, workers=workers, previous=(shifts, previousTimeline))
+    else:
+        rescheduled = dfj.iloc[:0]
+        dft = pd.DataFrame([shift.row() for shift in shifts], columns=Shift.COLUMNS).rename(columns={"worker": "Treballador"})
+        dft = dft.sort_values(by="Hores Totals", ascending=False)
+        timeline = previousTimeline
+    if contracts is not None:
+        dft["Hores Contracte"] = dft["Treballador"].map(contracts)
+
+    dfj = pd.concat([part for hub in hubs for part in (frozen[hub], rescheduled[rescheduled["Hub"] == hub])])
+
+    #the bikes are allocated again over all the routes of the hub
+    numberTrikes, number4Wheels, fleetInHub = {}, {}, {}
+    for hub, routes in dfj.groupby("Hub", sort=False):
+        fleet = FleetAllocator()
+        for bikeType, routeStartTime, routeEndTime in zip(routes["Tipus Bici"], routes["Hora Inici Ruta Real"], routes["Hora Fi Ruta"]):
+            fleet.allocate(bikeType, routeStartTime, routeEndTime)
+        numberTrikes[hub] = fleet.fleet_size("TRIKE")
+        number4Wheels[hub] = fleet.fleet_size("4W")
+        fleetInHub[hub] = fleet
+    return dfj, dft, timeline, numberTrikes, number4Wheels, fleetInHub
+
+
+def schedule_days(dfj, hipotesi, max_workers=None, engine="greedy", time_budget=ASSIGNMENT_TIME_BUDGET, local_search_time=0):
+    """
+    Assign the routes of a table that spans several days.
+
+    The table is split by Data and Hub and every part is scheduled on its own process,
+    since workers are never shared between days or hubs.
+
+    Args:
+        dfj (DataFrame): Routes from process_routes, of any number of dates.
+        hipotesi (dict): Parameters of the schedule.
+        max_workers (int): Number of processes, all the cores when None. With 1 the parts run in this process.
+        engine (str): Assignment engine, 'greedy' or 'optimal'.
+        time_budget (float): Seconds of the optimal engine for each day and hub.
+        local_search_time (float): Seconds of local search for each day and hub.
+
+    Returns:
+        dict: (date, hub) -> result of schedule_routes for the routes of that day and hub.
+    """
+    parts = sorted(dfj.groupby(["Data", "Hub"]), key=lambda part: (datetime.strptime(part[0][0], "%d/%m/%Y"), part[0][1]))
+    keys = [key for key, _ in parts]
+    routes = [routes for _, routes in parts]
+
+    if max_workers == 1 or len(parts) <= 1:
+        results = [schedule_routes(part, hipotesi, engine=engine, time_budget=time_budget, local_search_time=local_search_time) for part in routes]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(schedule_routes, routes, [hipotesi] * len(routes), [None] * len(routes), [None] * len(routes),
+                                        [engine] * len(routes), [time_budget] * len(routes), [local_search_time] * len(routes)))
+
+    return dict(zip(keys, results))
+
+
+def merge_days(results):
+    """
+    Merge the results of schedule_days into the tables of a single schedule.
+
+    Each day and hub becomes a hub of its own, labelled 'Hub dd-mm', so it gets its own sheet
+    in the Excel file. Workers are named again per day (longest shifts first) with the day
+    added to the name, so names stay unique across days.
+
+    The labels stay in the merged tables because generate_excel_file, summarize_hubs and the
+    trikes and 4W per hub are all keyed by Hub, and a day and hub is one schedule for them.
+    The real hub and date are still in Data and the label, archive_schedule stores them apart.
+
+    Returns:
+        tuple: dfj, dft, timeline, trikes and 4W per labelled hub, fleet per labelled hub.
+    """
+    dfj_days, dft_days = [], []
+    timeline, numberTrikes, number4Wheels, fleetInHub, reports = {}, {}, {}, {}, {}
+
+    for date in dict.fromkeys(date for date, _ in results):
+        day = datetime.strptime(date, "%d/%m/%Y").strftime("%d-%m")
+        dayResults = {hub: result for (resultDate, hub), result in results.items() if resultDate == date}
+
+        dft_day = pd.concat([result[1].assign(Hub=f"{hub} {day}", Anterior=result[1]["Treballador"]) for hub, result in dayResults.items()])
+        dft_day = dft_day.sort_values(by="Hores Totals", ascending=False, kind="stable")
+        dft_day["Treballador"] = [f"{chr(65 + i)} {day}" for i in range(len(dft_day))]
+        names = {(hub, previous): name for hub, previous, name in zip(dft_day["Hub"], dft_day["Anterior"], dft_day["Treballador"])}
+        dft_days.append(dft_day.drop("Anterior", axis=1))
+
+        for hub, (dfj_hub, _, timeline_hub, trikes, fourWheels, fleet) in dayResults.items():
+            label = f"{hub} {day}"
+            dfj_hub = dfj_hub.assign(Hub=label)
+            dfj_hub["Assignació"] = [names[(label, worker)] for worker in dfj_hub["Assignació"]]
+            dfj_days.append(dfj_hub)
+            for worker, stops in timeline_hub.items():
+                timeline[names[(label, worker)]] = stops
+            numberTrikes[label] = trikes[hub]
+            number4Wheels[label] = fourWheels[hub]
+            fleetInHub[label] = fleet[hub]
+            if "assignment" in dayResults[hub][1].attrs:
+                reports[label] = dayResults[hub][1].attrs["assignment"][hub]
+
+    dft = pd.concat(dft_days)
+    if reports:
+        dft.attrs["assignment"] = reports
+    return pd.concat(dfj_days), dft, timeline, numberTrikes, number4Wheels, fleetInHub
+
+
+SWEEP_KEYS = ["Marge abans - W", "Marge despres - W", "Marge abans - No W", "Marge despres - No W",
+              "Temps maxim espera", "Temps entre rutes", "Pes Trike"]
+SWEEP_OBJECTIVES = ["Treballadors", "Hores Totals", "TRIKES", "4W"]
+sweepRoutes = None  # routes shared by the runs of a sweep in each worker process, set by sweep_init
+
+
+def sweep_init(dfj):
+    """Keep the parsed routes of a sweep in a worker process, so they are sent to each process once."""
+    global sweepRoutes
+    sweepRoutes = dfj
+
+
+def sweep_run(hipotesi, dfj=None):
+    """
+    Schedule the routes of the sweep with one set of parameters.
+
+    Args:
+        hipotesi (dict): Parameters of the run.
+        dfj (DataFrame): Parsed routes, the ones kept by sweep_init in a worker process when None.
+
+    Returns:
+        list: (hub, workers, total hours, trikes, 4W) of each hub.
+    """
+    dfj = (sweepRoutes if dfj is None else dfj).copy()
+    dfj["Tipus Bici"] = np.where(dfj["Pes"] <= hipotesi["Pes Trike"], "TRIKE", "4W")
+    _, dft, _, numberTrikes, number4Wheels, _ = schedule_routes(dfj, hipotesi)
+    hours = dft.groupby("Hub")["Hores Totals"].agg(["count", "sum"])
+    return [(hub, int(hours.loc[hub, "count"]), round(float(hours.loc[hub, "sum"]), 1), numberTrikes[hub], number4Wheels[hub])
+            for hub in hours.index]
+
+
+def pareto_front(table, objectives=SWEEP_OBJECTIVES):
+    """
+    Rows of table that no other row of the same hub beats, all the objectives being minimized.
+
+    A row is beaten by another one that is not worse in any objective and better in at least one.
+    """
+    front = []
+    for _, hubTable in table.groupby("Hub", sort=False):
+        values = hubTable[objectives].to_numpy(dtype=float)
+        notWorse = (values[:, None, :] <= values[None, :, :]).all(axis=2)  # [i, j]: row i is not worse than row j
+        better = (values[:, None, :] < values[None, :, :]).any(axis=2)
+        beaten = (notWorse & better).any(axis=0)
+        front.append(hubTable[~beaten])
+    return pd.concat(front) if front else table.iloc[:0]
+
+
+def sweep(routes_table, hipotesi, ranges, max_workers=None):
+    """
+    Schedule the routes with every combination of the values of ranges.
+
+    The routes are parsed once and sent once to each process, the combinations run in parallel
+    like the days of schedule_days. 'Pes Trike' only changes the bike type of the routes, so it
+    does not need them to be parsed again either.
+
+    Args:
+        routes_table (str): Pasted routes table.
+        hipotesi (dict): Parameters of the schedule, the keys of ranges are replaced in each run.
+        ranges (dict): Key of hipotesi (usually one of SWEEP_KEYS) -> list of values to try.
+        max_workers (int): Number of processes, all the cores when None. With 1 the runs are done in this process.
+
+    Returns:
+        tuple: Table with a row per combination and hub, with the values of the keys of ranges and the
+        SWEEP_OBJECTIVES, and its Pareto front per hub (see pareto_front).
+    """
+    for key in ranges:
+        if key not in hipotesi:
+            raise ValueError(f"Unknown hipotesi key: {key}")
+    dfj = process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+    keys = list(ranges)
+    combinations = list(product(*(ranges[key] for key in keys)))
+    runs = [dict(hipotesi, **dict(zip(keys, values))) for values in combinations]
+
+    if max_workers == 1 or len(runs) <= 1:
+        results = [sweep_run(run, dfj) for run in runs]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=sweep_init, initargs=(dfj,)) as executor:
+            results = list(executor.map(sweep_run, runs))
+
+    rows = [values + hubResult for values, result in zip(combinations, results) for hubResult in result]
+    table = pd.DataFrame(rows, columns=keys + ["Hub"] + SWEEP_OBJECTIVES)
+    return table, pareto_front(table)
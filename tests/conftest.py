@@ -0,0 +1,27 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generators import generate_routes_table
+from motorHoraris import process_routes
+
+
+@pytest.fixture
+def hipotesi():
+    """Parameters of variables.json."""
+    with open(os.path.join(ROOT, "variables.json")) as file:
+        return json.load(file)
+
+
+@pytest.fixture
+def make_routes(hipotesi):
+    """Build the parsed routes table of generate_routes_table for a number of routes and a seed."""
+    def make(number_of_routes, seed=0, columns=15):
+        routes_table = generate_routes_table(number_of_routes, seed=seed, columns=columns, pes_trike=hipotesi["Pes Trike"])
+        return process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+    return make
@@ -0,0 +1,119 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import arxiuHoraris
+from arxiuHoraris import archive_run, archive_schedule, load_runs, load_table
+from benchmarks.generators import generate_routes_table
+from horariSumary import archive_week, generate_weekly_schedule, load_week, process_Week_Schedule
+from motorHoraris import generate_schedule, merge_days, process_routes, schedule_days, timeline_table
+
+
+@pytest.fixture
+def schedule(hipotesi):
+    """Schedule of 19/11/2024, dfj, dft and timeline."""
+    return generate_schedule(generate_routes_table(120, seed=5, pes_trike=hipotesi["Pes Trike"]), "", "", hipotesi)[:3]
+
+
+def test_archived_schedule_reads_back(tmp_path, hipotesi, schedule):
+    path = tmp_path / "arxiu.db"
+    dfj, dft, timeline = schedule
+
+    run = archive_schedule(dfj, dft, timeline, hipotesi, path)
+
+    routes = load_table("rutes", "2024-11-19", path=path)
+    assert set(routes["run"]) == {run}
+    columns = ["Id", "Hub", "Assignació", "Hora Inici Ruta Real", "Hora Fi Ruta"]
+    assert sorted(routes[columns].astype(str).itertuples(index=False)) == sorted(dfj[columns].astype(str).itertuples(index=False))
+    shifts = load_table("torns", "2024-11-19", path=path)
+    assert sorted(zip(shifts["Treballador"], shifts["Hores Totals"])) == sorted(zip(dft["Treballador"], dft["Hores Totals"]))
+    assert len(load_table("timeline", "2024-11-19", path=path)) == len(timeline_table(timeline))
+    assert load_runs(path)["Hipotesi"].tolist() == [hipotesi]
+
+    worker = dft["Treballador"].iloc[0]
+    hub = dft["Hub"].iloc[0]
+    assert set(load_table("rutes", "2024-11-19", hub=hub, worker=worker, path=path)["Id"]) == set(
+        dfj.loc[(dfj["Hub"] == hub) & (dfj["Assignació"] == worker), "Id"])
+    assert load_table("torns", "2024-11-20", path=path).empty
+
+
+def test_archived_days_read_back_without_their_labels(tmp_path, hipotesi):
+    path = tmp_path / "arxiu.db"
+    routes_table = "\n".join(generate_routes_table(80, seed=seed, date=date, pes_trike=hipotesi["Pes Trike"])
+                             for seed, date in [(1, "19/11/2024"), (2, "20/11/2024")])
+    dfj, dft, timeline, *_ = merge_days(schedule_days(process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"]), hipotesi, 1))
+
+    archive_schedule(dfj, dft, timeline, hipotesi, path)
+
+    routes = load_table("rutes", "2024-11-19", "2024-11-20", path=path)
+    assert set(routes["Hub"]) == {"Sants", "Napols"} and len(routes) == len(dfj)
+    sants = load_table("rutes", "2024-11-20", hub="Sants", path=path)
+    assert sorted(sants["Id"]) == sorted(dfj.loc[dfj["Hub"] == "Sants 20-11", "Id"])
+    assert set(sants["Assignació"]) == {worker[:-len(" 20-11")] for worker in dfj.loc[dfj["Hub"] == "Sants 20-11", "Assignació"]}
+
+    for date, day in [("2024-11-19", "19-11"), ("2024-11-20", "20-11")]:
+        shifts = load_table("torns", date, worker="A", path=path)
+        assert shifts["Hores Totals"].tolist() == dft.loc[dft["Treballador"] == f"A {day}", "Hores Totals"].tolist()
+        assert sorted(load_table("rutes", date, worker="A", path=path)["Id"]) == sorted(dfj.loc[dfj["Assignació"] == f"A {day}", "Id"])
+        stops = load_table("timeline", date, worker="A", path=path)
+        assert len(stops) == len(timeline[f"A {day}"]) and set(stops["Hub"]) == set(shifts["Hub"])
+
+
+def test_load_table_reads_the_latest_run_of_each_day_and_hub(tmp_path, hipotesi):
+    path = tmp_path / "arxiu.db"
+
+    def shifts(day, hub, hours):
+        return pd.DataFrame({"Data": day, "Hub": hub, "Treballador": ["A", "B"], "Hora Inici Torn": 480, "Hora Final Torn": 600,
+                             "Hores Totals": hours})
+
+    first = archive_run("generador", hipotesi, shifts=pd.concat([shifts("2025-03-03", "Sants", 2.0), shifts("2025-03-03", "Napols", 2.0)]), path=path)
+    second = archive_run("generador", hipotesi, shifts=shifts("2025-03-03", "Sants", 3.0), path=path)
+    archive_run("resum", hipotesi, shifts=shifts("2025-03-03", "", 5.0), path=path)
+
+    result = load_table("torns", "2025-03-01", "2025-03-07", path=path)
+    assert sorted(zip(result["Hub"], result["run"], result["Hores Totals"])) == [
+        ("Napols", first, 2.0), ("Napols", first, 2.0), ("Sants", second, 3.0), ("Sants", second, 3.0)]
+    assert load_table("torns", "2025-03-03", tool="resum", path=path)["Hores Totals"].tolist() == [5.0, 5.0]
+    with pytest.raises(ValueError):
+        archive_run("altre", hipotesi, path=path)
+
+
+def test_archive_run_closes_its_connection(tmp_path, hipotesi, schedule, monkeypatch):
+    connections = []
+    connect = arxiuHoraris.connect
+
+    def recordingConnect(path):
+        connections.append(connect(path))
+        return connections[-1]
+
+    monkeypatch.setattr(arxiuHoraris, "connect", recordingConnect)
+    path = tmp_path / "arxiu.db"
+    archive_schedule(*schedule, hipotesi, path)
+    #a table without Data fails halfway, the run is rolled back
+    with pytest.raises(KeyError):
+        archive_run("generador", hipotesi, shifts=schedule[1], path=path)
+    runs = load_runs(path)
+
+    assert len(connections) == 3 and len(runs) == 1
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_archived_week_is_the_old_week_of_the_next_one(tmp_path):
+    path = tmp_path / "arxiu.db"
+    hipotesi = {"Temps Entrada": 10, "Temps Sortida": 5}
+    year = pd.Timestamp.now().year
+    monday = next(pd.Timestamp(year, 2, day) for day in range(1, 8) if pd.Timestamp(year, 2, day).dayofweek == 0)
+    lines = [f"febrero\t{(monday + pd.Timedelta(days=offset)).day}\t\t\t\t\t{worker}\t{departure}\t{arrival}"
+             for offset, worker, departure, arrival in [(0, "ana", "9:00", "13:00"), (0, "pau", "8:00", "10:30"), (2, "ana", "10:00", "11:00")]]
+    weekSchedule = process_Week_Schedule("\n".join(lines), hipotesi)
+    newWeek = generate_weekly_schedule(weekSchedule, hipotesi)
+
+    assert load_week(monday, path) == {}
+    archive_week(weekSchedule, newWeek, hipotesi, path)
+
+    assert load_week(monday, path) == {key: [entrada.strftime("%H:%M"), sortida.strftime("%H:%M"), f"{hours:g}"]
+                                       for key, (entrada, sortida, hours) in newWeek.items()}
+    assert load_week(monday + pd.Timedelta(days=7), path) == {}
@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from motorHoraris import RouteTable, Shift, TimelineStop, WorkerAvailabilityIndex, schedule_routes, timeline_table
+
+
+def first_fit_loop(dfj, hipotesi):
+    """
+    Greedy assignment with the loop used before WorkerAvailabilityIndex: every route scans the
+    workers of its hub in the order they were added and takes the first one that can do it.
+
+    Returns:
+        dict: index of each route in dfj -> (hub, worker, route start time).
+    """
+    maxWait = hipotesi["Temps maxim espera"]
+    assignment = {}
+    for hub, dfj_hub in dfj.groupby("Hub"):
+        dfj_hub = dfj_hub.sort_values(by="order")
+        routes = RouteTable.from_frame(dfj_hub, hipotesi["Temps Per paquet"], hipotesi["Marge abans - W"], hipotesi["Marge despres - W"],
+                                       hipotesi["Marge abans - No W"], hipotesi["Marge despres - No W"])
+        workers = {}  # worker -> (free time, shift start, hours)
+        for i, index in enumerate(dfj_hub.index):
+            duration = routes.durations[i]
+            chosen = None
+            for worker, (freeTime, shiftStart, hours) in workers.items():
+                available = freeTime < routes.lateTimes[i]
+                waitedLess = routes.earlyTimes[i] - freeTime < maxWait
+                if available and waitedLess and hours + duration/60 <= hipotesi["Maxim Hores Global"]:
+                    chosen = worker
+                    break
+            if chosen is None:
+                chosen = len(workers)
+                routeStartTime = routes.expectedTimes[i] - hipotesi["Marge primera ruta torn"]
+                shiftStart = routeStartTime - hipotesi["Temps Inici Torn"]
+            else:
+                routeStartTime = max(workers[chosen][0], routes.earlyTimes[i])
+                shiftStart = workers[chosen][1]
+            hours = round((routeStartTime + duration + hipotesi["Temps Fi Torn"] - shiftStart)/60, 1)
+            workers[chosen] = (routeStartTime + duration + hipotesi["Temps entre rutes"], shiftStart, hours)
+            assignment[index] = (hub, chosen, routeStartTime)
+    return assignment
+
+
+def routes_by_worker(pairs):
+    """Set of the groups of routes done by the same worker, from (route, worker) pairs."""
+    groups = {}
+    for route, worker in pairs:
+        groups.setdefault(worker, set()).add(route)
+    return {frozenset(routes) for routes in groups.values()}
+
+
+@pytest.mark.parametrize("seed", range(6))
+@pytest.mark.parametrize("columns", [15, 16])
+def test_index_assigns_like_the_first_fit_loop(make_routes, hipotesi, seed, columns):
+    rnd = random.Random(seed)
+    hipotesi.update({"Temps maxim espera": rnd.choice([10, 20, 40]), "Marge abans - No W": rnd.choice([15, 25]),
+                     "Maxim Hores Global": rnd.choice([4, 9])})
+    dfj = make_routes(rnd.randint(50, 600), seed=seed, columns=columns)
+
+    expected = first_fit_loop(dfj, hipotesi)
+    result = schedule_routes(dfj, hipotesi)[0]
+
+    assert dict(zip(result.index, result["Hora Inici Ruta Real"])) == {index: start for index, (_, _, start) in expected.items()}
+    assert routes_by_worker(zip(result.index, result["Assignació"])) == routes_by_worker(
+        (index, (hub, worker)) for index, (hub, worker, _) in expected.items())
+
+
+def test_first_fit_is_the_first_added_worker_of_the_window():
+    rnd = random.Random(1)
+    workers = {}  # worker -> (free time, hub), in the order they were added
+    index = WorkerAvailabilityIndex()
+    for step in range(2000):
+        if not workers or rnd.random() < 0.3:
+            worker = len(workers)
+            workers[worker] = (rnd.randint(0, 200), rnd.choice(["Sants", "Napols"]))
+            index.add(worker, *workers[worker])
+        else:
+            worker = rnd.choice(list(workers))
+            workers[worker] = (rnd.randint(0, 200), workers[worker][1])
+            index.update(worker, workers[worker][0])
+
+        hub = rnd.choice(["Sants", "Napols"])
+        low = rnd.randint(-10, 200)
+        high = low + rnd.randint(0, 60)
+        turnedDown = {worker for worker in workers if rnd.random() < 0.3}
+        expected = next((worker for worker, (freeTime, workerHub) in workers.items()
+                         if workerHub == hub and low < freeTime < high and worker not in turnedDown), None)
+        assert index.first_fit(hub, low, high, lambda worker: worker not in turnedDown) == expected
+
+
+def test_shift_extends_its_hours():
+    shift = Shift("Sants", 3, 480, 600)
+    assert shift.hours == 2.0
+
+    shift.extend(630)
+
+    assert shift.row() == ("Sants", 3, 480, 630, 2.5)
+    assert len(shift.row()) == len(Shift.COLUMNS)
+
+
+def test_route_table_subset(make_routes, hipotesi):
+    dfj = make_routes(60, seed=3).sort_values(by="order")
+    routes = RouteTable.from_frame(dfj, hipotesi["Temps Per paquet"], hipotesi["Marge abans - W"], hipotesi["Marge despres - W"],
+                                   hipotesi["Marge abans - No W"], hipotesi["Marge despres - No W"])
+    positions = [0, 5, 6, 59, 12]
+
+    subset = routes.subset(positions)
+
+    assert len(routes) == 60 and len(subset) == len(positions)
+    for field in RouteTable.__slots__:
+        assert getattr(subset, field) == [getattr(routes, field)[i] for i in positions]
+    assert routes.ids == [routeId.split()[0] for routeId in dfj["Id"]]
+    assert all(early < expected < late for early, expected, late in zip(routes.earlyTimes, routes.expectedTimes, routes.lateTimes))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_timelines_are_stops_of_the_assigned_routes(make_routes, hipotesi, seed):
+    dfj, _, timeline, *_ = schedule_routes(make_routes(300, seed=seed), hipotesi)
+
+    for worker, routes in dfj.sort_values(by="Hora Inici Ruta Real").groupby("Assignació"):
+        stops = timeline[worker]
+        assert all(isinstance(stop, TimelineStop) for stop in stops)
+        assert [stop.route for stop in stops] == [routeId.split()[0] for routeId in routes["Id"]]
+        assert [stop.start for stop in stops] == routes["Hora Inici Ruta Real"].tolist()
+        #the stops before the last one end 10 minutes after their route, the wait counts from there
+        assert [stop.end for stop in stops] == [end + 10 for end in routes["Hora Fi Ruta"].tolist()[:-1]] + [routes["Hora Fi Ruta"].iloc[-1]]
+        assert [stop.wait for stop in stops] == [""] + [stop.start - previous.end for previous, stop in zip(stops, stops[1:])]
+    #stops still read as tuples
+    assert len(timeline_table(timeline)) == len(dfj)
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generators import generate_routes_table
+from motorHoraris import merge_days, process_routes, schedule_days, schedule_routes
+
+DATES = ["19/11/2024", "20/11/2024", "22/11/2024"]
+
+
+@pytest.fixture
+def routes(hipotesi):
+    """Routes of three days, of different sizes."""
+    routes_table = "\n".join(generate_routes_table(40 * (i + 1), seed=i, date=date, pes_trike=hipotesi["Pes Trike"]) for i, date in enumerate(DATES))
+    return process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_each_day_is_a_single_day_run(routes, hipotesi, max_workers):
+    results = schedule_days(routes, hipotesi, max_workers)
+
+    assert list(results) == [(date, hub) for date in DATES for hub in ("Napols", "Sants")]
+    for (date, hub), result in results.items():
+        single = schedule_routes(routes[(routes["Data"] == date) & (routes["Hub"] == hub)], hipotesi)
+        pd.testing.assert_frame_equal(result[0], single[0])
+        pd.testing.assert_frame_equal(result[1], single[1])
+        assert result[2] == single[2] and result[3:5] == single[3:5]
+
+
+def test_merged_workers_are_unique_across_days(routes, hipotesi):
+    results = schedule_days(routes, hipotesi, 1)
+
+    dfj, dft, timeline, numberTrikes, number4Wheels, fleetInHub = merge_days(results)
+
+    assert dft["Treballador"].is_unique and len(dft) == sum(len(result[1]) for result in results.values())
+    assert set(dfj["Assignació"]) == set(dft["Treballador"]) == set(timeline)
+    assert sorted(dfj["Id"]) == sorted(routes["Id"])
+    for (date, hub), result in results.items():
+        day = date[:5].replace("/", "-")
+        label = f"{hub} {day}"
+        assert (numberTrikes[label], number4Wheels[label]) == (result[3][hub], result[4][hub]) and fleetInHub[label] is result[5][hub]
+        merged = dfj[dfj["Hub"] == label]
+        assert sorted(merged["Id"]) == sorted(result[0]["Id"]) and set(merged["Data"]) == {date}
+        assert all(worker.endswith(f" {day}") for worker in merged["Assignació"])
+        #the shifts keep their hours with the new names
+        assert sorted(dft.loc[dft["Hub"] == label, "Hores Totals"]) == sorted(result[1]["Hores Totals"])
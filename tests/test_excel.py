@@ -0,0 +1,51 @@
+import io
+
+import openpyxl
+import pytest
+
+from benchmarks.generators import generate_routes_table, generate_workers_table
+from motorHoraris import generate_excel_file, generate_schedule, summarize_hubs
+
+
+def read_workbook(contents):
+    """Per sheet: values, cells with the header style, red cells and column widths of a saved workbook."""
+    wb = openpyxl.load_workbook(io.BytesIO(contents))
+    sheets = {}
+    for ws in wb.worksheets:
+        values, headers, red = {}, set(), set()
+        for row in ws.iter_rows():
+            for cell in row:
+                if cell.value is not None:
+                    values[cell.coordinate] = cell.value
+                if cell.font.bold and cell.border.left.style == "thin" and cell.alignment.horizontal == "center":
+                    headers.add(cell.coordinate)
+                if cell.font.color is not None and cell.font.color.rgb == "00FF0000":
+                    red.add(cell.coordinate)
+        widths = {letter: dimension.width for letter, dimension in ws.column_dimensions.items() if letter in
+                  {openpyxl.utils.get_column_letter(column) for column in range(1, ws.max_column + 1)}}
+        sheets[ws.title] = values, headers, red, widths
+    return sheets
+
+
+@pytest.mark.parametrize("seed, workers", [(0, False), (1, True), (2, True)])
+def test_write_only_workbook_is_the_regular_one(hipotesi, seed, workers):
+    sants = generate_workers_table(12, seed=seed) if workers else ""
+    dfj, dft, timeline, numberTrikes, number4Wheels, _, workers_sants, workers_napols = generate_schedule(
+        generate_routes_table(150, seed=seed, pes_trike=hipotesi["Pes Trike"]), sants, sants, hipotesi)
+    additionalInfoList = summarize_hubs(dfj, dft)
+
+    regular, streaming = (read_workbook(generate_excel_file(dfj, dft, workers_sants, workers_napols, additionalInfoList, hipotesi, timeline, {},
+                                                            numberTrikes, number4Wheels, write_only=write_only))
+                          for write_only in (False, True))
+
+    assert list(streaming) == list(regular) == ["Taula General", "Napols", "Sants", "Hipotesi"]
+    for title, (values, headers, red, widths) in regular.items():
+        assert streaming[title][0] == values, title
+        assert streaming[title][1] == headers, title
+        assert streaming[title][2] == red, title
+        assert streaming[title][3] == widths, title
+    #the late routes are red in column P of 'Taula General'
+    red = regular["Taula General"][2]
+    late = dfj["Plnif vs Real Min"].gt(0).sum()
+    assert len(red) == late and all(coordinate.startswith("P") for coordinate in red)
+    assert late > 0
@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from motorHoraris import FleetAllocator, schedule_routes
+
+
+def linear_scan_fleet(usages):
+    """Bikes of the loop used before FleetAllocator: each route takes the first created bike released before it starts."""
+    releaseTimes = []
+    for routeStartTime, releaseTime in usages:
+        bike = next((bike for bike, release in enumerate(releaseTimes) if release <= routeStartTime), None)
+        if bike is None:
+            releaseTimes.append(releaseTime)
+        else:
+            releaseTimes[bike] = releaseTime
+    return len(releaseTimes)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_fleet_is_the_peak_usage_of_generated_days(make_routes, hipotesi, seed):
+    dfj, _, _, numberTrikes, number4Wheels, fleetInHub = schedule_routes(make_routes(random.Random(seed).randint(50, 800), seed=seed), hipotesi)
+
+    for hub, routes in dfj.groupby("Hub", sort=False, observed=True):
+        fleet = fleetInHub[hub]
+        assert (fleet.fleet_size("TRIKE"), fleet.fleet_size("4W")) == (numberTrikes[hub], number4Wheels[hub])
+        for bikeType in ("TRIKE", "4W"):
+            assert fleet.fleet_size(bikeType) == fleet.peak_usage(bikeType)
+            usages = [(start, end) for kind, start, end in zip(routes["Tipus Bici"], routes["Hora Inici Ruta Real"].tolist(), routes["Hora Fi Ruta"].tolist())
+                      if kind == bikeType]
+            assert fleet.usages[bikeType] == usages
+            assert fleet.fleet_size(bikeType) <= linear_scan_fleet(usages)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_fleet_allocator_on_random_usages(seed):
+    rnd = random.Random(seed)
+    usages = sorted((start, start + rnd.randint(1, 120)) for start in (rnd.randint(0, 600) for _ in range(rnd.randint(1, 80))))
+    fleet = FleetAllocator()
+
+    bikes = [fleet.allocate("4W", start, end) for start, end in usages]
+
+    assert fleet.fleet_size("4W") == fleet.peak_usage("4W") <= linear_scan_fleet(usages)
+    assert fleet.fleet_size("TRIKE") == 0
+    #a bike never does two routes at the same time
+    for bike in set(bikes):
+        ranges = [usage for usage, used in zip(usages, bikes) if used == bike]
+        assert all(end <= start for (_, end), (start, _) in zip(ranges, ranges[1:]))
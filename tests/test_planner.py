@@ -0,0 +1,165 @@
+import random
+import time
+
+import pytest
+
+from motorHoraris import RouteTable, ShiftPlanner, maximum_matching
+
+
+def random_planner(rnd, numberOfRoutes, maxHours=9):
+    """ShiftPlanner of numberOfRoutes random routes in departure order, with the margins of variables.json."""
+    expectedTimes = sorted(rnd.randint(480, 660) for _ in range(numberOfRoutes))
+    priorities = [rnd.random() < 0.3 for _ in range(numberOfRoutes)]
+    earlyTimes = [expected - (10 if priority else 25) for expected, priority in zip(expectedTimes, priorities)]
+    lateTimes = [expected + (5 if priority else 15) for expected, priority in zip(expectedTimes, priorities)]
+    durations = [rnd.randint(20, 90) for _ in range(numberOfRoutes)]
+    return ShiftPlanner(earlyTimes, lateTimes, expectedTimes, durations, 10, 12, 5, rnd.choice([10, 20, 60]), 10, lambda worker: maxHours)
+
+
+def partitions(items):
+    """Every partition of items into blocks, each block keeps the order of items."""
+    if not items:
+        yield []
+        return
+    first, rest = items[0], items[1:]
+    for partition in partitions(rest):
+        yield [[first]] + partition
+        for k in range(len(partition)):
+            yield partition[:k] + [[first] + partition[k]] + partition[k + 1:]
+
+
+def fewest_workers(planner):
+    """Fewest workers of any plan whose chains of routes follow the rules of the planner, by brute force."""
+    best = None
+    for partition in partitions(list(range(len(planner.timesToCompleteRoute)))):
+        if best is not None and len(partition) >= best:
+            continue
+        if all(planner.simulate_chain(sorted(block), 0) is not None for block in partition):
+            best = len(partition)
+    return best
+
+
+def chains_of(plan):
+    chains = {}
+    for i, worker in enumerate(plan):
+        chains.setdefault(worker, []).append(i)
+    return chains
+
+
+def assert_valid_plan(planner, plan, hours):
+    """Every route has a worker and the routes of each worker can be done one after the other."""
+    assert len(plan) == len(planner.timesToCompleteRoute)
+    chains = chains_of(plan)
+    assert sorted(chains) == list(range(len(hours)))
+    for worker, routes in chains.items():
+        shift = planner.simulate_chain(routes, worker)
+        assert shift is not None
+        assert shift[1] == hours[worker]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_solve_between_lower_bound_and_greedy(seed):
+    rnd = random.Random(seed)
+    planner = random_planner(rnd, rnd.randint(2, 8), maxHours=rnd.choice([3, 9]))
+
+    greedyPlan, greedyHours = planner.greedy()
+    plan, report = planner.solve(0.2, seed=seed)
+    hours = planner.simulate(lambda i, candidates, hours, lastRoutes: plan[i] if plan[i] < len(hours) else None)[1]
+    optimum = fewest_workers(planner)
+
+    assert_valid_plan(planner, greedyPlan, greedyHours)
+    assert_valid_plan(planner, plan, hours)
+    assert report["lower bound"] <= optimum <= report["workers"] <= report["greedy workers"] == len(greedyHours)
+    assert (report["workers"], report["hours"]) <= (report["greedy workers"], report["greedy hours"])
+    assert report["optimal"] == (report["workers"] == report["lower bound"])
+
+
+def test_solve_on_a_larger_day():
+    planner = random_planner(random.Random(7), 300)
+    plan, report = planner.solve(1.0)
+    greedyPlan, greedyHours = planner.greedy()
+    assert len(chains_of(plan)) == report["workers"] <= len(greedyHours)
+    for worker, routes in chains_of(plan).items():
+        assert planner.simulate_chain(routes, worker) is not None
+    assert report["lower bound"] <= report["workers"]
+
+
+def largest_matching(adjacency, numberOfRight):
+    """Size of the maximum matching, by trying every augmenting path from each left vertex (Kuhn)."""
+    matchRight = [-1] * numberOfRight
+
+    def augment(u, seen):
+        for v in adjacency[u]:
+            if v not in seen:
+                seen.add(v)
+                if matchRight[v] == -1 or augment(matchRight[v], seen):
+                    matchRight[v] = u
+                    return True
+        return False
+
+    return sum(augment(u, set()) for u in range(len(adjacency)))
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_maximum_matching(seed):
+    rnd = random.Random(seed)
+    left, right = rnd.randint(1, 30), rnd.randint(1, 30)
+    adjacency = [rnd.sample(range(right), rnd.randint(0, min(right, 4))) for _ in range(left)]
+
+    matchLeft = maximum_matching(adjacency, right, time.perf_counter() + 10)
+
+    matched = [v for v in matchLeft if v != -1]
+    assert len(set(matched)) == len(matched)
+    assert all(v == -1 or v in adjacency[u] for u, v in enumerate(matchLeft))
+    assert len(matched) == largest_matching(adjacency, right)
+
+
+def hub_planners(routes, hipotesi, maxHours):
+    """ShiftPlanner and bike types of the routes of each hub, in the order calculate_worker_availability reads them."""
+    planners = []
+    for hub, routes_hub in routes.groupby("Hub"):
+        table = RouteTable.from_frame(routes_hub.sort_values(by="order"), hipotesi["Temps Per paquet"], hipotesi["Marge abans - W"],
+                                      hipotesi["Marge despres - W"], hipotesi["Marge abans - No W"], hipotesi["Marge despres - No W"])
+        planners.append((ShiftPlanner(table.earlyTimes, table.lateTimes, table.expectedTimes, table.durations, hipotesi["Temps entre rutes"],
+                                      hipotesi["Temps Inici Torn"], hipotesi["Temps Fi Torn"], hipotesi["Temps maxim espera"],
+                                      hipotesi["Marge primera ruta torn"], maxHours), table.bikeTypes))
+    return planners
+
+
+def check_shift(planner, routes, maxHours):
+    """
+    Follow the routes of one worker with the rules of calculate_worker_availability, without simulate_chain.
+
+    Returns:
+        float: Hours of the shift.
+    """
+    start = planner.expectedInitialTimes[routes[0]] - planner.firstRouteMaxEarly
+    shiftStart = start - planner.timeToStartShift
+    end = start + planner.timesToCompleteRoute[routes[0]]
+    for i in routes[1:]:
+        freeTime = end + planner.timeBetweenRoutes
+        assert freeTime < planner.lateTimes[i]  # free before the latest start
+        assert planner.earlyTimes[i] - freeTime < planner.maxWait  # did not wait too long
+        hours = round((end + planner.timeToEndShift - shiftStart)/60, 1)
+        assert hours + planner.timesToCompleteRoute[i]/60 <= maxHours  # hours left for the route
+        start = max(freeTime, planner.earlyTimes[i])
+        assert start - end >= planner.timeBetweenRoutes
+        end = start + planner.timesToCompleteRoute[i]
+    return round((end + planner.timeToEndShift - shiftStart)/60, 1)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_improve_keeps_the_rules_and_never_adds_workers_or_hours(make_routes, hipotesi, seed):
+    def maxHours(worker):
+        return [4, 6, 9][worker % 3]
+
+    for planner, bikeTypes in hub_planners(make_routes(400, seed=seed), hipotesi, maxHours):
+        plan = planner.greedy()[0]
+        improved, report = planner.improve(plan, bikeTypes, 0.3, seed=seed)
+
+        chains = chains_of(improved)
+        hours = [check_shift(planner, routes, maxHours(worker)) for worker, routes in chains.items()]
+        assert sorted(route for routes in chains.values() for route in routes) == list(range(len(plan)))
+        assert report["after"]["workers"] == len(chains) <= report["before"]["workers"] == len(set(plan))
+        assert report["after"]["hours"] == round(sum(hours), 1) <= report["before"]["hours"]
+        assert report["accepted"] > 0
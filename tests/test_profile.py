@@ -0,0 +1,76 @@
+import json
+import threading
+import tracemalloc
+
+import pytest
+
+from benchmarks.generators import generate_routes_table, generate_workers_table
+from motorHoraris import PipelineProfile, generate_schedule, pipeline_stage, process_routes
+
+
+@pipeline_stage
+def stage(name, barrier):
+    barrier.wait()
+    return {name: True}
+
+
+def test_profiles_of_concurrent_threads_only_record_their_stages():
+    barrier = threading.Barrier(4)
+    profiles = {}
+
+    def run(name):
+        with PipelineProfile() as profile:
+            for _ in range(3):
+                stage(name, barrier)
+        profiles[name] = profile
+
+    threads = [threading.Thread(target=run, args=(name,)) for name in "abcd"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {name: [entry["stage"] for entry in profile.stages] for name, profile in profiles.items()} == {name: ["stage"] * 3 for name in "abcd"}
+
+
+def test_nested_profiles_record_their_own_stages():
+    barrier = threading.Barrier(1)
+    with PipelineProfile() as outer:
+        stage("a", barrier)
+        with PipelineProfile() as inner:
+            stage("b", barrier)
+        stage("c", barrier)
+    stage("d", barrier)
+
+    assert len(outer.stages) == 2 and len(inner.stages) == 1
+
+
+def test_profile_of_a_schedule(hipotesi):
+    routes_table = generate_routes_table(150, seed=2, pes_trike=hipotesi["Pes Trike"])
+    workers = generate_workers_table(10, seed=2)
+
+    with PipelineProfile(memory=True) as profile:
+        result = generate_schedule(routes_table, workers, "", hipotesi)
+
+    assert [entry["stage"] for entry in profile.stages] == ["process_routes", "process_workers", "calculate_worker_availability"]
+    #the workers off that day are left out of the roster
+    assert [entry["rows"] for entry in profile.stages] == [150, len(result[6]), 150] and 0 < len(result[6]) <= 10
+    assert all(entry["peak_kb"] > 0 and entry["seconds"] >= 0 for entry in profile.stages)
+    line = json.loads(profile.log_line())
+    assert line["event"] == "pipeline" and line["stages"] == profile.stages and line["seconds"] >= sum(entry["seconds"] for entry in profile.stages)
+    assert profile.table()["stage"].tolist() == [entry["stage"] for entry in profile.stages]
+    #without memory the peak is not measured, and nothing is recorded once the profile is closed
+    with PipelineProfile() as fast:
+        process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+    process_routes(routes_table, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+    assert [(entry["stage"], entry["peak_kb"]) for entry in fast.stages] == [("process_routes", None)]
+    assert not tracemalloc.is_tracing()
+
+
+def test_cprofile_report():
+    with PipelineProfile(profiler="cprofile") as profile:
+        stage("a", threading.Barrier(1))
+
+    assert "stage" in profile.report() and len(profile.stages) == 1
+    with pytest.raises(ValueError):
+        PipelineProfile(profiler="perf")
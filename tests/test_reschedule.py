@@ -0,0 +1,83 @@
+import random
+
+import pandas as pd
+import pytest
+
+from benchmarks.generators import generate_routes_table, generate_workers_table
+from motorHoraris import process_routes, process_workers, reschedule, schedule_routes
+
+
+def unique_times_table(numberOfRoutes, seed):
+    """Pasted routes table whose routes all start at different minutes, so the order of the routes is the same in any run."""
+    rnd = random.Random(seed)
+    times = rnd.sample(range(8 * 60, 8 * 60 + 1400), numberOfRoutes)
+    lines = []
+    for line, startTime in zip(generate_routes_table(numberOfRoutes, seed=seed).splitlines(), times):
+        fields = line.split("\t")
+        fields[3] = f"{startTime // 60}:{startTime % 60:02}"
+        lines.append("\t".join(fields))
+    return lines
+
+
+def shifts_of(dfj):
+    """Routes and start times of each worker, without the names of the workers."""
+    shifts = {}
+    for routeId, worker, startTime in zip(dfj["Id"], dfj["Assignació"], dfj["Hora Inici Ruta Real"].tolist()):
+        shifts.setdefault(worker, []).append((routeId, startTime))
+    return sorted(shifts.values())
+
+
+@pytest.mark.parametrize("change", ["add", "cancel", "delay", "all"])
+@pytest.mark.parametrize("seed", range(4))
+def test_reschedule_like_a_full_run(hipotesi, change, seed):
+    rnd = random.Random(seed)
+    lines = unique_times_table(rnd.choice([60, 300]), seed)
+    routes = process_routes("\n".join(lines[:-3]), hipotesi["Temps Per paquet"], hipotesi["Pes Trike"])
+    dfj, dft, timeline, *_ = schedule_routes(routes, hipotesi)
+    ids = dfj["Id"].tolist()
+
+    added, cancelled, delayed = None, [], {}
+    if change in ("add", "all"):
+        added = "\n".join(lines[-3:])
+    if change in ("cancel", "all"):
+        cancelled = rnd.sample(ids, 2)
+    if change in ("delay", "all"):
+        routeId = rnd.choice([routeId for routeId in ids if routeId not in cancelled])
+        delayed = {routeId: int(dfj.loc[dfj["Id"] == routeId, "Hora Inici Ruta Plnif"].iloc[0]) + rnd.choice([-15, 13, 37])}
+
+    result = reschedule(dfj, dft, timeline, hipotesi, added, cancelled, delayed)
+
+    newRoutes = process_routes(added, hipotesi["Temps Per paquet"], hipotesi["Pes Trike"]) if added else routes.iloc[:0]
+    changed = routes[~routes["Id"].isin(cancelled)].copy()
+    for routeId, startTime in delayed.items():
+        changed.loc[changed["Id"] == routeId, ["Hora Inici Ruta Plnif", "order"]] = startTime
+    full = schedule_routes(pd.concat([changed, newRoutes], ignore_index=True), hipotesi)
+
+    assert shifts_of(result[0]) == shifts_of(full[0])
+    assert sorted(result[1]["Hores Totals"]) == sorted(full[1]["Hores Totals"])
+    assert sorted(map(tuple, result[2].values())) == sorted(map(tuple, full[2].values()))
+    assert (result[3], result[4]) == (full[3], full[4])
+    assert set(result[0]["Assignació"]) == set(result[1]["Treballador"]) == set(result[2])
+
+    #the routes before the first change keep their workers
+    changeTimes = (dfj.loc[dfj["Id"].isin(cancelled + list(delayed)), "Hora Inici Ruta Plnif"].tolist() + list(delayed.values())
+                   + newRoutes["Hora Inici Ruta Plnif"].tolist())
+    kept = dfj[dfj["Hora Inici Ruta Plnif"] < min(changeTimes)]
+    assert result[0].set_index("Id").loc[kept["Id"], "Assignació"].tolist() == kept["Assignació"].tolist()
+
+
+@pytest.mark.parametrize("options", [{"engine": "optimal", "time_budget": 0.1}, {"local_search_time": 0.1}])
+def test_reschedule_refuses_planned_results(make_routes, hipotesi, options):
+    dfj, dft, timeline, *_ = schedule_routes(make_routes(50), hipotesi, **options)
+
+    with pytest.raises(ValueError):
+        reschedule(dfj, dft, timeline, hipotesi, cancelled=[dfj["Id"].iloc[0]])
+
+
+def test_reschedule_refuses_roster_capacity_results(make_routes, hipotesi):
+    roster = process_workers(generate_workers_table(10, seed=1), 1)
+    dfj = make_routes(50)
+    dfj, dft, timeline, *_ = schedule_routes(dfj, hipotesi, rosters={hub: roster for hub in dfj["Hub"].unique()})
+
+    with pytest.raises(ValueError):
+        reschedule(dfj, dft, timeline, hipotesi, cancelled=[dfj["Id"].iloc[0]])
@@ -0,0 +1,185 @@
+import random
+from itertools import permutations
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.generators import generate_routes_table, generate_workers_table
+from motorHoraris import (RosterIndex, WorkerAvailabilityIndex, flexibility, generate_schedule, horaToInt, hungarian, linear_assignment, match_roster,
+                         process_workers, schedule_routes)
+
+
+def cheapest_assignment(cost):
+    """Cost of the cheapest assignment of the smaller side of cost, by trying every permutation."""
+    if cost.shape[0] > cost.shape[1]:
+        cost = cost.T
+    return min(sum(cost[row, column] for row, column in enumerate(columns))
+               for columns in permutations(range(cost.shape[1]), cost.shape[0]))
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_hungarian_finds_the_cheapest_assignment(seed):
+    rnd = random.Random(seed)
+    numberOfRows, numberOfColumns = rnd.randint(1, 6), rnd.randint(1, 6)
+    #small integers give ties, floats a single optimum
+    if seed % 2:
+        cost = np.array([[rnd.randint(0, 4) for _ in range(numberOfColumns)] for _ in range(numberOfRows)], dtype=float)
+    else:
+        cost = np.array([[rnd.uniform(-50, 50) for _ in range(numberOfColumns)] for _ in range(numberOfRows)])
+
+    rows, columns = hungarian(cost)
+
+    assert len(rows) == len(set(rows)) == min(numberOfRows, numberOfColumns)
+    assert len(set(columns)) == len(columns)
+    assert list(rows) == sorted(rows)
+    assert cost[rows, columns].sum() == pytest.approx(cheapest_assignment(cost))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_hungarian_like_linear_sum_assignment(seed):
+    optimize = pytest.importorskip("scipy.optimize")
+    rnd = np.random.default_rng(seed)
+    cost = rnd.uniform(0, 100, size=(rnd.integers(1, 40), rnd.integers(1, 40)))
+
+    rows, columns = hungarian(cost)
+    expectedRows, expectedColumns = optimize.linear_sum_assignment(cost)
+
+    assert rows.tolist() == expectedRows.tolist()
+    assert cost[rows, columns].sum() == pytest.approx(cost[expectedRows, expectedColumns].sum())
+    assert linear_assignment(cost)[1].tolist() == expectedColumns.tolist()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_match_roster_keeps_the_flexibility(hipotesi, seed):
+    rnd = random.Random(seed)
+    roster = process_workers(generate_workers_table(rnd.randint(1, 15), seed=seed), 0)
+    numberOfShifts = rnd.randint(1, 15)
+    shifts = pd.DataFrame({"Treballador": [f"T{i}" for i in range(numberOfShifts)],
+                           "Hora Inici Torn": [rnd.randint(420, 900) for _ in range(numberOfShifts)],
+                           "Hores Totals": [round(rnd.uniform(2, 9), 1) for _ in range(numberOfShifts)]})
+
+    matches = match_roster(shifts, roster, hipotesi)
+
+    contracts = dict(zip(roster["Treballador"], roster["Hores"]))
+    hours = dict(zip(shifts["Treballador"], shifts["Hores Totals"]))
+    assert len({worker for worker, _ in matches.values()}) == len(matches)
+    for shift, (worker, contractHours) in matches.items():
+        assert contractHours == contracts[worker]
+        assert abs(hours[shift] - contractHours) <= flexibility(contractHours, hipotesi) * contractHours + 1e-9
+    #no pair left out could have been matched too
+    for shift in set(hours) - set(matches):
+        for worker in set(contracts) - {worker for worker, _ in matches.values()}:
+            assert abs(hours[shift] - contracts[worker]) > flexibility(contracts[worker], hipotesi) * contracts[worker] + 1e-9
+
+
+def test_worker_tables_only_name_the_shifts_with_roster_names(hipotesi):
+    routes = generate_routes_table(200, seed=2, pes_trike=hipotesi["Pes Trike"])
+    workers = generate_workers_table(40, seed=2)
+
+    plain = generate_schedule(routes, "", "", hipotesi)
+    pasted = generate_schedule(routes, workers, workers, hipotesi)
+    named = generate_schedule(routes, workers, workers, hipotesi, roster_names=True)
+
+    assert pasted[1]["Treballador"].tolist() == plain[1]["Treballador"].tolist()
+    assert "Hores Contracte" not in pasted[1]
+    assert set(named[1]["Treballador"]) & set(pasted[6]["Treballador"])
+    assert named[1]["Hores Totals"].tolist() == plain[1]["Hores Totals"].tolist()
+    assert set(named[0]["Assignació"]) == set(named[1]["Treballador"])
+
+
+@pytest.mark.parametrize("engine, local_search_time", [("optimal", 0), ("greedy", 0.3)])
+def test_planned_shifts_keep_their_maximum_hours_with_rosters(monkeypatch, make_routes, hipotesi, engine, local_search_time):
+    def maxHours(worker):
+        return [4, 6, 9][worker % 3]
+
+    #the ids of the extra workers, in the order of their first route
+    addedIds = {}
+    add = WorkerAvailabilityIndex.add
+
+    def recordingAdd(self, worker, freeTime, hub):
+        addedIds.setdefault(hub, []).append(worker)
+        add(self, worker, freeTime, hub)
+
+    monkeypatch.setattr(WorkerAvailabilityIndex, "add", recordingAdd)
+    dfj = make_routes(300, seed=4)
+    roster = process_workers(generate_workers_table(15, seed=4), 1)
+    rosters = {hub: roster for hub in dfj["Hub"].unique()}
+    database_workers = {worker: (f"N{worker}", maxHours(worker)) for worker in range(1000)}
+
+    dfj, dft, *_ = schedule_routes(dfj, hipotesi, database_workers=database_workers, engine=engine, time_budget=0.5,
+                                   local_search_time=local_search_time, rosters=rosters)
+
+    assert sum(report["used"] for report in dft.attrs["roster"].values()) > 0
+    for hub, dfj_hub in dfj.groupby("Hub", sort=False, observed=True):
+        extra = dfj_hub[~dfj_hub["Assignació"].isin(roster["Treballador"])]
+        chains = [routes for _, routes in extra.groupby("Assignació", sort=False)]
+        assert len(chains) == len(addedIds[hub])
+        for worker, routes in zip(addedIds[hub], chains):
+            #python ints, numpy rounds some halves of a tenth the other way
+            ends, durations = routes["Hora Fi Ruta"].tolist(), routes["Temps Total Ruta"].tolist()
+            shiftStart = routes["Hora Inici Ruta Real"].iloc[0].item() - hipotesi["Temps Inici Torn"]
+            limit = maxHours(worker)
+            for end, duration in zip(ends[:-1], durations[1:]):
+                assert round((end + hipotesi["Temps Fi Torn"] - shiftStart)/60, 1) + duration/60 <= limit
+
+
+def scan_dispatch(freeTimes, endShifts, earlyTime, lateTime, timeToCompleteRoute, timeBetweenRoutes, timeToEndShift):
+    """RosterIndex.dispatch as a scan of every worker: the one free last by earlyTime, otherwise the first free before lateTime."""
+    workers = range(len(freeTimes))
+    before = [worker for worker in workers if freeTimes[worker] <= earlyTime and earlyTime + timeToCompleteRoute + timeToEndShift <= endShifts[worker]]
+    if before:
+        worker = max(before, key=lambda worker: (freeTimes[worker], worker))
+        routeStartTime = earlyTime
+    else:
+        after = [worker for worker in workers if earlyTime < freeTimes[worker] < lateTime
+                 and freeTimes[worker] + timeToCompleteRoute + timeToEndShift <= endShifts[worker]]
+        if not after:
+            return None
+        worker = min(after, key=lambda worker: (freeTimes[worker], worker))
+        routeStartTime = freeTimes[worker]
+    freeTimes[worker] = routeStartTime + timeToCompleteRoute + timeBetweenRoutes
+    return worker, routeStartTime
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_dispatch_with_many_identical_free_times(seed):
+    rnd = random.Random(seed)
+    numberOfWorkers = rnd.randint(1, 60)
+    #most workers start at the same time, with shifts of any length
+    starts = [rnd.choice([480, 480, 480, 540]) for _ in range(numberOfWorkers)]
+    roster = pd.DataFrame({"Treballador": [f"T{worker}" for worker in range(numberOfWorkers)],
+                           "Entrada": [f"{start // 60}:{start % 60:02}" for start in starts],
+                           "Sortida": [f"{(start + length) // 60}:{(start + length) % 60:02}" for start, length in
+                                       zip(starts, (rnd.choice([60, 120, 240, 480]) for _ in starts))],
+                           "Hores": 4.0})
+    earlyTimes = sorted(rnd.randint(470, 900) for _ in range(rnd.randint(1, 150)))
+    routes = [(earlyTime, earlyTime + rnd.choice([0, 10, 30]), rnd.randint(20, 90)) for earlyTime in earlyTimes]
+    horizons = [min(earlyTime for earlyTime, _, _ in routes[i:]) for i in range(len(routes))]
+    index = RosterIndex(roster, 10, 5)
+    freeTimes = [start + 10 for start in starts]
+    endShifts = [horaToInt(hora) for hora in roster["Sortida"]]
+
+    for (earlyTime, lateTime, duration), horizon in zip(routes, horizons):
+        assert index.dispatch(earlyTime, lateTime, duration, 10, horizon) == scan_dispatch(freeTimes, endShifts, earlyTime, lateTime, duration, 10, 5)
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_roster_capacity_schedules(make_routes, hipotesi, seed):
+    dfj = make_routes(400, seed=seed)
+    roster = process_workers(generate_workers_table(25, seed=seed), 1)
+    shifts = {worker: (horaToInt(start), horaToInt(end)) for worker, start, end in zip(roster["Treballador"], roster["Entrada"], roster["Sortida"])}
+
+    result, dft, timeline, *_ = schedule_routes(dfj, hipotesi, rosters={hub: roster for hub in dfj["Hub"].unique()})
+
+    assert sorted(result["Id"]) == sorted(dfj["Id"]) and (result["Assignació"] != "").all()
+    assert sum(report["routes"] for report in dft.attrs["roster"].values()) > 0
+    for (hub, worker), routes in result.groupby(["Hub", "Assignació"], observed=True):
+        routes = routes.sort_values("Hora Inici Ruta Real")
+        starts, ends = routes["Hora Inici Ruta Real"].tolist(), routes["Hora Fi Ruta"].tolist()
+        #a worker does one route at a time, and no route leaves after its margin
+        assert all(end <= start for end, start in zip(ends, starts[1:]))
+        assert (routes["Hora Inici Ruta Real"] - routes["Hora Inici Ruta Plnif"]).max() <= max(hipotesi["Marge despres - W"], hipotesi["Marge despres - No W"])
+        if worker in shifts:
+            start, end = shifts[worker]
+            assert start + hipotesi["Temps Inici Torn"] <= starts[0] and ends[-1] + hipotesi["Temps Fi Torn"] <= end
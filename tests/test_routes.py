@@ -0,0 +1,121 @@
+import random
+
+import pytest
+
+from benchmarks.generators import generate_routes_table
+from motorHoraris import ROUTE_COLUMNS, horaToInt, process_routes
+
+TIME_FOR_DELIVERY = 3
+PES_TRIKE = 125
+
+
+def reference_routes(routes_table, time_for_delivery, pes_trike):
+    """Routes of the line by line reader process_routes replaced, as (Id, Prioritari, Tipus Bici, Pes, Data, Hub, start, end, route time, paquets)."""
+    routes = []
+    for line in routes_table.splitlines():
+        if not line.strip():
+            continue
+        fields = line.split("\t")
+        if len(fields) not in (14, 15, 16):
+            continue
+        parche = len(fields) - 15
+        try:
+            departureTime = horaToInt(fields[3 + parche])
+            deliveryTime = int(fields[6 + parche])
+            paquets = int(fields[12 + parche])
+            weight = int(fields[9 + parche])
+        except ValueError:
+            continue
+        if parche == 1:
+            deliveryTime -= paquets * 7
+        routes.append((fields[0], " w " in fields[0].lower(), "TRIKE" if weight <= pes_trike else "4W", weight, fields[2 + parche],
+                       fields[10 + parche], departureTime, departureTime + deliveryTime + paquets * time_for_delivery, deliveryTime, paquets))
+    return routes
+
+
+def rows_of(routes):
+    columns = ["Id", "Prioritari", "Tipus Bici", "Pes", "Data", "Hub", "Hora Inici Ruta Plnif", "Hora Fi Ruta", "Temps Recorregut Ruta", "Num Entregues"]
+    return [tuple(row) for row in routes[columns].astype(object).itertuples(index=False)]
+
+
+def fourteen_columns(routes_table):
+    """The 15 column export without its second column."""
+    return "\n".join("\t".join(line.split("\t")[:1] + line.split("\t")[2:]) for line in routes_table.splitlines())
+
+
+@pytest.mark.parametrize("columns", [14, 15, 16])
+def test_each_layout_reads_the_same_routes(columns):
+    routes_table = generate_routes_table(80, seed=3, columns=16 if columns == 16 else 15, pes_trike=PES_TRIKE)
+    if columns == 14:
+        routes_table = fourteen_columns(routes_table)
+
+    routes = process_routes(routes_table, TIME_FOR_DELIVERY, PES_TRIKE)
+    usual = process_routes(generate_routes_table(80, seed=3, pes_trike=PES_TRIKE), TIME_FOR_DELIVERY, PES_TRIKE)
+
+    assert list(routes.columns) == ROUTE_COLUMNS
+    assert rows_of(routes) == rows_of(usual) == reference_routes(routes_table, TIME_FOR_DELIVERY, PES_TRIKE)
+    assert routes["order"].tolist() == routes["Hora Inici Ruta Plnif"].tolist()
+
+
+def test_mixed_layouts_keep_the_pasted_order():
+    lines = generate_routes_table(30, seed=1, pes_trike=PES_TRIKE).splitlines()
+    longLines = generate_routes_table(30, seed=1, columns=16, pes_trike=PES_TRIKE).splitlines()
+    shortLines = fourteen_columns("\n".join(lines)).splitlines()
+    rnd = random.Random(1)
+    mixed = "\n".join(rnd.choice((lines, longLines, shortLines))[i] for i in range(30))
+
+    routes = process_routes(mixed, TIME_FOR_DELIVERY, PES_TRIKE)
+
+    assert rows_of(routes) == reference_routes(mixed, TIME_FOR_DELIVERY, PES_TRIKE)
+    assert routes["Id"].tolist() == [line.split("\t")[0] for line in lines]
+
+
+def test_malformed_and_short_lines_are_skipped(capsys):
+    good, bad, badNumber = generate_routes_table(3, seed=2, pes_trike=PES_TRIKE).splitlines()
+    badNumber = badNumber.split("\t")
+    badNumber[12] = "dotze"
+    lines = [good, "\t".join(bad.split("\t")[:8]), "", "   ", "\t".join(bad.split("\t")[:3] + ["9h"] + bad.split("\t")[4:]), "\t".join(badNumber),
+             good + "\t\t"]
+
+    routes = process_routes("\n".join(lines), TIME_FOR_DELIVERY, PES_TRIKE)
+
+    assert routes["Id"].tolist() == [good.split("\t")[0]]
+    out = capsys.readouterr().out
+    assert out.count("Unexpected line format") == 2 and out.count("Invalid time or number") == 2
+    assert process_routes("", TIME_FOR_DELIVERY, PES_TRIKE).columns.tolist() == ROUTE_COLUMNS
+
+
+@pytest.mark.parametrize("weight, bikeType", [(0, "TRIKE"), (PES_TRIKE - 1, "TRIKE"), (PES_TRIKE, "TRIKE"), (PES_TRIKE + 1, "4W"), (900, "4W")])
+def test_routes_up_to_the_trike_weight_go_by_trike(weight, bikeType):
+    fields = generate_routes_table(1, pes_trike=PES_TRIKE).split("\t")
+    fields[9] = str(weight)
+
+    routes = process_routes("\t".join(fields), TIME_FOR_DELIVERY, PES_TRIKE)
+
+    assert routes["Tipus Bici"].tolist() == [bikeType] and routes["Pes"].tolist() == [weight]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_fuzzed_tables_read_like_the_line_by_line_reader(seed):
+    rnd = random.Random(seed)
+    lines = generate_routes_table(rnd.randint(1, 60), seed=seed, columns=rnd.choice([15, 16]), pes_trike=PES_TRIKE).splitlines()
+    fuzzed = []
+    for line in lines:
+        fields = line.split("\t")
+        change = rnd.random()
+        if change < 0.1:
+            fields = fields[:rnd.randint(1, len(fields))]
+        elif change < 0.2:
+            fields += [""] * rnd.randint(1, 3)
+        elif change < 0.3:
+            fields[rnd.choice([3, 6, 9, 12])] = rnd.choice(["", "x", "9", "9:00:00", "1.5", " 7 ", "-3", "10:-5"])
+        elif change < 0.35:
+            fields = fields[:1] + fields[2:]
+        fuzzed.append("\t".join(fields))
+        if rnd.random() < 0.05:
+            fuzzed.append(rnd.choice(["", "  ", "\t", "brossa"]))
+    routes_table = "\n".join(fuzzed)
+
+    routes = process_routes(routes_table, TIME_FOR_DELIVERY, PES_TRIKE)
+
+    assert rows_of(routes) == reference_routes(routes_table, TIME_FOR_DELIVERY, PES_TRIKE)
@@ -0,0 +1,236 @@
+import random
+from datetime import datetime, timedelta
+
+import openpyxl
+import pandas as pd
+import pytest
+
+from horariSumary import (DIES, MESOS, diff_weeks, format_changes, generate_Excel_File, generate_weekly_schedule, parse_dates, process_OldWeek_Schedule,
+                          process_Week_Schedule, week_days, week_frame, week_grid)
+
+HIPOTESI = {"Temps Entrada": 10, "Temps Sortida": 5}
+
+
+def week_line(month, day, worker, departure, arrival):
+    """Line of the pasted week export: month, day, four unread fields, worker, departure and arrival."""
+    return "\t".join([month, str(day), "", "", "", "", worker, departure, arrival])
+
+
+@pytest.mark.parametrize("month, number", [("enero", 1), ("Febrero", 2), ("MARÇ", 3), ("marc", 3), ("abril", 4), ("maig", 5),
+                                           ("juny", 6), ("julio", 7), ("agost", 8), ("setiembre", 9), ("setembre", 9),
+                                           ("octubre", 10), ("novembre", 11), (" diciembre ", 12)])
+def test_parse_dates_reads_spanish_and_catalan_months(month, number):
+    dates = parse_dates(pd.Series([month]), pd.Series([" 3"]), 2024)
+    assert dates.iloc[0] == pd.Timestamp(2024, number, 3)
+
+
+def test_parse_dates_gives_nat_for_unknown_months_and_days():
+    dates = parse_dates(pd.Series(["noviembre", "brumari", "febrero", "marzo"]), pd.Series(["19", "19", "30", "x"]), 2024)
+    assert dates.iloc[0] == pd.Timestamp(2024, 11, 19)
+    assert dates.iloc[1:].isna().all()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_parse_dates_like_a_line_by_line_reader(seed):
+    rnd = random.Random(seed)
+    months = list(MESOS) + ["brumari", "", "13"]
+    lines = [(rnd.choice([str.upper, str.lower, str.title])(rnd.choice(months)) + rnd.choice(["", " "]),
+              rnd.choice([str(rnd.randint(0, 32)), f" {rnd.randint(1, 28)}", "", "x"])) for _ in range(2000)]
+
+    dates = parse_dates(pd.Series([month for month, _ in lines]), pd.Series([day for _, day in lines]), 2024)
+
+    expected = []
+    for month, day in lines:
+        try:
+            expected.append(pd.Timestamp(datetime(2024, MESOS[month.strip().lower()], int(day))))
+        except (KeyError, ValueError):
+            expected.append(pd.NaT)
+    assert dates.tolist() == expected
+
+
+def test_day_names_follow_dayofweek():
+    assert set(MESOS.values()) == set(range(1, 13))
+    #18 to 24 November 2024 is a Monday to Sunday week
+    assert [DIES[pd.Timestamp(2024, 11, day).dayofweek] for day in range(18, 25)] == [
+        "lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+
+
+def test_week_schedule_keys_the_shifts_by_day_name():
+    year = datetime.now().year
+    wednesday = next(pd.Timestamp(year, 1, day) for day in range(1, 8) if pd.Timestamp(year, 1, day).dayofweek == 2)
+    lines = [week_line("enero", wednesday.day, "ana", "9:00", "10:30"),
+             week_line("enero", wednesday.day, "ana", "11:00:00", "12:00"),
+             week_line("enero", wednesday.day + 1, "", "8:00", "9:00")]
+
+    schedule = generate_weekly_schedule(process_Week_Schedule("\n".join(lines), HIPOTESI), HIPOTESI)
+
+    assert list(schedule) == [("miércoles", "ANA"), ("jueves", "XXX")]
+    entrada, sortida, hours = schedule[("miércoles", "ANA")]
+    assert (entrada.strftime("%H:%M"), sortida.strftime("%H:%M"), hours) == ("08:50", "12:05", 3.2)
+
+
+def reference_weekly_schedule(weekSchedule, hipotesi):
+    """generate_weekly_schedule row by row: the first departure and the last arrival of each day and worker."""
+    def parse(time):
+        for fmt in ("%H:%M:%S", "%H:%M"):
+            try:
+                return datetime.strptime(time, fmt)
+            except ValueError:
+                pass
+        return None
+
+    schedule = {}
+    for date, worker, departure, arrival in zip(weekSchedule["Data"], weekSchedule["Repartidor"], weekSchedule["Hora Sortida"], weekSchedule["Hora Arribada"]):
+        departure, arrival = parse(departure), parse(arrival)
+        if departure is None or arrival is None:
+            continue
+        entrada, sortida = schedule.get((DIES[date.dayofweek], worker), (departure, arrival))
+        schedule[(DIES[date.dayofweek], worker)] = (min(entrada, departure), max(sortida, arrival))
+    entrades = {key: entrada - timedelta(minutes=hipotesi["Temps Entrada"]) for key, (entrada, _) in schedule.items()}
+    sortides = {key: sortida + timedelta(minutes=hipotesi["Temps Sortida"]) for key, (_, sortida) in schedule.items()}
+    return {key: [entrades[key], sortides[key], round((sortides[key] - entrades[key]).total_seconds() / 3600, 1)] for key in schedule}
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_week_schedule_with_several_routes_per_day(seed):
+    rnd = random.Random(seed)
+    monday = next(pd.Timestamp(datetime.now().year, 5, day) for day in range(1, 8) if pd.Timestamp(datetime.now().year, 5, day).dayofweek == 0)
+    lines = []
+    for _ in range(rnd.randint(1, 200)):
+        departure = rnd.randint(7 * 60, 20 * 60)
+        arrival = departure + rnd.randint(10, 180)
+        times = [f"{minutes // 60}:{minutes % 60:02}" + rnd.choice(["", ":00", ":30"]) for minutes in (departure, arrival)]
+        if rnd.random() < 0.03:
+            times[rnd.randint(0, 1)] = rnd.choice(["", "9h", "25:99"])
+        lines.append(week_line("mayo", (monday + pd.Timedelta(days=rnd.randint(0, 4))).day, rnd.choice(["ana", "pau", "joan", ""]), *times))
+    weekSchedule = process_Week_Schedule("\n".join(lines), HIPOTESI)
+
+    schedule = generate_weekly_schedule(weekSchedule, HIPOTESI)
+
+    expected = reference_weekly_schedule(weekSchedule, HIPOTESI)
+    assert list(schedule) == list(expected)
+    assert schedule == expected
+
+
+def test_week_schedule_reads_short_lines(capsys):
+    lines = ["enero\t8", "enero\t9\t\t\t\t\tana\t9:00", "brumari", week_line("enero", 10, "pau", "9:00", "10:00")]
+
+    week = process_Week_Schedule("\n".join(lines), HIPOTESI)
+
+    assert week["Repartidor"].tolist() == ["XXX", "ANA", "PAU"]
+    assert week["Hora Arribada"].tolist() == ["", "", "10:00"]
+    assert "brumari" in capsys.readouterr().out
+    assert process_Week_Schedule("enero\t8\n", HIPOTESI)["Repartidor"].tolist() == ["XXX"]
+
+
+def test_old_week_reads_a_block_per_day():
+    grid = "ana\t9:00\t13:00\t4\t\t\t\t8:00\t15:30\t7,5\n" + "\t".join(["pau"] + ["10:00", "14:00", "4"] * 7)
+
+    schedule = process_OldWeek_Schedule(grid)
+
+    assert [day for day, worker in schedule if worker == "ANA"] == DIES
+    assert schedule[("miércoles", "ANA")] == ["8:00", "15:30", "7.5"]
+    assert schedule[("jueves", "ANA")] == schedule[("martes", "ANA")] == ["", "", ""]
+    assert schedule[("domingo", "PAU")] == ["10:00", "14:00", "4"]
+
+
+def test_old_week_is_lunes_to_viernes_by_default():
+    schedule = process_OldWeek_Schedule("ana\t9:00\t13:00\t4\n\n")
+    assert list(schedule) == [(day, "ANA") for day in DIES[:5]]
+    assert process_OldWeek_Schedule("") == {}
+
+
+def test_old_week_reads_the_grid_it_is_written_as():
+    schedule = {(day, worker): [f"{8 + i}:00", f"{12 + i}:30", f"{4 + i},5"] for i, day in enumerate(DIES) for worker in ("ANA", "PAU")}
+    days = week_days(schedule)
+    grid = "\n".join("\t".join("" if value is None else str(value) for value in row[1:]) for row in week_grid(schedule, ["ANA", "PAU"], days))
+
+    assert days == DIES
+    assert process_OldWeek_Schedule(grid) == {key: [entrada, sortida, hours.replace(",", ".")] for key, (entrada, sortida, hours) in schedule.items()}
+    assert list(process_OldWeek_Schedule(grid, days=DIES[:2])) == [(day, worker) for worker in ("ANA", "PAU") for day in DIES[:2]]
+
+
+def test_diff_weeks_finds_each_kind_of_change():
+    oldWeek = {("lunes", "ANA"): ["9:00", "13:00", "4"], ("martes", "ANA"): ["9:00", "13:00", "4"],
+               ("lunes", "PAU"): ["8:00", "12:00", "4"], ("lunes", "JOAN"): ["10:00", "14:00", "4"],
+               ("martes", "JOAN"): ["", "", ""]}
+    newWeek = {("lunes", "ANA"): ["9:00", "13:00", "4"], ("miércoles", "ANA"): ["9:00", "12:00", "3"],
+               ("lunes", "PAU"): ["8:30", "12:15", "3.8"], ("jueves", "MARTA"): ["7:00", "11:00", "4"]}
+
+    changes = diff_weeks(week_frame(oldWeek), week_frame(newWeek))
+
+    assert list(zip(changes["Dia"], changes["Repartidor"], changes["Canvi"])) == [
+        ("lunes", "JOAN", "Repartidor eliminat"), ("lunes", "PAU", "Horari canviat"), ("martes", "ANA", "Dia eliminat"),
+        ("miércoles", "ANA", "Dia nou"), ("jueves", "MARTA", "Repartidor nou")]
+    pau = changes.iloc[1]
+    assert (pau["Delta Entrada"], pau["Delta Sortida"], pau["Delta Hores"]) == (30, 15, -0.2)
+    assert len(diff_weeks(week_frame(oldWeek), week_frame(newWeek), compact=False)) == 6
+
+    formatted = format_changes(changes)
+    assert formatted.loc[1, ["Entrada Abans", "Entrada", "Sortida Abans", "Sortida"]].tolist() == ["08:00", "08:30", "12:00", "12:15"]
+    assert formatted.loc[0, "Entrada Abans"] == "10:00" and pd.isna(formatted.loc[0, "Entrada"])
+    assert str(formatted["Delta Entrada"].dtype) == "Int64" and formatted.loc[1, "Delta Entrada"] == 30
+
+
+def test_diff_weeks_by_keys():
+    oldWeek = pd.concat([week_frame({("lunes", "ANA"): ["9:00", "13:00", "4"]}, Hub="Sants"),
+                         week_frame({("lunes", "ANA"): ["9:00", "13:00", "4"]}, Hub="Napols")])
+    newWeek = pd.concat([week_frame({("lunes", "ANA"): ["9:00", "13:00", "4"]}, Hub="Sants"),
+                         week_frame({("martes", "ANA"): ["9:00", "13:00", "4"]}, Hub="Napols")])
+
+    changes = diff_weeks(oldWeek, newWeek, keys=["Hub"])
+
+    assert list(zip(changes["Hub"], changes["Dia"], changes["Canvi"])) == [("Napols", "lunes", "Dia eliminat"), ("Napols", "martes", "Dia nou")]
+
+
+def test_the_sheet_lists_a_worker_of_both_weeks_once(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    year = datetime.now().year
+    monday = next(pd.Timestamp(year, 1, day) for day in range(1, 8) if pd.Timestamp(year, 1, day).dayofweek == 0)
+    newWeek = generate_weekly_schedule(process_Week_Schedule(week_line("enero", monday.day, "ana", "9:00", "13:00"), HIPOTESI), HIPOTESI)
+    oldWeek = process_OldWeek_Schedule("Ana\t9:00\t13:00\t4\npau\t8:00\t12:00\t4")
+
+    generate_Excel_File(oldWeek, newWeek)
+
+    names = [row[1] for row in openpyxl.load_workbook("ResumHorari.xlsx").active.iter_rows(values_only=True) if row[1] not in (None, "Entrada")]
+    assert names == ["ANA", "ANA", "PAU"]
+
+
+def test_write_only_sheet_is_the_regular_one(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    year = datetime.now().year
+    monday = next(pd.Timestamp(year, 3, day) for day in range(1, 8) if pd.Timestamp(year, 3, day).dayofweek == 0)
+    lines = [week_line("marzo", (monday + pd.Timedelta(days=offset)).day, worker, departure, arrival)
+             for offset, worker, departure, arrival in [(0, "ana", "9:00", "13:00"), (1, "pau", "8:00", "10:30"), (5, "ana", "10:00", "11:00")]]
+    newWeek = generate_weekly_schedule(process_Week_Schedule("\n".join(lines), HIPOTESI), HIPOTESI)
+    oldWeek = process_OldWeek_Schedule("ana\t9:00\t13:00\t4\t\t\t\t8:00\t15:30\t7,5\njoan\t10:00\t14:00\t4")
+    changes = format_changes(diff_weeks(week_frame(oldWeek), week_frame(newWeek)))
+
+    def read_sheets(oldWeekSchedule, **options):
+        sheets = []
+        for write_only in (False, True):
+            generate_Excel_File(oldWeekSchedule, newWeek, write_only=write_only, **options)
+            wb = openpyxl.load_workbook("ResumHorari.xlsx")
+            sheets.append({ws.title: {cell.coordinate: cell.value for row in ws.iter_rows() for cell in row if cell.value is not None}
+                           for ws in wb.worksheets})
+        return sheets
+
+    regular, streaming = read_sheets(oldWeek, changes=changes)
+    assert list(regular) == ["Horari asdfsadf", "Canvis"] and streaming == regular
+    regular, streaming = read_sheets("")
+    assert list(regular) == ["Horari asdfsadf"] and streaming == regular
+
+
+def test_the_sheet_fills_the_wednesday_columns(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    year = datetime.now().year
+    wednesday = next(pd.Timestamp(year, 1, day) for day in range(1, 8) if pd.Timestamp(year, 1, day).dayofweek == 2)
+    newWeek = generate_weekly_schedule(process_Week_Schedule(week_line("enero", wednesday.day, "ana", "9:00", "13:00"), HIPOTESI), HIPOTESI)
+
+    generate_Excel_File("", newWeek)
+
+    rows = list(openpyxl.load_workbook("ResumHorari.xlsx").active.iter_rows(values_only=True))
+    header = next(row for row in rows if "Miércoles" in row)
+    ana = next(row for row in rows if row[1] == "ANA")
+    column = header.index("Miércoles")
+    assert ana[column:column + 3] == ("08:50", "13:05", 4.2)
@@ -0,0 +1,51 @@
+import random
+
+import pandas as pd
+import pytest
+
+import motorHoraris
+from benchmarks.generators import generate_routes_table
+from motorHoraris import SWEEP_OBJECTIVES, pareto_front, process_routes, schedule_routes, sweep
+
+
+def beaten(row, other):
+    """Whether other is not worse than row in any objective and better in one."""
+    return all(o <= r for o, r in zip(other, row)) and any(o < r for o, r in zip(other, row))
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_pareto_front_like_a_brute_force_check(seed):
+    rnd = random.Random(seed)
+    #few distinct values give ties and repeated rows
+    table = pd.DataFrame([[rnd.choice(["Sants", "Napols"])] + [rnd.randint(0, 3) for _ in SWEEP_OBJECTIVES] for _ in range(rnd.randint(0, 30))],
+                         columns=["Hub"] + SWEEP_OBJECTIVES)
+
+    front = pareto_front(table)
+
+    rows = list(table.itertuples(index=False))
+    expected = [index for index, row in zip(table.index, rows)
+                if not any(other.Hub == row.Hub and beaten(row[1:], other[1:]) for other in rows)]
+    assert sorted(front.index) == expected
+    assert list(front.columns) == list(table.columns)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_sweep_rows_are_single_runs(hipotesi, max_workers):
+    routes_table = generate_routes_table(120, seed=6, pes_trike=hipotesi["Pes Trike"])
+    ranges = {"Temps maxim espera": [20, 60], "Pes Trike": [hipotesi["Pes Trike"] - 40, hipotesi["Pes Trike"]]}
+
+    table, front = sweep(routes_table, hipotesi, ranges, max_workers)
+
+    assert len(table) == 4 * 2 and motorHoraris.sweepRoutes is None
+    for row in table.itertuples(index=False):
+        run = dict(hipotesi, **{"Temps maxim espera": row[0], "Pes Trike": row[1]})
+        dfj = process_routes(routes_table, run["Temps Per paquet"], run["Pes Trike"])
+        _, dft, _, numberTrikes, number4Wheels, _ = schedule_routes(dfj, run)
+        dft = dft[dft["Hub"] == row.Hub]
+        assert tuple(row[3:]) == (len(dft), round(float(dft["Hores Totals"].sum()), 1), numberTrikes[row.Hub], number4Wheels[row.Hub])
+    pd.testing.assert_frame_equal(front, pareto_front(table))
+
+
+def test_sweep_refuses_unknown_keys(hipotesi):
+    with pytest.raises(ValueError):
+        sweep(generate_routes_table(10), hipotesi, {"Temps": [1, 2]}, 1)
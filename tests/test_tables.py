@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from benchmarks.generators import generate_routes_table, generate_workers_table
+from motorHoraris import (ROUTE_DTYPES, SHIFT_DTYPES, TIMELINE_DTYPES, export_tables, generate_schedule, load_tables, timeline_table,
+                          typed_table)
+
+
+@pytest.fixture
+def schedule(hipotesi):
+    """dfj, dft and timeline of a schedule named after a roster, so the shifts have Hores Contracte."""
+    workers = generate_workers_table(8, seed=4)
+    dfj, dft, timeline = generate_schedule(generate_routes_table(90, seed=4, pes_trike=hipotesi["Pes Trike"]), workers, workers, hipotesi,
+                                           roster_names=True)[:3]
+    dfj = dfj.copy()
+    #an empty text, a text pandas would read as missing and a missing number
+    dfj.loc[dfj.index[0], "Id"] = ""
+    dfj.loc[dfj.index[1], "Id"] = "NA"
+    dfj["Pes"] = dfj["Pes"].astype("Int32")
+    dfj.loc[dfj.index[2], "Pes"] = pd.NA
+    return dfj, dft, timeline
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "csv"])
+def test_tables_read_back_with_their_types(tmp_path, schedule, file_format):
+    dfj, dft, timeline = schedule
+
+    paths = export_tables(dfj, dft, timeline, tmp_path / "taules", file_format)
+    routes, shifts, stops = load_tables(tmp_path / "taules")
+
+    assert [path.rsplit(".", 1)[1] for path in map(str, paths)] == [file_format] * 3
+    assert routes.dtypes.astype(str).to_dict() == ROUTE_DTYPES
+    assert shifts.dtypes.astype(str).to_dict() == SHIFT_DTYPES
+    assert stops.dtypes.astype(str).to_dict() == TIMELINE_DTYPES
+    pd.testing.assert_frame_equal(routes, typed_table(dfj, ROUTE_DTYPES).reset_index(drop=True), check_categorical=False)
+    pd.testing.assert_frame_equal(shifts, typed_table(dft, SHIFT_DTYPES).reset_index(drop=True), check_categorical=False)
+    pd.testing.assert_frame_equal(stops, typed_table(timeline_table(timeline), TIMELINE_DTYPES))
+
+    assert set(routes["Hub"].cat.categories) == {"Sants", "Napols"}
+    assert routes["Id"].iloc[:2].tolist() == ["", "NA"] and routes["Pes"].isna().tolist() == [False, False, True] + [False] * (len(routes) - 3)
+    #the wait of the first stop of a shift is missing, the others are minutes
+    assert stops["Temps Espera Min"].isna().tolist() == (stops["Ordre"] == 0).tolist()
+    assert shifts["Hores Contracte"].notna().any()
+
+
+@pytest.mark.parametrize("file_format", ["parquet", "csv"])
+def test_empty_tables_read_back(tmp_path, schedule, file_format):
+    dfj, dft, _ = schedule
+
+    export_tables(dfj.iloc[:0], dft.iloc[:0], {}, tmp_path, file_format)
+    routes, shifts, stops = load_tables(tmp_path)
+
+    assert (len(routes), len(shifts), len(stops)) == (0, 0, 0)
+    assert routes.dtypes.astype(str).to_dict() == ROUTE_DTYPES
+    assert shifts.dtypes.astype(str).to_dict() == SHIFT_DTYPES
+    assert stops.dtypes.astype(str).to_dict() == TIMELINE_DTYPES
+
+
+def test_unknown_table_format(tmp_path, schedule):
+    with pytest.raises(ValueError):
+        export_tables(*schedule, tmp_path, "xlsx")